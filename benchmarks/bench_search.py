@@ -0,0 +1,298 @@
+"""Benchmark the search engines of the search utility on synthetic corpora.
+
+Each corpus is generated reproducibly (fixed seed) into a temporary
+directory, then every engine runs every query a few times; the best time is
+reported as files/s and MB/s. Results can be stored as a baseline and later
+runs compared against it.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_search.py                      # run, compare with baseline.json if present
+    python benchmarks/bench_search.py --save-baseline      # run and store the numbers as the new baseline
+    python benchmarks/bench_search.py --scale 0.2 --corpus small --engine serial
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+try:
+    from package_one.extensions.search_utility import logic_search
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    from package_one.extensions.search_utility import logic_search
+from package_one.extensions.search_utility.logic_filter import DEFAULT_MAX_FILE_SIZE, FileFilter
+from package_one.extensions.search_utility.logic_index import TrigramIndex
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# a slowdown beyond this fraction of the baseline MB/s counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# the file selection the search page starts with (size limit, archives searched)
+FILE_FILTER = FileFilter(max_size=DEFAULT_MAX_FILE_SIZE, archives=True)
+
+QUERIES = {
+    # plain literal: byte-level prefilter and index apply
+    'literal': 'needle_token',
+    # anchored pattern without a usable literal
+    'anchored': r'^\s*def \w+\(',
+    # backreference forces backtracking over every assignment line
+    'backtracking': r'(\w+)\s*=\s*(\w+)\s*[-+*/]\s*\1',
+}
+
+_WORDS = ('alpha', 'beta', 'gamma', 'delta', 'value', 'result', 'count', 'index',
+          'register', 'modbus', 'table', 'template', 'offset', 'length', 'device')
+
+
+def _line(rng):
+    kind = rng.random()
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(2, 10))]
+    if kind < 0.1:
+        return f"def {words[0]}_{rng.randint(0, 999)}({', '.join(words[1:3])}):"
+    if kind < 0.3:
+        a, b = words[0], words[1]
+        return f"    {a} = {b} + {a if rng.random() < 0.5 else b}"
+    if kind < 0.302:
+        return f"    # needle_token {' '.join(words)}"
+    return '    ' + ' '.join(words)
+
+
+def _text(rng, n_lines):
+    return '\n'.join(_line(rng) for _ in range(n_lines)) + '\n'
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = 'wb' if isinstance(data, bytes) else 'w'
+    with open(path, mode, **({} if mode == 'wb' else {'encoding': 'utf-8', 'newline': '\n'})) as f:
+        f.write(data)
+
+
+def make_small(root, rng, scale):
+    """Many small source-like files in a shallow tree."""
+    for i in range(max(1, int(4000 * scale))):
+        _write(os.path.join(root, f"pkg{i % 40}", f"mod{i}.py"), _text(rng, rng.randint(10, 80)))
+
+
+def make_huge(root, rng, scale):
+    """A few large files (the mmap and prefilter path)."""
+    block = _text(rng, 20000)
+    repeat = max(1, int(10 * scale))
+    for i in range(3):
+        _write(os.path.join(root, f"huge{i}.log"), block * repeat)
+
+
+def make_deep(root, rng, scale):
+    """Few files per directory, nested very deeply."""
+    depth = 40
+    for branch in range(max(1, int(25 * scale))):
+        path = os.path.join(root, f"b{branch}")
+        for level in range(depth):
+            path = os.path.join(path, f"l{level}")
+            if level % 4 == 0:
+                _write(os.path.join(path, f"f{level}.txt"), _text(rng, 20))
+
+
+def make_binary(root, rng, scale):
+    """Binary blobs with unknown extensions next to a few text files."""
+    for i in range(max(1, int(60 * scale))):
+        size = rng.randint(16 << 10, 256 << 10)
+        _write(os.path.join(root, 'blobs', f"blob{i}.bin"), rng.getrandbits(size * 8).to_bytes(size, 'little'))
+        if i % 3 == 0:
+            _write(os.path.join(root, 'src', f"text{i}.py"), _text(rng, 100))
+
+
+def make_encodings(root, rng, scale):
+    """The same kind of text stored in several encodings and line endings."""
+    encodings = ('utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'utf-16')
+    for i in range(max(1, int(1000 * scale))):
+        text = _text(rng, rng.randint(20, 120)).replace('value', 'Wert äöü')
+        if i % 3 == 0:
+            text = text.replace('\n', '\r\n')
+        enc = encodings[i % len(encodings)]
+        _write(os.path.join(root, enc, f"f{i}.txt"), text.encode(enc, 'replace'))
+
+
+def make_archives(root, rng, scale):
+    """Compressed logs and zipped template bundles (searched member by member)."""
+    for i in range(max(1, int(200 * scale))):
+        with gzip.open(os.path.join(root, f"log{i}.txt.gz"), 'wb') as f:
+            f.write(_text(rng, rng.randint(100, 400)).encode('utf-8'))
+        if i % 10 == 0:
+            with zipfile.ZipFile(os.path.join(root, f"bundle{i}.zip"), 'w', zipfile.ZIP_DEFLATED) as z:
+                for j in range(10):
+                    z.writestr(f"templates/t{j}.json", _text(rng, 50))
+
+
+CORPORA = {
+    'small': make_small,
+    'huge': make_huge,
+    'deep': make_deep,
+    'binary': make_binary,
+    'encodings': make_encodings,
+    'archives': make_archives,
+}
+
+
+def _engine_serial(query, root, _state):
+    return logic_search.search_in_files(query, root, file_filter=FILE_FILTER)
+
+
+def _engine_parallel(query, root, _state):
+    return logic_search.search_in_files_parallel(query, root, file_filter=FILE_FILTER)
+
+
+def _engine_guarded(query, root, _state):
+    return list(logic_search.iter_search_guarded(query, root, file_filter=FILE_FILTER))
+
+
+def _engine_indexed(query, root, state):
+    # the index is built once per corpus (see _prepare); this times warm queries
+    return state['index'].search(query)
+
+
+ENGINES = {
+    'serial': _engine_serial,
+    'parallel': _engine_parallel,
+    'guarded': _engine_guarded,
+    'indexed': _engine_indexed,
+}
+
+
+def corpus_stats(root):
+    """Number and total size of the files the engines will read."""
+    files = 0
+    size = 0
+    for path in logic_search.iter_files(root, FILE_FILTER):
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            continue
+        files += 1
+    return files, size
+
+
+def _prepare(root, workdir):
+    start = time.perf_counter()
+    index = TrigramIndex(root, index_path=os.path.join(workdir, 'index.json'), file_filter=FILE_FILTER)
+    index.refresh()
+    return {'index': index, 'index_build_s': time.perf_counter() - start}
+
+
+def run(corpora, engines, queries, scale, repeat, seed, workdir=None):
+    """Run the benchmark matrix and return {key: result} entries."""
+    results = {}
+    base = tempfile.mkdtemp(prefix='search_bench_', dir=workdir)
+    try:
+        for name in corpora:
+            root = os.path.join(base, name)
+            os.makedirs(root)
+            CORPORA[name](root, random.Random(f"{seed}-{name}"), scale)
+            files, size = corpus_stats(root)
+            state = _prepare(root, base) if 'indexed' in engines else {}
+            print(f"[{name}] {files} files, {size / 1e6:.1f} MB"
+                  + (f", index built in {state['index_build_s']:.2f}s" if state else ''))
+            for qname in queries:
+                query = QUERIES[qname]
+                reference = None
+                for engine in engines:
+                    best = None
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        hits = ENGINES[engine](query, root, state)
+                        elapsed = time.perf_counter() - start
+                        best = elapsed if best is None else min(best, elapsed)
+                    if reference is None:
+                        reference = hits
+                    elif hits != reference:
+                        raise RuntimeError(f"{engine} disagrees with {engines[0]} on {name}/{qname}")
+                    best = max(best, 1e-9)
+                    results[f"{name}/{engine}/{qname}"] = {
+                        'seconds': round(best, 6),
+                        'files_per_s': round(files / best, 1),
+                        'mb_per_s': round(size / 1e6 / best, 2),
+                        'hits': len(hits),
+                    }
+        return results
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline; return the keys that regressed."""
+    regressions = []
+    print(f"{'case':40} {'files/s':>12} {'MB/s':>9} {'baseline':>9} {'change':>8}")
+    for key, r in results.items():
+        old = baseline.get(key)
+        line = f"{key:40} {r['files_per_s']:>12.1f} {r['mb_per_s']:>9.2f}"
+        if old and old.get('mb_per_s'):
+            change = r['mb_per_s'] / old['mb_per_s'] - 1
+            line += f" {old['mb_per_s']:>9.2f} {change:>+8.1%}"
+            if old.get('hits') is not None and old['hits'] != r['hits']:
+                line += f"  hits {old['hits']} -> {r['hits']}"
+            if change < -tolerance:
+                line += '  REGRESSION'
+                regressions.append(key)
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', action='append', choices=sorted(CORPORA), help='corpus to run (repeatable, default: all)')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES), help='engine to run (repeatable, default: all)')
+    parser.add_argument('--query', action='append', choices=sorted(QUERIES), help='query to run (repeatable, default: all)')
+    parser.add_argument('--scale', type=float, default=1.0, help='corpus size factor (default 1.0)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the best one counts (default 3)')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--workdir', help='directory for the generated corpora (default: system temp)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed MB/s slowdown before a case counts as a regression (default 0.25)')
+    args = parser.parse_args(argv)
+
+    corpora = args.corpus or list(CORPORA)
+    engines = args.engine or list(ENGINES)
+    queries = args.query or list(QUERIES)
+    results = run(corpora, engines, queries, args.scale, max(1, args.repeat), args.seed, args.workdir)
+
+    baseline = {}
+    settings = {'scale': args.scale, 'seed': args.seed}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('settings') == settings:
+            baseline = stored.get('results', {})
+        else:
+            print(f"baseline settings {stored.get('settings')} differ from this run, not comparing")
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        stored = {'settings': settings, 'python': sys.version.split()[0], 'results': results}
+        if os.path.exists(args.baseline):
+            # keep cases of the old baseline that were not part of this run
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                old = json.load(f)
+            if old.get('settings') == settings:
+                stored['results'] = {**old.get('results', {}), **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Write-ahead journal for the working Modbus table.
+
+Rewriting the whole table file after edits gets slower as the table
+grows, and a crash while writing it lost the table. Instead every change
+is appended to a journal as one small record, and the table file is only
+rewritten now and then as a snapshot of everything journaled so far
+(compaction). Files next to the table file PATH:
+
+* PATH: the snapshot, a saved-table JSON whose 'journal_seq' is the
+  number of the last record it contains and whose 'journal_id' names its
+  journal. It is written to a temp file and renamed over PATH, so it is
+  either the old or the new snapshot.
+* PATH.journal: the current segment, one JSON record per line,
+  [seq, op, *args] (ops of RegisterTable.journal, plus 'input' for the
+  input field text), after a header [0, 'journal', journal id].
+* PATH.journal.N: closed segments; N is the last seq they hold. A
+  segment is closed when a snapshot is taken and deleted once that
+  snapshot is on disk.
+
+On startup replay() loads the snapshot and applies the records after
+its journal_seq, in order, up to the first torn or missing record.
+Segments of another journal (e.g. left over after PATH was replaced by
+an older copy) are ignored.
+Records are flushed to the OS when appended: they survive a crash of the
+tool, not of the machine.
+"""
+
+import json
+import os
+import uuid
+from typing import List, Optional, Tuple
+
+from .logic_register_table import RegisterTable, apply_record
+
+JOURNAL_SUFFIX = '.journal'
+# edits are compacted into a snapshot this long after the first one ...
+COMPACT_DELAY_MS = 10000
+# ... or soon once this many bytes were journaled (e.g. after an import)
+COMPACT_SIZE = 1 << 20
+COMPACT_SOON_MS = 500
+
+
+class EditJournal:
+    """Journal segments of the table file path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.current = path + JOURNAL_SUFFIX
+        # number of the last record appended
+        self.seq = 0
+        # characters appended since the last snapshot
+        self.size = 0
+        self._file = None
+        # names the journal in its segments and snapshots; set by replay()
+        self.id: Optional[str] = None
+        # input field text as last journaled
+        self.input_text: Optional[str] = None
+
+    def append(self, record: tuple):
+        """Append a change record (op, *args)."""
+        self.seq += 1
+        line = json.dumps([self.seq, *record], ensure_ascii=False, separators=(',', ':')) + '\n'
+        if self._file is None:
+            self._file = open(self.current, 'a', encoding='utf-8')
+            if self._file.tell() == 0:
+                if self.id is None:
+                    self.id = uuid.uuid4().hex
+                self._file.write(json.dumps([0, 'journal', self.id]) + '\n')
+        self._file.write(line)
+        self._file.flush()
+        self.size += len(line)
+
+    def input_changed(self, text: str):
+        """Journal the input field text if it differs from the last one."""
+        if text != self.input_text:
+            self.input_text = text
+            self.append(('input', text))
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def rotate(self) -> int:
+        """Close the current segment for a snapshot; returns the seq the snapshot covers."""
+        self.close()
+        if os.path.exists(self.current):
+            os.replace(self.current, f"{self.current}.{self.seq}")
+        self.size = 0
+        return self.seq
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """Closed segments as (last seq, path), oldest first."""
+        folder = os.path.dirname(self.current) or '.'
+        prefix = os.path.basename(self.current) + '.'
+        found = []
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return found
+        for name in names:
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                found.append((int(name[len(prefix):]), os.path.join(folder, name)))
+        return sorted(found)
+
+    def discard(self, seq: int):
+        """Delete the closed segments a snapshot up to seq contains (may run on any thread)."""
+        for last, path in self.segments():
+            if last <= seq:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _read(path: str):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    yield line
+        except OSError:
+            return
+
+    def replay(self, table: RegisterTable, data: Optional[bytes] = None) -> Tuple[bool, str, int, bool]:
+        """Load the snapshot (data, if it was read already) and the journal into table.
+
+        Returns (found, input text, records applied, clean): found is False
+        if there was neither snapshot nor journal; clean is False if
+        records were dropped (a torn or missing record, or segments of
+        another journal) or the snapshot names no journal yet. Then a new
+        snapshot should be written and the journal reset(). table.journal
+        must not be set.
+        """
+        self.close()
+        found = False
+        templates, input_text, seq = [], '', 0
+        exists = data is not None or os.path.exists(self.path)
+        self.id = None
+        try:
+            if data is None:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+            data = json.loads(data.decode('utf-8'))
+            templates = data.get('templates') or []
+            input_text = str(data.get('input_text', '') or '')
+            seq = int(data.get('journal_seq', 0) or 0)
+            self.id = data.get('journal_id') or None
+            found = True
+        except Exception:
+            pass
+        table.load(templates)
+        applied = 0
+        clean = self.id is not None or not exists
+        broken = False
+        for path in [p for _, p in self.segments()] + [self.current]:
+            lines = self._read(path)
+            try:
+                header = json.loads(next(lines))
+                journal_id = header[2] if header[:2] == [0, 'journal'] else None
+            except StopIteration:
+                continue
+            except Exception:
+                journal_id = None
+            if self.id is None and not exists:
+                # no snapshot was written yet: the journal is all there is
+                self.id = journal_id
+            if journal_id is None or journal_id != self.id:
+                clean = False
+                continue
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                    if record[0] <= seq:
+                        continue
+                    if record[0] != seq + 1:
+                        raise ValueError('missing journal record')
+                    if record[1] == 'input':
+                        input_text = str(record[2])
+                    else:
+                        apply_record(table, record[1:])
+                except Exception:
+                    broken = True
+                    break
+                seq += 1
+                applied += 1
+                found = True
+            if broken:
+                clean = False
+                break
+        if self.id is None:
+            self.id = uuid.uuid4().hex
+        self.seq = seq
+        self.size = 0
+        self.input_text = input_text
+        return found, input_text, applied, clean
+
+    def reset(self):
+        """Delete all segments, e.g. after replay dropped a broken tail and a snapshot was written."""
+        self.close()
+        for _, path in self.segments():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        try:
+            os.remove(self.current)
+        except OSError:
+            pass
@@ -1,4 +1,18 @@
-"""Logic for Modbus Template Konfigurator (placeholder)."""
+"""Template file helpers: registers and their sizes, TX blocks, template folders and table rows."""
+
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_HERE = os.path.dirname(__file__)
+
+# folders holding saved tables and device templates
+SAVED_TABLES_DIR = os.path.normpath(os.path.join(_HERE, 'saved_tables'))
+MODBUS_TEMPLATES_DIR = os.path.normpath(os.path.join(_HERE, 'modbus_templates'))
+TEMPLATE_DIRS = (SAVED_TABLES_DIR, MODBUS_TEMPLATES_DIR)
+
+_BITS = re.compile(r'(\d+)')
+
 
 class ModbusTemplateManager:
     def __init__(self):
@@ -11,3 +25,106 @@ class ModbusTemplateManager:
     def add_template(self, tpl):
         self.templates.append(tpl)
         return tpl
+
+
+def parse_register(value) -> Optional[int]:
+    """Parse a register given as int, decimal text or hex text (0x..); None if invalid."""
+    try:
+        if isinstance(value, str) and value.strip().lower().startswith('0x'):
+            return int(value.strip(), 16)
+        return int(str(value).strip())
+    except Exception:
+        return None
+
+
+def register_count(datatype) -> int:
+    """Number of 16-bit registers a value of datatype occupies (at least 1)."""
+    m = _BITS.search(str(datatype or ''))
+    if not m:
+        return 1
+    return max(1, (int(m.group(1)) + 15) // 16)
+
+
+def tx_blocks(data) -> List[Tuple[int, int, int]]:
+    """(function, start, length) of the TX blocks of an exported device file."""
+    dev = data.get('device') if isinstance(data, dict) else None
+    if not isinstance(dev, dict):
+        return []
+    blocks = []
+    for t in dev.get('TX') or dev.get('tx') or []:
+        if not isinstance(t, dict):
+            continue
+        try:
+            func = int(t.get('function', t.get('Function', 3)))
+        except Exception:
+            func = 3
+        start = parse_register(t.get('start')) if t.get('start') is not None else None
+        try:
+            length = int(str(t.get('length', 1)))
+        except Exception:
+            continue
+        if start is None:
+            continue
+        blocks.append((func, start, max(1, length)))
+    return blocks
+
+
+def scan_template_files(dirs: Sequence[str] = TEMPLATE_DIRS) -> Dict[str, Tuple[int, int]]:
+    """path -> (mtime_ns, size) of the JSON files directly in dirs."""
+    found = {}
+    for d in dirs:
+        try:
+            names = sorted(os.listdir(d))
+        except OSError:
+            continue
+        for name in names:
+            if not name.lower().endswith('.json'):
+                continue
+            path = os.path.join(d, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found[path] = (st.st_mtime_ns, st.st_size)
+    return found
+
+
+def template_rows(data) -> Tuple[List[dict], str]:
+    """Return (rows, input text) of a saved table or an exported device file.
+
+    Rows use the keys of saved tables (Address, Type, Unit, Comment, Scale,
+    Functions). For device files the RX entries become rows and the Modbus
+    function of a register is taken from the TX block covering it. The input
+    text falls back to the Type of the device, if the file has one.
+    """
+    if not isinstance(data, dict):
+        return [], ''
+    input_text = str(data.get('input_text', '') or '')
+    rows = [r for r in (data.get('templates') or []) if isinstance(r, dict)]
+    dev = data.get('device')
+    if not rows and isinstance(dev, dict):
+        rx = dev.get('RX') or dev.get('rx') or []
+        tx_map = {}
+        for func, start, length in tx_blocks(data):
+            for addr in range(start, start + length):
+                tx_map[addr] = func
+        for e in rx:
+            if not isinstance(e, dict):
+                continue
+            reg = e.get('register', '')
+            reg_int = parse_register(reg)
+            if reg_int is not None and reg_int in tx_map:
+                func_val = str(tx_map[reg_int])
+            else:
+                func_val = str(e.get('select', '') or '')
+            rows.append({
+                'Address': reg,
+                'Type': e.get('format', ''),
+                'Unit': e.get('unit', ''),
+                'Comment': e.get('description', ''),
+                'Scale': e.get('factor', ''),
+                'Functions': func_val,
+            })
+    if not input_text and isinstance(dev, dict):
+        input_text = str(dev.get('Type', '') or '')
+    return rows, input_text
@@ -0,0 +1,310 @@
+"""Index of the register ranges every saved template defines.
+
+Each table row (or device RX entry) covers its register plus the registers
+its datatype spans (FLOAT32: two, INT64: four, ...); each TX block covers
+start .. start + length - 1. All ranges of all template files are kept in
+one interval tree, so
+
+* point queries (which templates define register 0x3000?) and
+* range queries (which templates touch 0x3000-0x30FF?)
+
+take O(log n + k) for n ranges and k results. The tree is a treap ordered
+by range start whose nodes also hold the largest end in their subtree;
+a subtree whose largest end lies below the query is skipped as a whole.
+
+The index is updated per file (update_file / remove_file) when the
+configurator saves or deletes a table, and refresh() picks up files that
+changed otherwise by their mtime and size.
+"""
+
+import json
+import os
+import random
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .logic_modbus_template import TEMPLATE_DIRS, parse_register, register_count, scan_template_files, \
+    template_rows, tx_blocks
+
+# kinds of register ranges
+KIND_ROW = 'row'
+KIND_TX = 'tx'
+
+
+class RegisterRange:
+    """Registers start..end (inclusive) defined by one row or TX block of a file."""
+
+    __slots__ = ('start', 'end', 'path', 'kind', 'index', 'label')
+
+    def __init__(self, start: int, end: int, path: str, kind: str, index: int, label: str = ''):
+        self.start = start
+        self.end = end
+        self.path = path
+        # KIND_ROW: index is the row; KIND_TX: index is the TX block
+        self.kind = kind
+        self.index = index
+        # description of the row, or the Modbus function of the block
+        self.label = label
+
+    def __repr__(self):
+        return f"RegisterRange({self.start:#x}-{self.end:#x}, {os.path.basename(self.path)!r}, {self.kind}{self.index})"
+
+
+class _Node:
+    __slots__ = ('key', 'item', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, key, item: RegisterRange):
+        self.key = key
+        self.item = item
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = item.end
+
+
+def _update(node: _Node):
+    m = node.item.end
+    if node.left is not None and node.left.max_end > m:
+        m = node.left.max_end
+    if node.right is not None and node.right.max_end > m:
+        m = node.right.max_end
+    node.max_end = m
+
+
+def _split(node: Optional[_Node], key) -> Tuple[Optional[_Node], Optional[_Node]]:
+    # (keys < key, keys >= key)
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    # every key of left is smaller than every key of right
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class IntervalTree:
+    """Treap of RegisterRanges keyed by (start, end, sequence number)."""
+
+    def __init__(self):
+        self.root: Optional[_Node] = None
+        self._size = 0
+        self._seq = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, item: RegisterRange) -> tuple:
+        """Add item; returns the key to remove it with."""
+        self._seq += 1
+        key = (item.start, item.end, self._seq)
+        node = _Node(key, item)
+        left, right = _split(self.root, key)
+        self.root = _merge(_merge(left, node), right)
+        self._size += 1
+        return key
+
+    def build(self, items: Sequence[RegisterRange]) -> List[tuple]:
+        """Replace the tree by items in O(n log n); returns their keys in the order of items.
+
+        Much faster than inserting one by one: the nodes are sorted once and
+        linked as a Cartesian tree on their random priorities.
+        """
+        order = sorted(range(len(items)), key=lambda i: (items[i].start, items[i].end))
+        keys = [None] * len(items)
+        nodes = []
+        for i in order:
+            self._seq += 1
+            keys[i] = (items[i].start, items[i].end, self._seq)
+            nodes.append(_Node(keys[i], items[i]))
+        spine = []
+        for node in nodes:
+            last = None
+            while spine and spine[-1].priority < node.priority:
+                last = spine.pop()
+            node.left = last
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+        # children have lower priorities than their parents: update bottom-up
+        for node in sorted(nodes, key=lambda n: n.priority):
+            _update(node)
+        self.root = spine[0] if spine else None
+        self._size = len(nodes)
+        return keys
+
+    def remove(self, key: tuple) -> bool:
+        left, rest = _split(self.root, key)
+        middle, right = _split(rest, (key[0], key[1], key[2] + 1))
+        self.root = _merge(left, right)
+        if middle is None:
+            return False
+        self._size -= 1
+        return True
+
+    def overlapping(self, lo: int, hi: int) -> Iterator[RegisterRange]:
+        """Ranges with start <= hi and end >= lo, ordered by start."""
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            # descend left while the left subtree can still reach lo
+            while node is not None:
+                if node.max_end < lo:
+                    node = None
+                    break
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.item.start > hi:
+                # every later node starts even further right
+                return
+            if node.item.end >= lo:
+                yield node.item
+            node = node.right
+
+
+class RegisterIndex:
+    """Register ranges of all template files in dirs."""
+
+    def __init__(self, dirs: Sequence[str] = TEMPLATE_DIRS):
+        self.dirs = tuple(os.path.normpath(d) for d in dirs)
+        self.tree = IntervalTree()
+        # path -> (mtime_ns, size, keys of its ranges in the tree)
+        self._files: Dict[str, Tuple[int, int, List[tuple]]] = {}
+
+    def __len__(self):
+        return len(self.tree)
+
+    def _ranges(self, path: str, data) -> List[RegisterRange]:
+        ranges = []
+        rows, _ = template_rows(data)
+        for i, row in enumerate(rows):
+            reg = parse_register(row.get('Address', ''))
+            if reg is None:
+                continue
+            label = str(row.get('Comment', '') or row.get('Name', '') or '')
+            ranges.append(RegisterRange(reg, reg + register_count(row.get('Type', '')) - 1, path, KIND_ROW, i, label))
+        for i, (func, start, length) in enumerate(tx_blocks(data)):
+            ranges.append(RegisterRange(start, start + length - 1, path, KIND_TX, i, f"FC{func}"))
+        return ranges
+
+    def remove_file(self, path: str) -> bool:
+        """Drop the ranges of path (after the file was deleted)."""
+        entry = self._files.pop(os.path.normpath(path), None)
+        if entry is None:
+            return False
+        for key in entry[2]:
+            self.tree.remove(key)
+        return True
+
+    def _read(self, path: str) -> Optional[Tuple[int, int, List[RegisterRange]]]:
+        try:
+            st = os.stat(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        return st.st_mtime_ns, st.st_size, self._ranges(path, data)
+
+    def update_file(self, path: str) -> bool:
+        """Re-read path after it was written; removes it if it is gone or invalid."""
+        path = os.path.normpath(path)
+        if os.path.dirname(path) not in self.dirs:
+            return False
+        self.remove_file(path)
+        read = self._read(path)
+        if read is None:
+            return False
+        mtime_ns, size, ranges = read
+        self._files[path] = (mtime_ns, size, [self.tree.insert(r) for r in ranges])
+        return True
+
+    def refresh(self) -> bool:
+        """Apply files added, changed or deleted since the last refresh; True if any."""
+        found = scan_template_files(self.dirs)
+        changed = [p for p, sig in found.items() if self._files.get(p, (None, None))[:2] != sig]
+        removed = [p for p in self._files if p not in found]
+        if not self._files and changed:
+            # first load: build the tree in one go
+            ranges = []
+            owners = []
+            for path in changed:
+                read = self._read(path)
+                mtime_ns, size, file_ranges = read if read is not None else (found[path] + ([],))
+                self._files[path] = (mtime_ns, size, [])
+                ranges.extend(file_ranges)
+                owners.extend([path] * len(file_ranges))
+            for path, key in zip(owners, self.tree.build(ranges)):
+                self._files[path][2].append(key)
+            return True
+        for path in removed:
+            self.remove_file(path)
+        for path in changed:
+            if not self.update_file(path):
+                # unreadable: remember its signature so it is not retried until it changes
+                self._files[path] = found[path] + ([],)
+        return bool(changed or removed)
+
+    def at(self, register: int) -> List[RegisterRange]:
+        """Ranges containing register."""
+        return list(self.tree.overlapping(register, register))
+
+    def overlapping(self, lo: int, hi: int) -> List[RegisterRange]:
+        """Ranges sharing at least one register with lo..hi."""
+        if hi < lo:
+            lo, hi = hi, lo
+        return list(self.tree.overlapping(lo, hi))
+
+    def templates_at(self, lo: int, hi: Optional[int] = None) -> List[str]:
+        """Paths of the templates defining any register in lo..hi (hi defaults to lo)."""
+        ranges = self.overlapping(lo, lo if hi is None else hi)
+        return sorted({r.path for r in ranges})
+
+
+_default_index: Optional[RegisterIndex] = None
+
+
+def default_index() -> RegisterIndex:
+    """Shared index over TEMPLATE_DIRS, refreshed before it is returned."""
+    global _default_index
+    if _default_index is None:
+        _default_index = RegisterIndex()
+    _default_index.refresh()
+    return _default_index
+
+
+def file_changed(path: str):
+    """Update the shared index, if it was built, after path was written or deleted."""
+    if _default_index is not None:
+        _default_index.update_file(path)
+
+
+def parse_register_range(text: str) -> Optional[Tuple[int, int]]:
+    """Parse '0x3000', '12288' or a range like '0x3000-0x30FF' / '100..200'; None if invalid."""
+    text = (text or '').strip()
+    for sep in ('..', '-', ':'):
+        if sep in text:
+            lo_txt, hi_txt = text.split(sep, 1)
+            lo, hi = parse_register(lo_txt), parse_register(hi_txt)
+            if lo is None or hi is None:
+                return None
+            return (lo, hi) if lo <= hi else (hi, lo)
+    reg = parse_register(text)
+    return None if reg is None else (reg, reg)
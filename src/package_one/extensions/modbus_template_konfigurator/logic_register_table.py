@@ -0,0 +1,606 @@
+"""Columnar storage for the rows of the Modbus template table.
+
+One QTableWidgetItem per cell costs several hundred bytes and a Qt object;
+a 20k-register map made the table slow to fill and large in memory.
+RegisterTable keeps one compact column per field instead:
+
+* Register and Modbus function: ints in an array,
+* Datentyp and Einheit: ids into a pool of distinct strings (maps use a
+  handful of datatypes and units for thousands of rows),
+* Faktor: floats in an array (NaN if empty),
+* Beschreibung: plain strings.
+
+The table shows and exports the exact text that was entered. Typed columns
+therefore keep the text of a cell only where it differs from the canonical
+form of its value (e.g. '0x1100' for 4352, '2' for 2.0, or invalid text);
+for all other cells the text is derived from the number.
+
+Every row also has a stable id, and a hash index maps each register to the
+ids of the rows holding it. It is updated on every insert, delete and edit
+(sorting only reorders the ids), so duplicate checks take constant time
+and the registers used by several rows are always known.
+
+If a journal callback is set, every change is passed to it as a record
+(op, *args) that apply_record() can replay on another table; see
+logic_journal.
+"""
+
+import csv
+import io
+import math
+import re
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .logic_modbus_template import parse_register
+
+# field names of saved tables, in column order
+COLUMNS = ('Address', 'Type', 'Unit', 'Comment', 'Scale', 'Functions')
+COL_REGISTER, COL_TYPE, COL_UNIT, COL_COMMENT, COL_SCALE, COL_FUNCTIONS = range(len(COLUMNS))
+
+# sorts rows without a valid register after all others
+_LAST = float('inf')
+
+_MAX_VALUE = {'b': 0x7F, 'q': 0x7FFFFFFFFFFFFFFF}
+
+
+class _IntColumn:
+    """Non-negative ints; -1 where the text is not a number."""
+
+    def __init__(self, typecode: str = 'q'):
+        self.values = array(typecode)
+        self.max_value = _MAX_VALUE[typecode]
+        # text of cells that is not str(value)
+        self.raw: List[Optional[str]] = []
+
+    def _encode(self, text: str):
+        v = parse_register(text) if text else None
+        if v is None or not 0 <= v <= self.max_value:
+            return -1, text
+        return v, (None if text == str(v) else text)
+
+    def text(self, row: int) -> str:
+        raw = self.raw[row]
+        return str(self.values[row]) if raw is None else raw
+
+    def value(self, row: int) -> Optional[int]:
+        v = self.values[row]
+        return None if v < 0 else v
+
+    def set(self, row: int, text: str):
+        self.values[row], self.raw[row] = self._encode(text)
+
+    def insert(self, row: int, text: str):
+        v, raw = self._encode(text)
+        self.values.insert(row, v)
+        self.raw.insert(row, raw)
+
+    def extend(self, texts: Iterable[str]):
+        for text in texts:
+            v, raw = self._encode(text)
+            self.values.append(v)
+            self.raw.append(raw)
+
+    def delete(self, start: int, stop: int):
+        del self.values[start:stop]
+        del self.raw[start:stop]
+
+    def move(self, src: int, dst: int):
+        self.values.insert(dst, self.values.pop(src))
+        self.raw.insert(dst, self.raw.pop(src))
+
+    def take(self, order: Sequence[int]):
+        values, raw = self.values, self.raw
+        self.values = array(values.typecode, [values[i] for i in order])
+        self.raw = [raw[i] for i in order]
+
+    def clear(self):
+        self.values = array(self.values.typecode)
+        self.raw = []
+
+    def copy(self) -> '_IntColumn':
+        c = _IntColumn(self.values.typecode)
+        c.values = self.values[:]
+        c.raw = self.raw[:]
+        return c
+
+
+class _FloatColumn:
+    """Floats; NaN where the text is not a number."""
+
+    def __init__(self):
+        self.values = array('d')
+        # text of cells that is not repr(value)
+        self.raw: List[Optional[str]] = []
+
+    @staticmethod
+    def _encode(text: str):
+        try:
+            v = float(text)
+        except Exception:
+            return math.nan, text
+        if math.isnan(v):
+            return v, text
+        return v, (None if text == repr(v) else text)
+
+    def text(self, row: int) -> str:
+        raw = self.raw[row]
+        return repr(self.values[row]) if raw is None else raw
+
+    def value(self, row: int) -> Optional[float]:
+        v = self.values[row]
+        return None if math.isnan(v) else v
+
+    def set(self, row: int, text: str):
+        self.values[row], self.raw[row] = self._encode(text)
+
+    def insert(self, row: int, text: str):
+        v, raw = self._encode(text)
+        self.values.insert(row, v)
+        self.raw.insert(row, raw)
+
+    def extend(self, texts: Iterable[str]):
+        for text in texts:
+            v, raw = self._encode(text)
+            self.values.append(v)
+            self.raw.append(raw)
+
+    def delete(self, start: int, stop: int):
+        del self.values[start:stop]
+        del self.raw[start:stop]
+
+    def move(self, src: int, dst: int):
+        self.values.insert(dst, self.values.pop(src))
+        self.raw.insert(dst, self.raw.pop(src))
+
+    def take(self, order: Sequence[int]):
+        values, raw = self.values, self.raw
+        self.values = array('d', [values[i] for i in order])
+        self.raw = [raw[i] for i in order]
+
+    def clear(self):
+        self.values = array('d')
+        self.raw = []
+
+    def copy(self) -> '_FloatColumn':
+        c = _FloatColumn()
+        c.values = self.values[:]
+        c.raw = self.raw[:]
+        return c
+
+
+class _InternedColumn:
+    """Strings stored as ids into a pool of the distinct values."""
+
+    def __init__(self):
+        self.ids = array('I')
+        self.pool: List[str] = ['']
+        self._lookup: Dict[str, int] = {'': 0}
+
+    def intern(self, text: str) -> int:
+        i = self._lookup.get(text)
+        if i is None:
+            i = self._lookup[text] = len(self.pool)
+            self.pool.append(text)
+        return i
+
+    def text(self, row: int) -> str:
+        return self.pool[self.ids[row]]
+
+    def set(self, row: int, text: str):
+        self.ids[row] = self.intern(text)
+
+    def insert(self, row: int, text: str):
+        self.ids.insert(row, self.intern(text))
+
+    def extend(self, texts: Iterable[str]):
+        intern = self.intern
+        self.ids.extend(intern(t) for t in texts)
+
+    def delete(self, start: int, stop: int):
+        del self.ids[start:stop]
+
+    def move(self, src: int, dst: int):
+        self.ids.insert(dst, self.ids.pop(src))
+
+    def take(self, order: Sequence[int]):
+        ids = self.ids
+        self.ids = array('I', [ids[i] for i in order])
+
+    def clear(self):
+        # the pool is kept; it only grows by distinct values
+        self.ids = array('I')
+
+    def copy(self) -> '_InternedColumn':
+        c = _InternedColumn()
+        c.ids = self.ids[:]
+        c.pool = self.pool[:]
+        c._lookup = dict(self._lookup)
+        return c
+
+
+class _TextColumn:
+    """Free text, one string per row."""
+
+    def __init__(self):
+        self.values: List[str] = []
+
+    def text(self, row: int) -> str:
+        return self.values[row]
+
+    def set(self, row: int, text: str):
+        self.values[row] = text
+
+    def insert(self, row: int, text: str):
+        self.values.insert(row, text)
+
+    def extend(self, texts: Iterable[str]):
+        self.values.extend(texts)
+
+    def delete(self, start: int, stop: int):
+        del self.values[start:stop]
+
+    def move(self, src: int, dst: int):
+        self.values.insert(dst, self.values.pop(src))
+
+    def take(self, order: Sequence[int]):
+        values = self.values
+        self.values = [values[i] for i in order]
+
+    def clear(self):
+        self.values = []
+
+    def copy(self) -> '_TextColumn':
+        c = _TextColumn()
+        c.values = self.values[:]
+        return c
+
+
+def _cell(value) -> str:
+    return '' if value is None else str(value)
+
+
+def template_cells(tpl: dict) -> List[str]:
+    """Cell texts of a saved-table row (older files use Name and select)."""
+    return [
+        _cell(tpl.get('Address', '') or ''),
+        _cell(tpl.get('Type', '') or ''),
+        _cell(tpl.get('Unit', '') or ''),
+        _cell(tpl.get('Comment', '') or tpl.get('Name', '') or ''),
+        _cell(tpl.get('Scale', '') or ''),
+        _cell(tpl.get('Functions', '') or tpl.get('select', '') or ''),
+    ]
+
+
+# decimal comma, as in German spreadsheets and PDFs
+_DECIMAL_COMMA = re.compile(r'^[+-]?\d+,\d+$')
+
+
+def parse_cell_block(text: str, width: int = len(COLUMNS)) -> List[List[str]]:
+    """Rows of cell texts from a pasted block (Excel copies, CSV lines, ...).
+
+    Cells are separated by tabs, or by semicolons if the block has no tab;
+    quoted cells may hold separators. Blank lines are skipped, cells are
+    stripped and rows padded or cut to width, and a Faktor written with a
+    decimal comma gets a point.
+    """
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n')
+    delimiter = '\t' if '\t' in text else ';'
+    rows = []
+    for cells in csv.reader(io.StringIO(text), delimiter=delimiter):
+        cells = [c.strip() for c in cells[:width]]
+        if not any(cells):
+            continue
+        cells.extend([''] * (width - len(cells)))
+        if width > COL_SCALE and _DECIMAL_COMMA.match(cells[COL_SCALE]):
+            cells[COL_SCALE] = cells[COL_SCALE].replace(',', '.')
+        rows.append(cells)
+    return rows
+
+
+def _templates(columns: Sequence, rows: int) -> List[dict]:
+    return [{name: columns[c].text(r) for c, name in enumerate(COLUMNS)} for r in range(rows)]
+
+
+class TableSnapshot:
+    """Copy of the cells of a RegisterTable, to be read on another thread.
+
+    Taking it only copies the column arrays and lists, so it is cheap enough
+    for the GUI thread; templates() then builds the row dicts elsewhere.
+    """
+
+    def __init__(self, columns: Sequence, rows: int):
+        self.columns = tuple(c.copy() for c in columns)
+        self.rows = rows
+
+    def __len__(self):
+        return self.rows
+
+    def templates(self) -> List[dict]:
+        """All rows as saved-table dicts, in table order."""
+        return _templates(self.columns, self.rows)
+
+
+class RegisterTable:
+    """Rows of the Modbus template table, stored column by column."""
+
+    def __init__(self):
+        self.registers = _IntColumn('q')
+        self.types = _InternedColumn()
+        self.units = _InternedColumn()
+        self.comments = _TextColumn()
+        self.factors = _FloatColumn()
+        self.functions = _IntColumn('b')
+        self.columns = (self.registers, self.types, self.units, self.comments, self.factors, self.functions)
+        self._rows = 0
+        # stable row ids, in row order
+        self.row_ids = array('q')
+        self._next_id = 0
+        # register -> id of the row holding it, or a list of ids if several do
+        self._by_register: Dict[int, object] = {}
+        # registers held by more than one row
+        self._conflicts: Set[int] = set()
+        # row id -> row; rebuilt on demand after rows moved
+        self._positions: Optional[Dict[int, int]] = None
+        # called with (op, *args) after every change
+        self.journal: Optional[Callable[[tuple], None]] = None
+
+    def __len__(self):
+        return self._rows
+
+    def _log(self, *record):
+        if self.journal is not None:
+            self.journal(record)
+
+    # --- register index ---
+
+    def _index_add(self, reg: int, rid: int):
+        held = self._by_register.get(reg)
+        if held is None:
+            self._by_register[reg] = rid
+        elif isinstance(held, list):
+            held.append(rid)
+        else:
+            self._by_register[reg] = [held, rid]
+            self._conflicts.add(reg)
+
+    def _index_remove(self, reg: int, rid: int):
+        held = self._by_register.get(reg)
+        if not isinstance(held, list):
+            if held == rid:
+                del self._by_register[reg]
+            return
+        held.remove(rid)
+        if len(held) == 1:
+            self._by_register[reg] = held[0]
+            self._conflicts.discard(reg)
+
+    def _new_ids(self, count: int) -> range:
+        ids = range(self._next_id, self._next_id + count)
+        self._next_id += count
+        return ids
+
+    def _position(self, rid: int) -> int:
+        if self._positions is None:
+            self._positions = {r: i for i, r in enumerate(self.row_ids)}
+        return self._positions[rid]
+
+    def position(self, rid: int) -> Optional[int]:
+        """Row of the row with id rid; None if it was deleted."""
+        if self._positions is None:
+            self._positions = {r: i for i, r in enumerate(self.row_ids)}
+        return self._positions.get(rid)
+
+    def register_rows(self, reg: int) -> List[int]:
+        """Rows holding register reg, in row order."""
+        held = self._by_register.get(reg)
+        if held is None:
+            return []
+        if not isinstance(held, list):
+            return [self._position(held)]
+        return sorted(self._position(rid) for rid in held)
+
+    def register_used(self, reg: int, row: Optional[int] = None) -> bool:
+        """True if a row other than row holds register reg."""
+        held = self._by_register.get(reg)
+        if held is None:
+            return False
+        if isinstance(held, list):
+            return True
+        return row is None or held != self.row_ids[row]
+
+    def is_duplicate(self, row: int) -> bool:
+        """True if another row holds the register of row."""
+        reg = self.registers.value(row)
+        return reg is not None and reg in self._conflicts
+
+    @property
+    def conflict_count(self) -> int:
+        """Number of registers held by more than one row."""
+        return len(self._conflicts)
+
+    @property
+    def duplicate_row_count(self) -> int:
+        """Number of rows holding a register another row holds too."""
+        return sum(len(self._by_register[reg]) for reg in self._conflicts)
+
+    def conflicts(self) -> List[Tuple[int, List[int]]]:
+        """(register, rows holding it) for every register used more than once, by register."""
+        return [(reg, self.register_rows(reg)) for reg in sorted(self._conflicts)]
+
+    # --- cells ---
+
+    def text(self, row: int, col: int) -> str:
+        return self.columns[col].text(row)
+
+    def set_text(self, row: int, col: int, text: str):
+        self._log('set', row, col, text)
+        if col != COL_REGISTER:
+            self.columns[col].set(row, text)
+            return
+        rid = self.row_ids[row]
+        old = self.registers.value(row)
+        self.registers.set(row, text)
+        new = self.registers.value(row)
+        if old != new:
+            if old is not None:
+                self._index_remove(old, rid)
+            if new is not None:
+                self._index_add(new, rid)
+
+    def register(self, row: int) -> Optional[int]:
+        """Register of row as a number, None if the cell is empty or invalid."""
+        return self.registers.value(row)
+
+    def cells(self, row: int) -> List[str]:
+        return [c.text(row) for c in self.columns]
+
+    def insert(self, row: int, cells: Optional[Sequence[str]] = None):
+        """Insert a row before row (len(self) appends); missing cells are empty."""
+        cells = list(cells or ())
+        self._log('insert', row, cells)
+        for c, column in enumerate(self.columns):
+            column.insert(row, cells[c] if c < len(cells) else '')
+        rid = self._new_ids(1)[0]
+        self.row_ids.insert(row, rid)
+        reg = self.registers.value(row)
+        if reg is not None:
+            self._index_add(reg, rid)
+        if row == self._rows and self._positions is not None:
+            self._positions[rid] = row
+        else:
+            self._positions = None
+        self._rows += 1
+
+    def extend(self, rows: Iterable[Sequence[str]]):
+        """Append rows of cell texts (shorter rows are padded with empty cells)."""
+        rows = [list(r) for r in rows]
+        width = len(self.columns)
+        for r in rows:
+            if len(r) < width:
+                r.extend([''] * (width - len(r)))
+        self._log('extend', rows)
+        for c, column in enumerate(self.columns):
+            column.extend([r[c] for r in rows])
+        first = self._rows
+        ids = self._new_ids(len(rows))
+        self.row_ids.extend(ids)
+        regs = self.registers.values
+        for row, rid in enumerate(ids, first):
+            if regs[row] >= 0:
+                self._index_add(regs[row], rid)
+        self._positions = None
+        self._rows += len(rows)
+
+    def delete(self, start: int, stop: int):
+        """Remove rows start..stop-1."""
+        stop = min(stop, self._rows)
+        if start >= stop:
+            return
+        self._log('delete', start, stop)
+        regs = self.registers.values
+        for row in range(start, stop):
+            if regs[row] >= 0:
+                self._index_remove(regs[row], self.row_ids[row])
+        for column in self.columns:
+            column.delete(start, stop)
+        del self.row_ids[start:stop]
+        self._positions = None
+        self._rows -= stop - start
+
+    def clear(self):
+        self._log('clear')
+        for column in self.columns:
+            column.clear()
+        self.row_ids = array('q')
+        self._by_register = {}
+        self._conflicts = set()
+        self._positions = None
+        self._rows = 0
+
+    def load(self, templates: Iterable[dict]):
+        """Replace all rows by saved-table rows (dicts keyed by COLUMNS)."""
+        self.clear()
+        self.extend(template_cells(t) for t in templates if isinstance(t, dict))
+
+    def templates(self) -> List[dict]:
+        """All rows as saved-table dicts, in table order."""
+        return _templates(self.columns, self._rows)
+
+    def snapshot(self) -> TableSnapshot:
+        """Copy of the cells for reading on another thread (see TableSnapshot)."""
+        return TableSnapshot(self.columns, self._rows)
+
+    def _sort_key(self, row: int):
+        v = self.registers.values[row]
+        return v if v >= 0 else _LAST
+
+    def sorted_position(self, row: int) -> int:
+        """Row that row belongs at by register, given that all other rows are sorted.
+
+        Binary search over the other rows; rows without a valid register
+        belong after all others.
+        """
+        n = self._rows
+        k = self._sort_key(row)
+        if (row == 0 or self._sort_key(row - 1) <= k) and (row == n - 1 or k <= self._sort_key(row + 1)):
+            return row
+        lo, hi = 0, n - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # mid-th of the other rows
+            if self._sort_key(mid if mid < row else mid + 1) <= k:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def move(self, src: int, dst: int):
+        """Move row src so that it becomes row dst."""
+        if src == dst:
+            return
+        self._log('move', src, dst)
+        for column in self.columns:
+            column.move(src, dst)
+        self.row_ids.insert(dst, self.row_ids.pop(src))
+        self._positions = None
+
+    def register_order(self) -> Optional[List[int]]:
+        """Row order ascending by register (invalid last, stable); None if already sorted."""
+        regs = self.registers.values
+        keys = [v if v >= 0 else _LAST for v in regs]
+        if all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1)):
+            return None
+        return sorted(range(len(keys)), key=keys.__getitem__)
+
+    def take(self, order: Sequence[int]):
+        """Reorder the rows: new row i is old row order[i]."""
+        order = list(order)
+        self._log('take', order)
+        for column in self.columns:
+            column.take(order)
+        ids = self.row_ids
+        self.row_ids = array('q', [ids[i] for i in order])
+        self._positions = None
+
+
+def apply_record(table: RegisterTable, record: Sequence):
+    """Repeat a change that table.journal was called with."""
+    op, args = record[0], record[1:]
+    if op == 'set':
+        row, col, text = args
+        table.set_text(row, col, text)
+    elif op == 'insert':
+        table.insert(*args)
+    elif op == 'extend':
+        table.extend(args[0])
+    elif op == 'delete':
+        table.delete(*args)
+    elif op == 'move':
+        table.move(*args)
+    elif op == 'take':
+        table.take(args[0])
+    elif op == 'clear':
+        table.clear()
+    else:
+        raise ValueError(f"unknown journal record {op!r}")
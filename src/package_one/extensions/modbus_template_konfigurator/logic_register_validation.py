@@ -0,0 +1,211 @@
+"""Validity of the cells of a RegisterTable.
+
+A cell is invalid if its text is not empty and
+
+* Register: not a non-negative number (decimal or 0x..),
+* Datentyp: not one of DATATYPES (any case),
+* Faktor: not a float,
+* Modbus Funktionen: not one of MODBUS_FUNCTIONS.
+
+Modbus addresses are unsigned, so a negative register (e.g. -5) is invalid:
+it is marked when edited or pasted, and rejected_rows() skips its row on
+import.
+
+Rows holding a register that another row holds too count as an error in
+the Register column as well; that comes from the table's register index.
+
+RegisterValidator keeps a bitmap of the invalid columns per row, keyed by
+row id so sorting and moving rows leave it untouched. After an edit only
+the changed row is checked again (check_rows). validate_all() checks a
+whole table column by column on its compact storage: register and
+function cells are only looked at where the stored number is not valid,
+and each distinct datatype is checked once instead of once per row.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .logic_register_table import COL_FUNCTIONS, COL_REGISTER, COL_SCALE, COL_TYPE, COLUMNS, RegisterTable
+
+# supported datatypes, as offered in the Datentyp column
+DATATYPES = [
+    'INT8', 'UINT8',
+    'INT16 HL', 'INT16 LH', 'UINT16 HL', 'UINT16 LH',
+    'INT32 HL', 'INT32 LH', 'UINT32 HL', 'UINT32 LH',
+    'INT32 B0123', 'UINT32 B0123',
+    'INT48 HL', 'INT48 LH', 'UINT48 HL', 'UINT48 LH',
+    'INT48 B012345', 'UINT48 B012345',
+    'INT64 HL', 'INT64 LH', 'UINT64 HL', 'UINT64 LH',
+    'INT64 B01234567', 'UINT64 B01234567',
+    'FLOAT32 HL', 'FLOAT32 LH', 'FLOAT32 B0123',
+    'FLOAT64 HL', 'FLOAT64 LH', 'FLOAT64 B01234567',
+    'HEX8',
+    'HEX16 HL', 'HEX16 LH',
+    'HEX32 HL', 'HEX32 LH',
+    'HEX48 HL', 'HEX48 LH',
+    'HEX64 HL', 'HEX64 LH',
+]
+
+# allowed Modbus functions (1..4)
+MODBUS_FUNCTIONS = ['1', '2', '3', '4']
+
+_DATATYPES = frozenset(t.upper() for t in DATATYPES)
+_FUNCTIONS = frozenset(MODBUS_FUNCTIONS + [''])
+_FUNCTION_VALUES = frozenset(int(f) for f in MODBUS_FUNCTIONS)
+
+
+def datatype_ok(text: str) -> bool:
+    text = text.strip()
+    return not text or text.upper() in _DATATYPES
+
+
+def factor_ok(text: str) -> bool:
+    text = text.strip()
+    if not text:
+        return True
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+class RegisterValidator:
+    """Invalid cells of table, kept up to date row by row."""
+
+    def __init__(self, table: RegisterTable):
+        self.table = table
+        # row id -> bit mask (1 << column) of the invalid cells of the row
+        self.invalid: Dict[int, int] = {}
+        # number of set bits in invalid
+        self.cell_errors = 0
+
+    def row_mask(self, row: int) -> int:
+        """Invalid columns of row as a bit mask, checked from the cells (duplicates not included)."""
+        t = self.table
+        mask = 0
+        if t.registers.values[row] < 0 and t.registers.raw[row].strip():
+            mask |= 1 << COL_REGISTER
+        if not datatype_ok(t.types.text(row)):
+            mask |= 1 << COL_TYPE
+        if t.factors.values[row] != t.factors.values[row] and not factor_ok(t.factors.raw[row]):
+            mask |= 1 << COL_SCALE
+        if t.functions.text(row).strip() not in _FUNCTIONS:
+            mask |= 1 << COL_FUNCTIONS
+        return mask
+
+    def _set(self, rid: int, mask: int):
+        old = self.invalid.pop(rid, 0)
+        if mask:
+            self.invalid[rid] = mask
+        self.cell_errors += bin(mask).count('1') - bin(old).count('1')
+
+    def check_rows(self, rows: Iterable[int]):
+        """Check rows again after they changed or were inserted."""
+        ids = self.table.row_ids
+        for row in rows:
+            self._set(ids[row], self.row_mask(row))
+
+    def forget(self, start: int, stop: int):
+        """Drop rows start..stop-1 before they are deleted from the table."""
+        ids = self.table.row_ids
+        for row in range(start, min(stop, len(ids))):
+            self._set(ids[row], 0)
+
+    def validate_all(self):
+        """Check every row, one column at a time."""
+        t = self.table
+        n = len(t)
+        masks = [0] * n
+        # registers: only cells whose text did not parse
+        regs, raw = t.registers.values, t.registers.raw
+        bit = 1 << COL_REGISTER
+        for row in [r for r in range(n) if regs[r] < 0]:
+            if raw[row].strip():
+                masks[row] |= bit
+        # datatypes: each distinct text once
+        bad = {i for i, text in enumerate(t.types.pool) if not datatype_ok(text)}
+        if bad:
+            bit = 1 << COL_TYPE
+            for row, i in enumerate(t.types.ids):
+                if i in bad:
+                    masks[row] |= bit
+        # factors: NaN marks text that is empty or not a float
+        values, raw = t.factors.values, t.factors.raw
+        bit = 1 << COL_SCALE
+        for row in [r for r in range(n) if values[r] != values[r]]:
+            if not factor_ok(raw[row]):
+                masks[row] |= bit
+        # functions: cells holding one of the allowed numbers as is are fine
+        values, raw = t.functions.values, t.functions.raw
+        bit = 1 << COL_FUNCTIONS
+        for row in [r for r in range(n) if raw[r] is not None or values[r] not in _FUNCTION_VALUES]:
+            if t.functions.text(row).strip() not in _FUNCTIONS:
+                masks[row] |= bit
+        ids = t.row_ids
+        self.invalid = {ids[r]: m for r, m in enumerate(masks) if m}
+        self.cell_errors = sum(bin(m).count('1') for m in self.invalid.values())
+
+    def mask(self, row: int) -> int:
+        """Invalid columns of row, including the register if another row holds it too."""
+        m = self.invalid.get(self.table.row_ids[row], 0)
+        if self.table.is_duplicate(row):
+            m |= 1 << COL_REGISTER
+        return m
+
+    @property
+    def error_count(self) -> int:
+        """Invalid cells plus rows holding a duplicate register."""
+        return self.cell_errors + self.table.duplicate_row_count
+
+    def errors(self) -> List[Tuple[int, int]]:
+        """(row, mask) of every row with an error, in row order."""
+        t = self.table
+        rows: Dict[int, int] = {}
+        for rid, m in self.invalid.items():
+            row = t.position(rid)
+            if row is not None:
+                rows[row] = m
+        bit = 1 << COL_REGISTER
+        for _, held in t.conflicts():
+            for row in held:
+                rows[row] = rows.get(row, 0) | bit
+        return sorted(rows.items())
+
+    def next_error(self, row: int = -1, col: int = len(COLUMNS)) -> Optional[Tuple[int, int]]:
+        """First invalid cell after (row, col) in reading order, wrapping around; None if there is none."""
+        first = None
+        for r, m in self.errors():
+            for c in range(len(COLUMNS)):
+                if not m & (1 << c):
+                    continue
+                if first is None:
+                    first = (r, c)
+                if (r, c) > (row, col):
+                    return r, c
+        return first
+
+    def rejected_rows(self) -> List[Tuple[int, int]]:
+        """(row, column) of the rows to skip when importing the table, in row order.
+
+        A row is skipped if it has no valid register, repeats the register of
+        a row already accepted, or has an invalid cell; column is the first
+        offending one.
+        """
+        t = self.table
+        errors = dict(self.errors())
+        regs = t.registers.values
+        candidates = sorted(set(errors).union(r for r in range(len(t)) if regs[r] < 0))
+        other = ~(1 << COL_REGISTER)
+        rejected = []
+        seen = set()
+        for row in candidates:
+            m = errors.get(row, 0)
+            reg = t.registers.value(row)
+            if reg is None or reg in seen:
+                rejected.append((row, COL_REGISTER))
+            elif m & other:
+                m &= other
+                rejected.append((row, (m & -m).bit_length() - 1))
+            else:
+                seen.add(reg)
+        return rejected
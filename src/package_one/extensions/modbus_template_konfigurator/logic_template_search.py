@@ -0,0 +1,365 @@
+"""Fuzzy search over the saved tables and Modbus device templates.
+
+TemplateSearchIndex reads every JSON file in saved_tables/ and
+modbus_templates/ and indexes the words of the description, unit and
+datatype of every row (table rows and device RX entries) and the input text
+and file name of every template.
+
+A query word matches an indexed word exactly, as a prefix (while typing), as
+a substring, or by trigram similarity (typos). The vocabulary is much
+smaller than the number of rows, so the fuzzy comparison only runs over
+distinct words; their postings then give the rows. A row scores the average
+over the query words of the best match in the row or in its template's name,
+and templates are ranked by their best row.
+
+Files are re-read only when their mtime or size changed (see refresh).
+"""
+
+import json
+import os
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .logic_modbus_template import TEMPLATE_DIRS, scan_template_files, template_rows
+
+# weight of a word match per field
+FIELD_WEIGHTS = {'description': 1.0, 'input_text': 0.9, 'unit': 0.6, 'datatype': 0.6}
+
+# similarity of a word matched as prefix / substring; trigram matches scale below
+PREFIX_SIMILARITY = 0.9
+SUBSTRING_SIMILARITY = 0.8
+TRIGRAM_SIMILARITY = 0.75
+
+# smallest trigram (Dice) similarity counted as a fuzzy match
+MIN_TRIGRAM_DICE = 0.4
+
+# results below this score are dropped
+MIN_SCORE = 0.3
+
+# bonus when the whole query occurs in the description as typed
+PHRASE_BONUS = 0.25
+
+_WORD = re.compile(r'\w+')
+
+
+def words(text) -> List[str]:
+    """Lower-case words of text."""
+    return _WORD.findall(str(text or '').casefold())
+
+
+def _grams(word: str) -> set:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TemplateMatch:
+    """One ranked search result: a template and its best matching row."""
+
+    __slots__ = ('path', 'label', 'input_text', 'row', 'row_index', 'score')
+
+    def __init__(self, path: str, label: str, input_text: str, row: Optional[dict],
+                 row_index: int, score: float):
+        self.path = path
+        self.label = label
+        self.input_text = input_text
+        # matching row (None if only the template name matched)
+        self.row = row
+        self.row_index = row_index
+        self.score = score
+
+    def __repr__(self):
+        return f"TemplateMatch({self.label!r}, row={self.row_index}, score={self.score:.2f})"
+
+
+class TemplateSearchIndex:
+    """Word index over the rows of all template files in dirs."""
+
+    def __init__(self, dirs: Sequence[str] = TEMPLATE_DIRS):
+        self.dirs = tuple(os.path.normpath(d) for d in dirs)
+        self._clear()
+
+    def _clear(self):
+        # path -> (mtime_ns, size, template id)
+        self._files: Dict[str, Tuple[int, int, int]] = {}
+        # template id -> (path, label, input_text, rows, first entry id), None once the file changed
+        self.templates: List[Optional[tuple]] = []
+        self._live = 0
+        # row entries (consecutive per template): template id and the words of the description
+        self._entry_template = array('i')
+        self._entry_text: List[str] = []
+        # vocabulary
+        self._word_ids: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._word_grams: List[int] = []
+        self._gram_words: Dict[str, List[int]] = {}
+        # field text -> word ids; units, datatypes and many descriptions repeat
+        self._text_words: Dict[str, Tuple[int, ...]] = {}
+        # word id -> entry ids (description / unit or datatype) and template ids (input text, name)
+        self._description_postings: List[set] = []
+        self._other_postings: List[set] = []
+        self._template_postings: List[set] = []
+        # word id -> template ids with the word in a description / unit or datatype
+        self._description_templates: List[set] = []
+        self._other_templates: List[set] = []
+        # template id -> words of all descriptions, one row per line
+        self._template_text: List[str] = []
+
+    def __len__(self):
+        return self._live
+
+    def _word_id(self, word: str) -> int:
+        wid = self._word_ids.get(word)
+        if wid is None:
+            wid = len(self._words)
+            self._word_ids[word] = wid
+            self._words.append(word)
+            grams = _grams(word)
+            self._word_grams.append(len(grams))
+            for g in grams:
+                self._gram_words.setdefault(g, []).append(wid)
+            self._description_postings.append(set())
+            self._other_postings.append(set())
+            self._template_postings.append(set())
+            self._description_templates.append(set())
+            self._other_templates.append(set())
+        return wid
+
+    def _word_ids_of(self, text) -> Tuple[int, ...]:
+        text = str(text or '')
+        ids = self._text_words.get(text)
+        if ids is None:
+            ids = tuple(self._word_id(w) for w in dict.fromkeys(words(text)))
+            self._text_words[text] = ids
+        return ids
+
+    def _add_template(self, path: str, data) -> int:
+        rows, input_text = template_rows(data)
+        label = os.path.splitext(os.path.basename(path))[0]
+        tid = len(self.templates)
+        first = len(self._entry_template)
+        self.templates.append((path, label, input_text, rows, first))
+        self._live += 1
+        for wid in self._word_ids_of(input_text) + self._word_ids_of(label.replace('_', ' ')):
+            self._template_postings[wid].add(tid)
+        description_postings = self._description_postings
+        other_postings = self._other_postings
+        description_words = set()
+        other_words = set()
+        for eid, row in enumerate(rows, start=first):
+            description = row.get('Comment', '') or row.get('Name', '')
+            ids = self._word_ids_of(description)
+            self._entry_text.append(' '.join(self._words[wid] for wid in ids))
+            for wid in ids:
+                description_postings[wid].add(eid)
+            description_words.update(ids)
+            ids = self._word_ids_of(row.get('Unit', '')) + self._word_ids_of(row.get('Type', ''))
+            for wid in ids:
+                other_postings[wid].add(eid)
+            other_words.update(ids)
+        for wid in description_words:
+            self._description_templates[wid].add(tid)
+        for wid in other_words:
+            self._other_templates[wid].add(tid)
+        self._entry_template.extend([tid] * len(rows))
+        self._template_text.append('\n'.join(self._entry_text[first:]))
+        return tid
+
+    def _drop(self, path: str):
+        old = self._files.pop(path, None)
+        if old is not None:
+            self.templates[old[2]] = None
+            self._live -= 1
+
+    def refresh(self) -> bool:
+        """Re-read added and changed files, drop deleted ones; True if anything changed."""
+        found = scan_template_files(self.dirs)
+        changed = [p for p, sig in found.items() if self._files.get(p, (None, None))[:2] != sig]
+        removed = [p for p in self._files if p not in found]
+        if not changed and not removed:
+            return False
+        for path in removed + changed:
+            self._drop(path)
+        if len(self.templates) - self._live > max(16, self._live):
+            # mostly stale entries: start over
+            self._clear()
+            changed = list(found)
+        for path in changed:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception:
+                # unreadable or invalid JSON: not searchable until it changes
+                data = None
+            tid = self._add_template(path, data)
+            self._files[path] = found[path] + (tid,)
+        return True
+
+    def update_file(self, path: str):
+        """Re-read one template file after it was written or deleted."""
+        path = os.path.normpath(path)
+        if os.path.dirname(path) not in self.dirs:
+            return
+        self._drop(path)
+        try:
+            st = os.stat(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return
+        tid = self._add_template(path, data)
+        self._files[path] = (st.st_mtime_ns, st.st_size, tid)
+
+    def _similar_words(self, word: str) -> Dict[int, float]:
+        # word id -> similarity for vocabulary words matching one query word
+        result = {}
+        wid = self._word_ids.get(word)
+        if wid is not None:
+            result[wid] = 1.0
+        if len(word) < 3:
+            # too short for trigrams: prefixes only
+            for other, oid in self._word_ids.items():
+                if oid != wid and other.startswith(word):
+                    result[oid] = PREFIX_SIMILARITY
+            return result
+        grams = _grams(word)
+        shared = Counter()
+        for g in grams:
+            shared.update(self._gram_words.get(g, ()))
+        for oid, n in shared.items():
+            if oid == wid:
+                continue
+            other = self._words[oid]
+            if other.startswith(word):
+                result[oid] = PREFIX_SIMILARITY
+            elif word in other:
+                result[oid] = SUBSTRING_SIMILARITY
+            else:
+                dice = 2.0 * n / (len(grams) + self._word_grams[oid])
+                if dice >= MIN_TRIGRAM_DICE:
+                    result[oid] = TRIGRAM_SIMILARITY * dice
+        return result
+
+    def _levels(self, word: str) -> List[Tuple[float, Optional[set], set]]:
+        # (score, entry ids, template ids) for one query word, best score first.
+        # Entry ids None: a match in the template name or input text, which
+        # counts for every row of the template.
+        levels = []
+        weights = FIELD_WEIGHTS
+        for wid, sim in self._similar_words(word).items():
+            if self._description_postings[wid]:
+                levels.append((sim * weights['description'], self._description_postings[wid],
+                               self._description_templates[wid]))
+            if self._other_postings[wid]:
+                levels.append((sim * weights['unit'], self._other_postings[wid], self._other_templates[wid]))
+            if self._template_postings[wid]:
+                levels.append((sim * weights['input_text'], None, self._template_postings[wid]))
+        levels.sort(key=lambda level: -level[0])
+        return levels
+
+    def _bounds(self, per_word, phrase: Optional[str]) -> Dict[int, float]:
+        # template id -> best possible row score: every word counted at its
+        # best level anywhere in the template (same row or not)
+        totals: Dict[int, float] = {}
+        for levels in per_word:
+            best: Dict[int, float] = {}
+            for value, _, tids in levels:
+                new = tids.difference(best)
+                if new:
+                    best.update(dict.fromkeys(new, value))
+            for tid, value in best.items():
+                totals[tid] = totals.get(tid, 0.0) + value
+        n = len(per_word)
+        bounds = {}
+        for tid, total in totals.items():
+            tpl = self.templates[tid]
+            if tpl is None:
+                continue
+            bound = total / n
+            if phrase is not None and phrase in self._template_text[tid]:
+                bound += PHRASE_BONUS
+            bounds[tid] = bound
+        return bounds
+
+    def _best_row(self, tid: int, per_word, phrase: Optional[str]) -> Tuple[float, int]:
+        # (score, row index) of the best row of template tid; row -1 if it has no rows
+        path, label, input_text, rows, first = self.templates[tid]
+        relevant = [[(value, entries) for value, entries, tids in levels if tid in tids] for levels in per_word]
+        n = len(per_word)
+        if not rows:
+            return sum(value for levels in relevant for value, entries in levels[:1] if entries is None) / n, -1
+        best = (-1.0, -1)
+        for e in range(first, first + len(rows)):
+            total = 0.0
+            for levels in relevant:
+                for value, entries in levels:
+                    if entries is None or e in entries:
+                        total += value
+                        break
+            score = total / n
+            if phrase is not None and phrase in self._entry_text[e]:
+                score += PHRASE_BONUS
+            if score > best[0]:
+                best = (score, e - first)
+        return best
+
+    def search(self, query: str, limit: Optional[int] = 50) -> List[TemplateMatch]:
+        """Templates ranked by how well their best row matches query.
+
+        Templates are visited by an upper bound of their score (all words
+        matched anywhere in the template) and only their rows are scored
+        exactly, until no remaining template can reach the limit-th result.
+        """
+        query_words = list(dict.fromkeys(words(query)))
+        if not query_words:
+            return []
+        per_word = [self._levels(word) for word in query_words]
+        phrase = ' '.join(query_words) if len(query_words) > 1 else None
+        bounds = self._bounds(per_word, phrase)
+        order = sorted(bounds, key=lambda tid: (-bounds[tid], tid))
+        found = []   # (score, template id, row index)
+        kth = None
+        for tid in order:
+            if bounds[tid] < MIN_SCORE:
+                break
+            if kth is not None and bounds[tid] <= kth:
+                break
+            score, row_index = self._best_row(tid, per_word, phrase)
+            if score < MIN_SCORE:
+                continue
+            found.append((score, tid, row_index))
+            if limit is not None and len(found) >= limit:
+                found.sort(key=lambda item: (-item[0], item[1]))
+                del found[limit:]
+                kth = found[-1][0]
+        found.sort(key=lambda item: (-item[0], item[1]))
+        matches = []
+        for score, tid, row_index in found[:limit]:
+            path, label, input_text, rows, _ = self.templates[tid]
+            row = rows[row_index] if row_index >= 0 else None
+            matches.append(TemplateMatch(path, label, input_text, row, row_index, score))
+        return matches
+
+
+_default_index: Optional[TemplateSearchIndex] = None
+
+
+def default_index() -> TemplateSearchIndex:
+    """Shared index over TEMPLATE_DIRS, refreshed before it is returned."""
+    global _default_index
+    if _default_index is None:
+        _default_index = TemplateSearchIndex()
+    _default_index.refresh()
+    return _default_index
+
+
+def file_changed(path: str):
+    """Update the shared index, if it was built, after path was written or deleted."""
+    if _default_index is not None:
+        _default_index.update_file(path)
+
+
+def search_templates(query: str, limit: Optional[int] = 50) -> List[TemplateMatch]:
+    """Search the saved tables and device templates for query."""
+    return default_index().search(query, limit)
@@ -0,0 +1,140 @@
+"""Debounced autosave of a document to a file, written on a worker thread."""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer
+
+# changes within this window after the first one are written together
+AUTOSAVE_DELAY_MS = 500
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class AutosaveService(QObject):
+    """Write a document to path shortly after it changed.
+
+    mark_dirty() opens a short window; all changes made within it are
+    written once. snapshot() is called on the GUI thread and must return
+    a copy of the document that encode() turns into the file text on the
+    worker thread. A write is skipped if that text is what the file
+    already holds (as last read or written); either way written(document)
+    is called on the worker afterwards. Pending changes are written before
+    the application quits.
+    """
+
+    def __init__(self, path: str, snapshot: Callable[[], Any], encode: Callable[[Any], str],
+                 delay_ms: int = AUTOSAVE_DELAY_MS, written: Optional[Callable[[Any], None]] = None,
+                 parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._snapshot = snapshot
+        self._encode = encode
+        self._written = written
+        self.delay_ms = delay_ms
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='autosave')
+        self._pending: Optional[Future] = None
+        self._lock = threading.Lock()
+        # mark_dirty() bumps the generation; a write records the one it saved
+        self._generation = 0
+        self._saved_generation = 0
+        # digest of the file contents as last read or written
+        self._digest: Optional[bytes] = None
+        self.writes = 0
+        self.last_error: Optional[Exception] = None
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.flush)
+
+    @property
+    def dirty(self) -> bool:
+        with self._lock:
+            return self._generation != self._saved_generation
+
+    def mark_dirty(self, delay_ms: Optional[int] = None):
+        """The document changed; write it after the current window (or within delay_ms)."""
+        with self._lock:
+            self._generation += 1
+        if delay_ms is None:
+            delay_ms = self.delay_ms
+        if not self._timer.isActive() or self._timer.remainingTime() > delay_ms:
+            self._timer.start(delay_ms)
+
+    def mark_clean(self, data: Optional[bytes] = None):
+        """The document equals the file, e.g. right after loading it; data is the file content."""
+        with self._lock:
+            self._saved_generation = self._generation
+            if data is not None:
+                self._digest = _digest(data)
+
+    def _write(self, generation: int, document) -> bool:
+        # runs on the worker thread (or in flush)
+        try:
+            data = self._encode(document).encode('utf-8')
+            digest = _digest(data)
+            with self._lock:
+                unchanged = digest == self._digest
+            if not unchanged:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = self.path + '.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            with self._lock:
+                self._digest = digest
+                if generation > self._saved_generation:
+                    self._saved_generation = generation
+                if not unchanged:
+                    self.writes += 1
+            self.last_error = None
+            if self._written is not None:
+                self._written(document)
+            return not unchanged
+        except Exception as e:
+            self.last_error = e
+            return False
+
+    def _on_timeout(self):
+        if not self.dirty:
+            return
+        if self._pending is not None and not self._pending.done():
+            # the previous write is still running; try again after another window
+            self._timer.start(self.delay_ms)
+            return
+        with self._lock:
+            generation = self._generation
+        try:
+            document = self._snapshot()
+        except Exception as e:
+            self.last_error = e
+            return
+        self._pending = self._executor.submit(self._write, generation, document)
+
+    def flush(self):
+        """Write pending changes now and wait until the file is written."""
+        self._timer.stop()
+        if self._pending is not None:
+            try:
+                self._pending.result()
+            except Exception:
+                pass
+        if not self.dirty:
+            return
+        with self._lock:
+            generation = self._generation
+        try:
+            document = self._snapshot()
+        except Exception as e:
+            self.last_error = e
+            return
+        self._write(generation, document)
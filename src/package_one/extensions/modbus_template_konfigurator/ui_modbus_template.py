@@ -1,14 +1,22 @@
 """UI for Modbus Template Konfigurator."""
 
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSizePolicy, QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QMenu, QMessageBox, QFileDialog, QInputDialog, QDialog, QListWidget, QDialogButtonBox, QListWidgetItem
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSizePolicy, QLineEdit, QTableView, QHeaderView, QAbstractItemView, QMenu, QMessageBox, QFileDialog, QInputDialog, QDialog, QListWidget, QDialogButtonBox, QListWidgetItem
 import json
 import os
 import csv
 import datetime
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtWidgets import QStyledItemDelegate, QComboBox
-from PyQt6.QtGui import QFont, QPixmap
-from .logic_modbus_template import ModbusTemplateManager
+from PyQt6.QtWidgets import QStyledItemDelegate, QComboBox, QApplication
+from PyQt6.QtGui import QFont, QPixmap, QKeySequence, QAction
+from .logic_modbus_template import ModbusTemplateManager, parse_register, template_rows
+from .ui_register_model import RegisterTableModel
+from .logic_register_table import RegisterTable, parse_cell_block
+from .logic_register_validation import DATATYPES, MODBUS_FUNCTIONS, RegisterValidator, datatype_ok, factor_ok
+from .ui_autosave import AutosaveService
+from .logic_journal import COMPACT_DELAY_MS, COMPACT_SIZE, COMPACT_SOON_MS, EditJournal
+from .logic_template_search import default_index as default_template_index, file_changed as template_file_changed
+from .logic_register_index import KIND_TX, default_index as default_register_index, \
+    file_changed as register_file_changed, parse_register_range
 from package_one.main import get_language, get_settings_default_language, get_available_languages
 
 
@@ -93,6 +101,8 @@ def get_widget(translation=None, *args, **kwargs):
     except Exception:
         pass
     file_actions['load_template'] = file_menu.addAction(_lbl('file_load_from_template'))
+    file_actions['search_templates'] = file_menu.addAction(_lbl('file_search_templates'))
+    file_actions['search_register'] = file_menu.addAction(_lbl('file_search_register'))
     try:
         file_menu.addSeparator()
     except Exception:
@@ -107,6 +117,7 @@ def get_widget(translation=None, *args, **kwargs):
     try:
         import_actions['csv'] = io_menu.addAction(_lbl('import_csv'))
         import_actions['json'] = io_menu.addAction(_lbl('import_json'))
+        import_actions['clipboard'] = io_menu.addAction(_lbl('import_clipboard'))
         io_menu.addSeparator()
         export_actions['csv'] = io_menu.addAction(_lbl('export_csv'))
         export_actions['json'] = io_menu.addAction(_lbl('export_json'))
@@ -216,7 +227,9 @@ def get_widget(translation=None, *args, **kwargs):
     tb_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
     opt1 = QPushButton(_lbl('toolbar_opt1'))
     opt2 = QPushButton(_lbl('toolbar_opt2'))
-    for b in (opt1, opt2):
+    opt_conflicts = QPushButton(_lbl('toolbar_conflicts'))
+    opt_errors = QPushButton(_lbl('toolbar_errors'))
+    for b in (opt1, opt2, opt_conflicts, opt_errors):
         b.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
         try:
             b.setFixedWidth(135)
@@ -238,6 +251,8 @@ def get_widget(translation=None, *args, **kwargs):
         top_widgets['toolbar_buttons'] = {
             'opt1': opt1,
             'opt2': opt2,
+            'conflicts': opt_conflicts,
+            'errors': opt_errors,
         }
 
     # Input field under the toolbar
@@ -253,9 +268,8 @@ def get_widget(translation=None, *args, **kwargs):
 
     # (save connection will be established after save_to_file is defined)
 
-    # Table unter dem Eingabefeld
-    table = QTableWidget()
-    table.setColumnCount(6)
+    # Table unter dem Eingabefeld: a view over a columnar model (see logic_register_table)
+    table = QTableView()
     # header labels are loaded from names.json via _lbl defined earlier
 
     headers = [
@@ -266,8 +280,8 @@ def get_widget(translation=None, *args, **kwargs):
         _lbl('col_faktor'),      # Faktor
         _lbl('col_modbus_funktionen'),  # Modbus Funktionen
     ]
-    table.setHorizontalHeaderLabels(headers)
-    table.setRowCount(0)
+    model = RegisterTableModel(headers, table)
+    table.setModel(model)
     table.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
     # improve visual differentiation: alternating rows, row selection and grid
     try:
@@ -286,11 +300,11 @@ def get_widget(translation=None, *args, **kwargs):
     # apply QSS to make individual cells visually distinct
     try:
         table.setStyleSheet('''
-            QTableWidget { gridline-color: white; background-color: #ffffff; color: #000000; }
-            QTableWidget::item { border-bottom: 1px solid white; padding: 6px; color: #000000; }
+            QTableView { gridline-color: white; background-color: #ffffff; color: #000000; }
+            QTableView::item { border-bottom: 1px solid white; padding: 6px; color: #000000; }
             QHeaderView::section { background-color: #000000; color: #ffffff; padding: 6px; border: 1px solid white; }
-            QTableWidget::item:selected { background: #dcdcdc; color: #000000; }
-            QTableWidget::item:selected:!active { background: #dcdcdc; color: #000000; }
+            QTableView::item:selected { background: #dcdcdc; color: #000000; }
+            QTableView::item:selected:!active { background: #dcdcdc; color: #000000; }
         ''')
     except Exception:
         pass
@@ -314,30 +328,15 @@ def get_widget(translation=None, *args, **kwargs):
                 hh.setStretchLastSection(True)
         except Exception:
             pass
+    # all rows share one height, so the view never measures rows it does not show
+    try:
+        vh = table.verticalHeader()
+        vh.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    except Exception:
+        pass
     layout.addWidget(table, stretch=1)
 
-    # Allowed datatypes and autocomplete delegate for the Datentyp column
-    DATATYPES = [
-        'INT8', 'UINT8',
-        'INT16 HL', 'INT16 LH', 'UINT16 HL', 'UINT16 LH',
-        'INT32 HL', 'INT32 LH', 'UINT32 HL', 'UINT32 LH',
-        'INT32 B0123', 'UINT32 B0123',
-        'INT48 HL', 'INT48 LH', 'UINT48 HL', 'UINT48 LH',
-        'INT48 B012345', 'UINT48 B012345',
-        'INT64 HL', 'INT64 LH', 'UINT64 HL', 'UINT64 LH',
-        'INT64 B01234567', 'UINT64 B01234567',
-        'FLOAT32 HL', 'FLOAT32 LH', 'FLOAT32 B0123',
-        'FLOAT64 HL', 'FLOAT64 LH', 'FLOAT64 B01234567',
-        'HEX8',
-        'HEX16 HL', 'HEX16 LH',
-        'HEX32 HL', 'HEX32 LH',
-        'HEX48 HL', 'HEX48 LH',
-        'HEX64 HL', 'HEX64 LH',
-    ]
-
-    # allowed Modbus functions (1..4)
-    MODBUS_FUNCTIONS = ['1', '2', '3', '4']
-
+    # autocomplete delegate for the Datentyp column (DATATYPES) and Modbus functions
     class DatatypeDelegate(QStyledItemDelegate):
         def __init__(self, parent=None, values=None):
             super().__init__(parent)
@@ -428,13 +427,19 @@ def get_widget(translation=None, *args, **kwargs):
                 pass
 
     # validate entries after edits
-    def _validate_cell(item):
+    def _clear_cell(row, col):
         try:
-            if item is None:
-                return
-            col = item.column()
-            val = (item.text() or '').strip()
+            model.set_text(row, col, '')
+        except Exception:
+            pass
+
+    def _validate_cell(row, col):
+        try:
+            val = model.text(row, col).strip()
             if not val:
+                if col == 0:
+                    # rows without a register belong at the end
+                    _place_row(row)
                 return
             if col == 1:
                 # Datentyp column
@@ -442,238 +447,143 @@ def get_widget(translation=None, *args, **kwargs):
                 try:
                     up = val.upper()
                     if up != val:
-                        try:
-                            table.blockSignals(True)
-                            item.setText(up)
-                        finally:
-                            try:
-                                table.blockSignals(False)
-                            except Exception:
-                                pass
+                        model.set_text(row, col, up)
                         val = up
                 except Exception:
                     pass
 
-                ok = any(val.lower() == t.lower() for t in DATATYPES)
-                if not ok:
+                if not datatype_ok(val):
                     show_top_right_popup(f"Datentyp '{val}' wird nicht unterstützt")
-                    try:
-                        table.blockSignals(True)
-                        item.setText('')
-                    finally:
-                        try:
-                            table.blockSignals(False)
-                        except Exception:
-                            pass
+                    _clear_cell(row, col)
             elif col == 5:
                 # Modbus functions column (must be '1'..'4')
                 ok = val in MODBUS_FUNCTIONS
                 if not ok:
                     show_top_right_popup("ungültige Modbus Funktion")
-                    try:
-                        table.blockSignals(True)
-                        item.setText('')
-                    finally:
-                        try:
-                            table.blockSignals(False)
-                        except Exception:
-                            pass
+                    _clear_cell(row, col)
             elif col == 0:
-                # Register column: accept decimal integers or hex (0x...) and disallow duplicates
-                try:
-                    if isinstance(val, str) and val.lower().startswith('0x'):
-                        num = int(val, 16)
-                    else:
-                        num = int(val)
-                    # check for duplicates in other rows
-                    for rr in range(table.rowCount()):
-                        if rr == item.row():
-                            continue
-                        other_txt = _safe_text(rr, 0)
-                        if not other_txt:
-                            continue
-                        try:
-                            if isinstance(other_txt, str) and other_txt.lower().startswith('0x'):
-                                other_num = int(other_txt, 16)
-                            else:
-                                other_num = int(other_txt)
-                        except Exception:
-                            # ignore unparsable other rows
-                            continue
-                        if other_num == num:
-                            show_top_right_popup('Doppelter Registerwert nicht erlaubt')
-                            try:
-                                table.blockSignals(True)
-                                item.setText('')
-                            finally:
-                                try:
-                                    table.blockSignals(False)
-                                except Exception:
-                                    pass
-                            return
-                except Exception:
+                # Register column: accept non-negative decimal integers or hex (0x...) and disallow duplicates
+                num = parse_register(val)
+                if num is None or num < 0:
                     show_top_right_popup("Ungültiger Registerwert")
-                    try:
-                        table.blockSignals(True)
-                        item.setText('')
-                    finally:
-                        try:
-                            table.blockSignals(False)
-                        except Exception:
-                            pass
-                else:
-                    # if parsing succeeded and no duplicates, keep table sorted
-                    try:
-                        sort_table_by_register()
-                    except Exception:
-                        try:
-                            save_to_file()
-                        except Exception:
-                            pass
+                    _clear_cell(row, col)
+                # check for duplicates in other rows (hash index of the store)
+                elif model.store.register_used(num, row):
+                    show_top_right_popup('Doppelter Registerwert nicht erlaubt')
+                    _clear_cell(row, col)
+                # keep table sorted: the edited row moves to its place, rows
+                # without a register (like cleared ones) go to the end
+                _place_row(row)
             elif col == 4:
                 # Faktor column: must be float
-                try:
-                    float(val)
-                except Exception:
+                if not factor_ok(val):
                     show_top_right_popup("Ungültiger Faktor")
-                    try:
-                        table.blockSignals(True)
-                        item.setText('')
-                    finally:
-                        try:
-                            table.blockSignals(False)
-                        except Exception:
-                            pass
+                    _clear_cell(row, col)
         except Exception:
             pass
 
-    table.itemChanged.connect(_validate_cell)
+    model.edited.connect(_validate_cell)
 
     # safe text helper available to other nested handlers
     def _safe_text(row_idx, col_idx):
-        try:
-            it = table.item(row_idx, col_idx)
-            return it.text() if it is not None else ''
-        except Exception:
-            return ''
+        return model.text(row_idx, col_idx)
 
 
-    def _parse_register_value(txt):
-        """Parse register text (supports hex 0x.. and decimal). Returns int or None."""
+    def _place_row(row):
+        """Move one row to its place by register; the other rows are already sorted."""
         try:
-            if isinstance(txt, str) and txt.lower().startswith('0x'):
-                return int(txt, 16)
-            return int(str(txt))
+            return model.place_row(row)
         except Exception:
-            return None
-
+            model.sort_by_register()
+            return row
 
     def sort_table_by_register():
-        """Reorder table rows ascending by numeric register (column 0)."""
+        """Reorder table rows ascending by numeric register (column 0); used after loads and imports."""
         try:
-            rows = []
-            for r in range(table.rowCount()):
-                # capture full row as list of texts
-                row_vals = [ _safe_text(r, c) for c in range(table.columnCount()) ]
-                reg_num = _parse_register_value(row_vals[0])
-                # use large sentinel for unparsable to push to end
-                key = reg_num if reg_num is not None else float('inf')
-                rows.append((key, row_vals))
-
-            rows.sort(key=lambda x: x[0])
-
-            # repopulate table in sorted order
-            table.blockSignals(True)
-            table.setRowCount(0)
-            for i, (_k, vals) in enumerate(rows):
-                table.insertRow(i)
-                for c, v in enumerate(vals):
-                    table.setItem(i, c, QTableWidgetItem(str(v)))
-            table.blockSignals(False)
-            try:
-                save_to_file()
-            except Exception:
-                pass
+            model.sort_by_register()
         except Exception:
-            try:
-                table.blockSignals(False)
-            except Exception:
-                pass
+            pass
+        try:
+            save_to_file()
+        except Exception:
+            pass
 
     # path for last template file in Data
     data_path = os.path.normpath(os.path.join(os.path.dirname(__file__), 'last_Modbus_Template.json'))
 
+    # every change of the table is journaled right away; data_path is a snapshot
+    # of the journal, compacted in the background
+    journal = EditJournal(data_path)
+
+    def _snapshot():
+        # taken on the GUI thread: copies the table columns, no row dicts yet
+        return model.store.snapshot(), journal.input_text or '', journal.rotate(), journal.id
+
+    def _encode(snapshot):
+        # runs on the autosave thread
+        rows, input_text, seq, journal_id = snapshot
+        payload = {'templates': rows.templates(), 'last_used': None, 'input_text': input_text,
+                   'journal_seq': seq, 'journal_id': journal_id}
+        return json.dumps(payload, ensure_ascii=False, indent=2)
+
+    autosave = AutosaveService(data_path, _snapshot, _encode, delay_ms=COMPACT_DELAY_MS,
+                               written=lambda snapshot: journal.discard(snapshot[2]), parent=widget)
+    if isinstance(top_widgets, dict):
+        top_widgets['autosave'] = autosave
+        top_widgets['journal'] = journal
+
     def save_to_file():
+        """Journal the input text and schedule compacting the journal into data_path."""
         try:
-            rows = []
-            for r in range(table.rowCount()):
-                # read each cell safely
-                def _safe_text(row_idx, col_idx):
-                    try:
-                        it = table.item(row_idx, col_idx)
-                        return it.text() if it is not None else ''
-                    except Exception:
-                        return ''
-
-                row = {
-                    'Address': _safe_text(r, 0),
-                    'Type': _safe_text(r, 1),
-                    'Unit': _safe_text(r, 2),
-                    'Comment': _safe_text(r, 3),
-                    'Scale': _safe_text(r, 4),
-                    'Functions': _safe_text(r, 5),
-                }
-                rows.append(row)
-            # include current input field text
-            payload = {'templates': rows, 'last_used': None, 'input_text': input_field.text() if input_field is not None else ''}
-            os.makedirs(os.path.dirname(data_path), exist_ok=True)
-            with open(data_path, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
+            journal.input_changed(input_field.text() if input_field is not None else '')
+            autosave.mark_dirty(COMPACT_SOON_MS if journal.size > COMPACT_SIZE else None)
         except Exception:
             pass
 
     def load_from_file():
-        if not os.path.exists(data_path):
-            return False
+        # replay the last snapshot plus the edits journaled after it
+        model.store.journal = None
         try:
-            with open(data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            templates = data.get('templates') or []
-            table.blockSignals(True)
-            table.setRowCount(0)
-            for i, tpl in enumerate(templates):
-                table.insertRow(i)
-                table.setItem(i, 0, QTableWidgetItem(str(tpl.get('Address', '') or '')))
-                table.setItem(i, 1, QTableWidgetItem(str(tpl.get('Type', '') or '')))
-                table.setItem(i, 2, QTableWidgetItem(str(tpl.get('Unit', '') or '')))
-                # map older 'Name' to Description/Comment if present
-                descr = tpl.get('Comment', '') or tpl.get('Name', '')
-                table.setItem(i, 3, QTableWidgetItem(str(descr or '')))
-                table.setItem(i, 4, QTableWidgetItem(str(tpl.get('Scale', '') or '')))
-                table.setItem(i, 5, QTableWidgetItem(str(tpl.get('Functions', '') or tpl.get('select', '') or '')))
-            # restore input field text if present
+            raw = None
+            if os.path.exists(data_path):
+                with open(data_path, 'rb') as f:
+                    raw = f.read()
+            # older files use 'Name' for the description (handled by the model)
+            found, input_text, applied, clean = model.reload(lambda store: journal.replay(store, raw))
+            if not found:
+                return False
             try:
-                input_field.setText(str(data.get('input_text', '') or ''))
+                input_field.setText(input_text)
             except Exception:
                 pass
-            table.blockSignals(False)
+            if not clean:
+                # records were dropped (or the file has no journal yet): snapshot what
+                # could be replayed, then start a new journal
+                autosave.mark_dirty()
+                autosave.flush()
+                if autosave.last_error is None:
+                    journal.reset()
+            elif applied:
+                autosave.mark_dirty()
+            elif raw is not None:
+                # the file holds exactly this; the save after sorting is skipped unless the order changed
+                autosave.mark_clean(raw)
+            model.store.journal = journal.append
             try:
                 sort_table_by_register()
             except Exception:
                 pass
             return True
         except Exception:
-            try:
-                table.blockSignals(False)
-            except Exception:
-                pass
             return False
+        finally:
+            model.store.journal = journal.append
 
     # Connect File menu actions now that save/load are available
     try:
         def _new_table_action():
             try:
-                table.setRowCount(0)
+                model.clear()
                 try:
                     input_field.setText('')
                 except Exception:
@@ -723,7 +633,7 @@ def get_widget(translation=None, *args, **kwargs):
 
                 # if current table has rows, ask to clear first
                 try:
-                    if table.rowCount() > 0:
+                    if model.rowCount() > 0:
                         ans = QMessageBox.question(widget, _lbl('file_load_from_template'), 'Aktuelle Tabelle löschen?', QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
                         if ans != QMessageBox.StandardButton.Yes:
                             return
@@ -733,104 +643,14 @@ def get_widget(translation=None, *args, **kwargs):
                 with open(sel_path, 'r', encoding='utf-8') as fh:
                     d = json.load(fh)
 
-                # Support both legacy 'templates' format and exported 'device' format
-                templates = d.get('templates') or []
-                if not templates and isinstance(d, dict) and d.get('device'):
-                    dev = d.get('device') or {}
-                    rx = dev.get('RX') or dev.get('rx') or []
-                    tx = dev.get('TX') or dev.get('tx') or []
+                # legacy 'templates' files and exported 'device' files
+                templates, input_text_val = template_rows(d)
 
-                    # build mapping addr -> function from TX blocks
-                    tx_map = {}
-                    try:
-                        for t in tx:
-                            if not isinstance(t, dict):
-                                continue
-                            try:
-                                func = int(t.get('function', t.get('Function', 3)))
-                            except Exception:
-                                func = 3
-                            start = t.get('start')
-                            length = t.get('length', 1)
-                            try:
-                                if start is None:
-                                    continue
-                                if isinstance(start, str) and str(start).lower().startswith('0x'):
-                                    start_i = int(str(start), 16)
-                                else:
-                                    start_i = int(str(start))
-                                length_i = int(str(length))
-                            except Exception:
-                                continue
-                            for addr in range(start_i, start_i + max(1, length_i)):
-                                tx_map[addr] = func
-                    except Exception:
-                        tx_map = {}
-
-                    # normalize RX entries into template-like dicts
-                    norm = []
-                    for e in rx:
-                        try:
-                            if not isinstance(e, dict):
-                                continue
-                            reg = e.get('register', '')
-                            func_val = ''
-                            reg_int = None
-                            try:
-                                if isinstance(reg, str) and str(reg).lower().startswith('0x'):
-                                    reg_int = int(reg, 16)
-                                else:
-                                    reg_int = int(reg)
-                            except Exception:
-                                reg_int = None
-
-                            if reg_int is not None and reg_int in tx_map:
-                                func_val = str(tx_map.get(reg_int, ''))
-                            else:
-                                func_val = str(e.get('select', '') or '')
-
-                            norm.append({
-                                'Address': reg,
-                                'Type': e.get('format', ''),
-                                'Unit': e.get('unit', ''),
-                                'Comment': e.get('description', ''),
-                                'Scale': e.get('factor', ''),
-                                'Functions': func_val,
-                            })
-                        except Exception:
-                            continue
-                    templates = norm
-
-                table.blockSignals(True)
-                table.setRowCount(0)
-                for i, tpl in enumerate(templates):
-                    table.insertRow(i)
-                    table.setItem(i, 0, QTableWidgetItem(str(tpl.get('Address', '') or '')))
-                    table.setItem(i, 1, QTableWidgetItem(str(tpl.get('Type', '') or '')))
-                    table.setItem(i, 2, QTableWidgetItem(str(tpl.get('Unit', '') or '')))
-                    descr = tpl.get('Comment', '') or tpl.get('Name', '')
-                    table.setItem(i, 3, QTableWidgetItem(str(descr or '')))
-                    table.setItem(i, 4, QTableWidgetItem(str(tpl.get('Scale', '') or '')))
-                    table.setItem(i, 5, QTableWidgetItem(str(tpl.get('Functions', '') or tpl.get('select', '') or '')))
-                table.blockSignals(False)
+                model.set_templates(templates)
                 try:
-                    # prefer explicit input_text in file, fall back to device Type if present
-                    input_text_val = ''
-                    try:
-                        input_text_val = str(d.get('input_text', '') or '')
-                    except Exception:
-                        input_text_val = ''
-                    if not input_text_val and isinstance(d, dict) and d.get('device'):
-                        try:
-                            input_text_val = str((d.get('device') or {}).get('Type', '') or '')
-                        except Exception:
-                            input_text_val = ''
                     input_field.setText(input_text_val)
                 except Exception:
-                    try:
-                        input_field.setText('')
-                    except Exception:
-                        pass
+                    pass
                 try:
                     sort_table_by_register()
                 except Exception:
@@ -838,6 +658,140 @@ def get_widget(translation=None, *args, **kwargs):
             except Exception:
                 QMessageBox.warning(widget, _lbl('file_load_from_template'), 'Fehler beim Laden')
 
+        def _search_templates_action():
+            # fuzzy search over saved tables and device templates; load the chosen one
+            title = _lbl('file_search_templates')
+            try:
+                index = default_template_index()
+            except Exception:
+                QMessageBox.warning(widget, title, 'Fehler beim Lesen der Templates')
+                return
+
+            dlg = QDialog(widget)
+            dlg.setWindowTitle(title)
+            dlg.resize(640, 420)
+            dlg_layout = QVBoxLayout(dlg)
+            dlg_layout.setContentsMargins(8, 8, 8, 8)
+            query_edit = QLineEdit(dlg)
+            query_edit.setPlaceholderText('Beschreibung, Einheit, Datentyp oder Name, z. B. Wirkleistung L1')
+            dlg_layout.addWidget(query_edit)
+            lw = QListWidget(dlg)
+            dlg_layout.addWidget(lw)
+            status = QLabel(f"{len(index)} Templates", dlg)
+            dlg_layout.addWidget(status)
+            btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            dlg_layout.addWidget(btns)
+            btns.accepted.connect(dlg.accept)
+            btns.rejected.connect(dlg.reject)
+            results = []
+
+            def _run_query(text):
+                try:
+                    results[:] = index.search(text)
+                except Exception:
+                    results[:] = []
+                lw.clear()
+                for m in results:
+                    if m.row is not None:
+                        r = m.row
+                        descr = r.get('Comment', '') or r.get('Name', '')
+                        details = ' '.join(str(v) for v in (r.get('Type', ''), r.get('Unit', '')) if v)
+                        label = f"{m.label} — {descr} [{r.get('Address', '')}] {details}".rstrip()
+                    else:
+                        label = f"{m.label} — {m.input_text}" if m.input_text else m.label
+                    QListWidgetItem(label, lw)
+                if results:
+                    lw.setCurrentRow(0)
+                status.setText(f"{len(results)} Treffer" if text.strip() else f"{len(index)} Templates")
+
+            query_edit.textChanged.connect(_run_query)
+            query_edit.returnPressed.connect(dlg.accept)
+            lw.itemActivated.connect(lambda *_: dlg.accept())
+            if dlg.exec() != QDialog.DialogCode.Accepted:
+                return
+            pos = lw.currentRow()
+            if pos < 0 or pos >= len(results):
+                return
+            match = results[pos]
+
+            try:
+                if model.rowCount() > 0:
+                    ans = QMessageBox.question(widget, title, 'Aktuelle Tabelle löschen?', QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+                    if ans != QMessageBox.StandardButton.Yes:
+                        return
+            except Exception:
+                pass
+            try:
+                with open(match.path, 'r', encoding='utf-8') as fh:
+                    templates, input_text_val = template_rows(json.load(fh))
+            except Exception:
+                QMessageBox.warning(widget, title, 'Fehler beim Laden')
+                return
+
+            model.set_templates(templates)
+            try:
+                input_field.setText(input_text_val)
+            except Exception:
+                pass
+            try:
+                sort_table_by_register()
+            except Exception:
+                pass
+            # show the row that matched
+            if match.row is not None:
+                wanted = parse_register(match.row.get('Address', ''))
+                found = model.store.register_rows(wanted) if wanted is not None else []
+                if found:
+                    table.selectRow(found[0])
+                    table.scrollTo(model.index(found[0], 0), QAbstractItemView.ScrollHint.PositionAtCenter)
+
+        def _templates_changed(path):
+            # keep the search and register indexes in step with a saved or deleted file
+            for notify in (template_file_changed, register_file_changed):
+                try:
+                    notify(path)
+                except Exception:
+                    pass
+
+        def _search_register_action():
+            # which templates define a register (or touch a register range)?
+            title = _lbl('file_search_register')
+            text, ok = QInputDialog.getText(widget, title, 'Register oder Bereich (z. B. 0x3000 oder 0x3000-0x30FF):')
+            if not ok or not text.strip():
+                return
+            bounds = parse_register_range(text)
+            if bounds is None:
+                QMessageBox.warning(widget, title, f"Ungültiges Register: {text}")
+                return
+            try:
+                ranges = default_register_index().overlapping(*bounds)
+            except Exception:
+                QMessageBox.warning(widget, title, 'Fehler beim Lesen der Templates')
+                return
+            lo, hi = bounds
+            what = f"0x{lo:04X}" if lo == hi else f"0x{lo:04X}-0x{hi:04X}"
+            if not ranges:
+                QMessageBox.information(widget, title, f"Kein Template verwendet {what}")
+                return
+
+            dlg = QDialog(widget)
+            dlg.setWindowTitle(f"{title} {what}")
+            dlg.resize(640, 420)
+            dlg_layout = QVBoxLayout(dlg)
+            dlg_layout.setContentsMargins(8, 8, 8, 8)
+            templates = {r.path for r in ranges}
+            dlg_layout.addWidget(QLabel(f"{len(ranges)} Einträge in {len(templates)} Templates", dlg))
+            lw = QListWidget(dlg)
+            dlg_layout.addWidget(lw)
+            for r in ranges:
+                where = f"TX {r.index + 1}" if r.kind == KIND_TX else f"Zeile {r.index + 1}"
+                span = f"0x{r.start:04X}" if r.start == r.end else f"0x{r.start:04X}-0x{r.end:04X}"
+                QListWidgetItem(f"{os.path.splitext(os.path.basename(r.path))[0]} — {where} [{span}] {r.label}".rstrip(), lw)
+            btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+            btns.rejected.connect(dlg.reject)
+            dlg_layout.addWidget(btns)
+            dlg.exec()
+
         def _save_action():
             try:
                 # use the input_field text as filename; require non-empty
@@ -864,16 +818,7 @@ def get_widget(translation=None, *args, **kwargs):
                     return
 
                 # build payload from current table
-                rows = []
-                for r in range(table.rowCount()):
-                    rows.append({
-                        'Address': _safe_text(r, 0),
-                        'Type': _safe_text(r, 1),
-                        'Unit': _safe_text(r, 2),
-                        'Comment': _safe_text(r, 3),
-                        'Scale': _safe_text(r, 4),
-                        'Functions': _safe_text(r, 5),
-                    })
+                rows = model.templates()
 
                 payload = {'templates': rows, 'last_used': None, 'input_text': input_field.text() if input_field is not None else ''}
 
@@ -897,6 +842,7 @@ def get_widget(translation=None, *args, **kwargs):
                 except Exception:
                     QMessageBox.warning(widget, _lbl('file_save'), 'Fehler beim Schreiben der Datei')
                     return
+                _templates_changed(fn)
 
                 # also persist current working file as last_Modbus_Template
                 try:
@@ -968,76 +914,8 @@ def get_widget(translation=None, *args, **kwargs):
                     d = json.load(fh)
 
                 # support both 'templates' and exported 'device' files
-                templates = d.get('templates') or []
-                if not templates and isinstance(d, dict) and d.get('device'):
-                    dev = d.get('device') or {}
-                    rx = dev.get('RX') or dev.get('rx') or []
-                    tx = dev.get('TX') or dev.get('tx') or []
-
-                    tx_map = {}
-                    try:
-                        for t in tx:
-                            if not isinstance(t, dict):
-                                continue
-                            try:
-                                func = int(t.get('function', t.get('Function', 3)))
-                            except Exception:
-                                func = 3
-                            start = t.get('start')
-                            length = t.get('length', 1)
-                            try:
-                                if start is None:
-                                    continue
-                                if isinstance(start, str) and str(start).lower().startswith('0x'):
-                                    start_i = int(str(start), 16)
-                                else:
-                                    start_i = int(str(start))
-                                length_i = int(str(length))
-                            except Exception:
-                                continue
-                            for addr in range(start_i, start_i + max(1, length_i)):
-                                tx_map[addr] = func
-                    except Exception:
-                        tx_map = {}
-
-                    norm = []
-                    for e in rx:
-                        try:
-                            if not isinstance(e, dict):
-                                continue
-                            reg = e.get('register', '')
-                            func_val = ''
-                            reg_int = None
-                            try:
-                                if isinstance(reg, str) and str(reg).lower().startswith('0x'):
-                                    reg_int = int(reg, 16)
-                                else:
-                                    reg_int = int(reg)
-                            except Exception:
-                                reg_int = None
-
-                            if reg_int is not None and reg_int in tx_map:
-                                func_val = str(tx_map.get(reg_int, ''))
-                            else:
-                                func_val = str(e.get('select', '') or '')
-
-                            norm.append({
-                                'Address': reg,
-                                'Type': e.get('format', ''),
-                                'Unit': e.get('unit', ''),
-                                'Comment': e.get('description', ''),
-                                'Scale': e.get('factor', ''),
-                                'Functions': func_val,
-                            })
-                        except Exception:
-                            continue
-                    templates = norm
+                templates, input_text_val = template_rows(d)
 
-                table.blockSignals(True)
-                try:
-                    table.setRowCount(0)
-                except Exception:
-                    pass
                 # clear input field before loading
                 try:
                     input_field.setText('')
@@ -1046,39 +924,16 @@ def get_widget(translation=None, *args, **kwargs):
                         input_field.clear()
                     except Exception:
                         pass
-                for i, tpl in enumerate(templates):
-                    table.insertRow(i)
-                    table.setItem(i, 0, QTableWidgetItem(str(tpl.get('Address', '') or '')))
-                    table.setItem(i, 1, QTableWidgetItem(str(tpl.get('Type', '') or '')))
-                    table.setItem(i, 2, QTableWidgetItem(str(tpl.get('Unit', '') or '')))
-                    descr = tpl.get('Comment', '') or tpl.get('Name', '')
-                    table.setItem(i, 3, QTableWidgetItem(str(descr or '')))
-                    table.setItem(i, 4, QTableWidgetItem(str(tpl.get('Scale', '') or '')))
-                    table.setItem(i, 5, QTableWidgetItem(str(tpl.get('Functions', '') or tpl.get('select', '') or '')))
-                table.blockSignals(False)
+                model.set_templates(templates)
                 try:
                     sort_table_by_register()
                 except Exception:
                     pass
                 # restore input field text from file
                 try:
-                    # prefer explicit input_text in file, fall back to device Type if present
-                    input_text_val = ''
-                    try:
-                        input_text_val = str(d.get('input_text', '') or '')
-                    except Exception:
-                        input_text_val = ''
-                    if not input_text_val and isinstance(d, dict) and d.get('device'):
-                        try:
-                            input_text_val = str((d.get('device') or {}).get('Type', '') or '')
-                        except Exception:
-                            input_text_val = ''
                     input_field.setText(input_text_val)
                 except Exception:
-                    try:
-                        input_field.setText('')
-                    except Exception:
-                        pass
+                    pass
                 save_to_file()
             except Exception:
                 QMessageBox.warning(widget, _lbl('file_saved_tables'), 'Fehler beim Laden')
@@ -1153,6 +1008,7 @@ def get_widget(translation=None, *args, **kwargs):
                         deleted += 1
                     except Exception:
                         pass
+                    _templates_changed(p)
 
                 QMessageBox.information(widget, _lbl('file_delete_saved'), f"Löschen abgeschlossen: {deleted} Dateien gelöscht")
             except Exception:
@@ -1166,6 +1022,12 @@ def get_widget(translation=None, *args, **kwargs):
             a = file_actions.get('load_template')
             if a is not None and hasattr(a, 'triggered'):
                 a.triggered.connect(_load_from_template_action)
+            a = file_actions.get('search_templates')
+            if a is not None and hasattr(a, 'triggered'):
+                a.triggered.connect(_search_templates_action)
+            a = file_actions.get('search_register')
+            if a is not None and hasattr(a, 'triggered'):
+                a.triggered.connect(_search_register_action)
             a = file_actions.get('save')
             if a is not None and hasattr(a, 'triggered'):
                 a.triggered.connect(_save_action)
@@ -1200,10 +1062,10 @@ def get_widget(translation=None, *args, **kwargs):
                     # write header row using the table's visible header labels so CSV matches UI
                     headers_out = []
                     try:
-                        for c in range(table.columnCount()):
-                            hh = table.horizontalHeaderItem(c)
-                            if hh is not None and hh.text() is not None:
-                                headers_out.append(str(hh.text()))
+                        for c in range(model.columnCount()):
+                            hh = model.headerData(c, Qt.Orientation.Horizontal)
+                            if hh is not None:
+                                headers_out.append(str(hh))
                             else:
                                 # fallback to localized label if header item missing
                                 fallback_keys = [
@@ -1218,9 +1080,8 @@ def get_widget(translation=None, *args, **kwargs):
 
                     writer.writerow(headers_out)
 
-                    for r in range(table.rowCount()):
-                        row_vals = [_safe_text(r, c) for c in range(table.columnCount())]
-                        writer.writerow(row_vals)
+                    for r in range(model.rowCount()):
+                        writer.writerow(model.store.cells(r))
                 QMessageBox.information(widget, _lbl('export_csv'), 'OK')
             except Exception:
                 QMessageBox.warning(widget, _lbl('export_csv'), 'Fehler')
@@ -1229,7 +1090,7 @@ def get_widget(translation=None, *args, **kwargs):
             try:
                 # build RX entries from table rows using provided column mapping
                 rx_entries = []
-                for r in range(table.rowCount()):
+                for r in range(model.rowCount()):
                     reg_txt = _safe_text(r, 0)
                     # try parse register as int (support hex 0x...)
                     register = None
@@ -1266,7 +1127,7 @@ def get_widget(translation=None, *args, **kwargs):
                     # Build regs directly from table so TX derivation uses the Modbus function
                     # column values independent of RX 'select' (which is exported empty).
                     regs = []
-                    for row_idx in range(table.rowCount()):
+                    for row_idx in range(model.rowCount()):
                         reg_txt = _safe_text(row_idx, 0)
                         try:
                             if isinstance(reg_txt, str) and reg_txt.lower().startswith('0x'):
@@ -1333,7 +1194,7 @@ def get_widget(translation=None, *args, **kwargs):
                 # build LC entry from first table row: {function: <fc>, start: <register>, length: 1}
                 lc_entries = []
                 try:
-                    if table.rowCount() > 0:
+                    if model.rowCount() > 0:
                         first_reg_txt = _safe_text(0, 0)
                         try:
                             if isinstance(first_reg_txt, str) and first_reg_txt.lower().startswith('0x'):
@@ -1408,10 +1269,10 @@ def get_widget(translation=None, *args, **kwargs):
                 # if next row is header labels, skip it — compare to the table's visible headers
                 try:
                     expected = []
-                    for c in range(table.columnCount()):
-                        hh = table.horizontalHeaderItem(c)
-                        if hh is not None and hh.text() is not None:
-                            expected.append(str(hh.text()))
+                    for c in range(model.columnCount()):
+                        hh = model.headerData(c, Qt.Orientation.Horizontal)
+                        if hh is not None:
+                            expected.append(str(hh))
                         else:
                             # fallback localized keys matching the table's header order
                             fallback_keys = [
@@ -1426,20 +1287,81 @@ def get_widget(translation=None, *args, **kwargs):
                 if rows and expected and rows[0] == expected:
                     rows = rows[1:]
 
-                # populate table 1:1 with rows (preserve order); pad missing columns
-                table.blockSignals(True)
-                table.setRowCount(0)
-                for i, row in enumerate(rows):
-                    table.insertRow(i)
-                    for c in range(table.columnCount()):
-                        val = row[c] if c < len(row) else ''
-                        table.setItem(i, c, QTableWidgetItem(str(val)))
-                table.blockSignals(False)
-                save_to_file()
+                # populate table 1:1 with rows; pad missing columns
+                width = model.columnCount()
+                model.set_rows([str(row[c]) if c < len(row) else '' for c in range(width)] for row in rows)
+                # a full import is the one place the whole table is sorted;
+                # edits afterwards only move single rows (sort also saves)
+                sort_table_by_register()
                 QMessageBox.information(widget, _lbl('import_csv'), f'Importiert: {len(rows)}')
             except Exception:
                 QMessageBox.warning(widget, _lbl('import_csv'), 'Fehler')
 
+        def _rejected_rows(scratch, taken=None):
+            """Validate the rows of scratch in one pass; returns (rows to skip, messages).
+
+            Rows repeating a register of taken (the table pasted into) are skipped too.
+            """
+            check = RegisterValidator(scratch)
+            check.validate_all()
+            messages = {
+                0: 'ungültiger Register',
+                1: 'ungültiger Datentyp',
+                4: 'ungültiger Faktor',
+                5: 'ungültige Modbus-Funktion',
+            }
+            rejected = dict(check.rejected_rows())
+            if taken is not None:
+                for i in range(len(scratch)):
+                    if i not in rejected and taken.register_used(scratch.register(i)):
+                        rejected[i] = 0
+            errors = []
+            for i, col in sorted(rejected.items()):
+                msg = messages.get(col, 'ungültiger Wert')
+                if col == 0 and scratch.register(i) is not None:
+                    msg = 'doppelter Register'
+                errors.append(f"Zeile {i+1}: {msg} '{scratch.text(i, col)}'")
+            return set(rejected), errors
+
+        def _paste_clipboard():
+            title = _lbl('import_clipboard')
+            try:
+                text = QApplication.clipboard().text()
+            except Exception:
+                text = ''
+            width = model.columnCount()
+            rows = parse_cell_block(text, width)
+            # a copied header row is not data
+            headers = [str(model.headerData(c, Qt.Orientation.Horizontal) or '').lower() for c in range(width)]
+            if rows and [c.lower() for c in rows[0]] == headers:
+                rows = rows[1:]
+            if not rows:
+                QMessageBox.information(widget, title, 'Keine Daten')
+                return
+            try:
+                scratch = RegisterTable()
+                scratch.extend(rows)
+                skipped, errors = _rejected_rows(scratch, model.store)
+                keep = [scratch.cells(i) for i in range(len(scratch)) if i not in skipped]
+                if keep:
+                    # one insertion, one sort and one save for the whole block
+                    table.setUpdatesEnabled(False)
+                    try:
+                        model.extend_rows(keep)
+                        sort_table_by_register()
+                    finally:
+                        table.setUpdatesEnabled(True)
+                    first = model.store.register_rows(parse_register(keep[0][0]))
+                    if first:
+                        index = model.index(first[0], 0)
+                        table.setCurrentIndex(index)
+                        table.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+                if errors:
+                    summary = f"Eingefügt: {len(keep)}; Übersprungen: {len(errors)}"
+                    QMessageBox.information(widget, title, summary + '\n' + '\n'.join(errors[:10]))
+            except Exception:
+                QMessageBox.warning(widget, title, 'Fehler beim Einfügen')
+
         def _import_json():
             fn, _ = QFileDialog.getOpenFileName(widget, _lbl('import_json'), os.path.join(os.path.dirname(__file__), '..', '..', 'Data'), 'JSON Files (*.json)')
             if not fn:
@@ -1449,146 +1371,26 @@ def get_widget(translation=None, *args, **kwargs):
                 with open(fn, 'r', encoding='utf-8') as f:
                     d = json.load(f)
 
-                # determine source of rows: older templates format or exported device structure
-                rows_source = []
-                if isinstance(d, dict) and d.get('templates'):
-                    # templates format: list of template dicts
-                    rows_source = d.get('templates') or []
-                elif isinstance(d, dict) and d.get('device') and isinstance(d.get('device'), dict):
-                    # device export: prefer RX list, but derive Modbus function from TX ranges
-                    dev = d.get('device') or {}
-                    rx = dev.get('RX') or dev.get('rx') or []
-                    tx = dev.get('TX') or dev.get('tx') or []
-
-                    # build mapping addr->function from TX blocks
-                    tx_map = {}
-                    try:
-                        for t in tx:
-                            if not isinstance(t, dict):
-                                continue
-                            # function code
-                            try:
-                                func = int(t.get('function', t.get('Function', 3)))
-                            except Exception:
-                                func = 3
-                            # start and length
-                            start = t.get('start')
-                            length = t.get('length', 1)
-                            try:
-                                if start is None:
-                                    continue
-                                if isinstance(start, str) and str(start).lower().startswith('0x'):
-                                    start_i = int(str(start), 16)
-                                else:
-                                    start_i = int(str(start))
-                                length_i = int(str(length))
-                            except Exception:
-                                continue
-                            for addr in range(start_i, start_i + max(1, length_i)):
-                                tx_map[addr] = func
-                    except Exception:
-                        tx_map = {}
-
-                    # normalize RX entries into template-like dicts and assign Functions from tx_map when possible
-                    norm = []
-                    for e in rx:
-                        try:
-                            if not isinstance(e, dict):
-                                continue
-                            reg = e.get('register', '')
-                            reg_int = None
-                            try:
-                                if isinstance(reg, str) and str(reg).lower().startswith('0x'):
-                                    reg_int = int(reg, 16)
-                                else:
-                                    reg_int = int(reg)
-                            except Exception:
-                                reg_int = None
-
-                            # determine function: prefer tx_map if register parseable, else fall back to select
-                            func_val = ''
-                            if reg_int is not None and reg_int in tx_map:
-                                func_val = str(tx_map.get(reg_int, ''))
-                            else:
-                                func_val = str(e.get('select', '') or '')
-
-                            norm.append({
-                                'Address': reg,
-                                'Type': e.get('format', ''),
-                                'Unit': e.get('unit', ''),
-                                'Comment': e.get('description', ''),
-                                'Scale': e.get('factor', ''),
-                                'Functions': func_val,
-                            })
-                        except Exception:
-                            continue
-                    rows_source = norm
+                # rows of the older templates format or of an exported device structure
+                rows_source, _ = template_rows(d)
 
                 # if no usable rows found, inform user
                 if not rows_source:
                     QMessageBox.information(widget, _lbl('import_json'), _lbl('import_json') + ': keine Einträge gefunden')
                     return
 
-                # validate rows and only populate valid entries
-                valid_rows = []
-                errors = []
-                seen_regs = set()
-                for i, tpl in enumerate(rows_source):
-                    # Address/register must be parseable
-                    addr_raw = tpl.get('Address', '')
-                    reg_num = _parse_register_value(addr_raw)
-                    if reg_num is None:
-                        errors.append(f"Zeile {i+1}: ungültiger Register '{addr_raw}'")
-                        continue
-
-                    # duplicate within import
-                    if reg_num in seen_regs:
-                        errors.append(f"Zeile {i+1}: doppelter Register '{addr_raw}'")
-                        continue
-
-                    # Datentyp must be supported if present
-                    dtype = str(tpl.get('Type', '') or '').strip()
-                    if dtype:
-                        ok_dt = any(dtype.lower() == t.lower() for t in DATATYPES)
-                        if not ok_dt:
-                            errors.append(f"Zeile {i+1}: ungültiger Datentyp '{dtype}'")
-                            continue
-
-                    # Faktor must be numeric if present
-                    scale_val = tpl.get('Scale', '')
-                    if scale_val is not None and str(scale_val).strip() != '':
-                        try:
-                            float(scale_val)
-                        except Exception:
-                            errors.append(f"Zeile {i+1}: ungültiger Faktor '{scale_val}'")
-                            continue
-
-                    # Functions must be one of allowed values or empty
-                    func_val = str(tpl.get('Functions', '') or '').strip()
-                    if func_val and func_val not in MODBUS_FUNCTIONS:
-                        errors.append(f"Zeile {i+1}: ungültige Modbus-Funktion '{func_val}'")
-                        continue
-
-                    seen_regs.add(reg_num)
-                    valid_rows.append(tpl)
+                # validate all rows in one pass and only populate valid entries
+                scratch = RegisterTable()
+                scratch.load(rows_source)
+                skipped, errors = _rejected_rows(scratch)
+                valid_rows = [tpl for i, tpl in enumerate(rows_source) if i not in skipped]
 
                 if not valid_rows:
                     QMessageBox.information(widget, _lbl('import_json'), 'Kein gültiger Eintrag zum Importieren.\n' + '\n'.join(errors[:10]))
                     return
 
                 # clear and populate table with validated rows
-                table.blockSignals(True)
-                table.setRowCount(0)
-                for i, tpl in enumerate(valid_rows):
-                    table.insertRow(i)
-                    table.setItem(i, 0, QTableWidgetItem(str(tpl.get('Address', '') or '')))
-                    table.setItem(i, 1, QTableWidgetItem(str(tpl.get('Type', '') or '')))
-                    table.setItem(i, 2, QTableWidgetItem(str(tpl.get('Unit', '') or '')))
-                    descr = tpl.get('Comment', '') or tpl.get('Name', '')
-                    table.setItem(i, 3, QTableWidgetItem(str(descr or '')))
-                    table.setItem(i, 4, QTableWidgetItem(str(tpl.get('Scale', '') or '')))
-                    table.setItem(i, 5, QTableWidgetItem(str(tpl.get('Functions', '') or tpl.get('select', '') or '')))
-                table.blockSignals(False)
+                model.set_templates(valid_rows)
                 try:
                     sort_table_by_register()
                 except Exception:
@@ -1613,6 +1415,15 @@ def get_widget(translation=None, *args, **kwargs):
             a = import_actions.get('json')
             if a is not None and hasattr(a, 'triggered'):
                 a.triggered.connect(_import_json)
+            a = import_actions.get('clipboard')
+            if a is not None and hasattr(a, 'triggered'):
+                a.triggered.connect(_paste_clipboard)
+            # Ctrl+V in the table pastes a block of rows as well
+            paste_action = QAction(_lbl('import_clipboard'), table)
+            paste_action.setShortcut(QKeySequence(QKeySequence.StandardKey.Paste))
+            paste_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+            paste_action.triggered.connect(_paste_clipboard)
+            table.addAction(paste_action)
             a = export_actions.get('csv')
             if a is not None and hasattr(a, 'triggered'):
                 a.triggered.connect(_export_csv)
@@ -1632,39 +1443,20 @@ def get_widget(translation=None, *args, **kwargs):
     loaded = load_from_file()
     if not loaded:
         try:
-            table.insertRow(0)
             # New column order: Register, Datentyp, Einheit, Beschreibung, Faktor, Modbus Funktionen
-            table.setItem(0, 0, QTableWidgetItem('0x01'))
-            table.setItem(0, 1, QTableWidgetItem('uint16'))
-            table.setItem(0, 2, QTableWidgetItem('°C'))
-            table.setItem(0, 3, QTableWidgetItem('Room temperature'))
-            table.setItem(0, 4, QTableWidgetItem('0.1'))
-            table.setItem(0, 5, QTableWidgetItem(''))
+            model.append_row(['0x01', 'uint16', '°C', 'Room temperature', '0.1', ''])
         except Exception:
             pass
 
     # Funktionen zum Hinzufügen und Entfernen von Zeilen
     def add_row():
         try:
-            row = table.rowCount()
-            table.insertRow(row)
-            # default values for new row in the new column order
-            table.setItem(row, 0, QTableWidgetItem(''))
-            table.setItem(row, 1, QTableWidgetItem(''))
-            table.setItem(row, 2, QTableWidgetItem(''))
-            # leave Beschreibung (description) empty for new rows
-            table.setItem(row, 3, QTableWidgetItem(''))
-            table.setItem(row, 4, QTableWidgetItem(''))
-            table.setItem(row, 5, QTableWidgetItem(''))
-            # save current state including input field (sort will save)
+            # new rows start with empty cells (including Beschreibung); without
+            # a register they belong at the end, so the table stays sorted
+            model.append_row()
+            # save current state including input field
             try:
-                try:
-                    sort_table_by_register()
-                except Exception:
-                    try:
-                        save_to_file()
-                    except Exception:
-                        pass
+                save_to_file()
             except Exception:
                 pass
             # optional: clear input after saving
@@ -1684,22 +1476,84 @@ def get_widget(translation=None, *args, **kwargs):
             sel = sel_model.selectedRows()
             if not sel:
                 return
-            # remove in reverse order to keep indices valid
-            rows = sorted((idx.row() for idx in sel), reverse=True)
-            for r in rows:
-                table.removeRow(r)
+            # contiguous blocks are removed at once, last block first
+            model.remove_rows(idx.row() for idx in sel)
         except Exception:
             pass
         finally:
+            # removing rows keeps the order; just save
             try:
-                try:
-                    sort_table_by_register()
-                except Exception:
-                    pass
                 save_to_file()
             except Exception:
                 pass
 
+    def _update_conflicts_button(*_):
+        try:
+            n = model.store.conflict_count
+            opt_conflicts.setText(f"{_lbl('toolbar_conflicts')} ({n})" if n else _lbl('toolbar_conflicts'))
+        except Exception:
+            pass
+
+    def show_conflicts():
+        # registers used by several rows (e.g. after a CSV import); select the chosen ones
+        title = _lbl('toolbar_conflicts')
+        conflicts = model.store.conflicts()
+        if not conflicts:
+            QMessageBox.information(widget, title, 'Keine doppelten Register')
+            return
+        dlg = QDialog(widget)
+        dlg.setWindowTitle(title)
+        dlg.resize(480, 360)
+        dlg_layout = QVBoxLayout(dlg)
+        dlg_layout.setContentsMargins(8, 8, 8, 8)
+        dlg_layout.addWidget(QLabel(f"{len(conflicts)} Register mehrfach vergeben", dlg))
+        lw = QListWidget(dlg)
+        lw.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        dlg_layout.addWidget(lw)
+        for reg, rows in conflicts:
+            QListWidgetItem(f"0x{reg:04X} ({reg}): Zeilen {', '.join(str(r + 1) for r in rows)}", lw)
+        lw.setCurrentRow(0)
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        btns.accepted.connect(dlg.accept)
+        btns.rejected.connect(dlg.reject)
+        lw.itemActivated.connect(lambda *_: dlg.accept())
+        dlg_layout.addWidget(btns)
+        if dlg.exec() != QDialog.DialogCode.Accepted:
+            return
+        picked = [conflicts[lw.row(it)][1] for it in lw.selectedItems()]
+        if not picked:
+            return
+        table.clearSelection()
+        sel_model = table.selectionModel()
+        for rows in picked:
+            for r in rows:
+                sel_model.select(model.index(r, 0), sel_model.SelectionFlag.Select | sel_model.SelectionFlag.Rows)
+        table.scrollTo(model.index(picked[0][0], 0), QAbstractItemView.ScrollHint.PositionAtCenter)
+
+    def _update_errors_button(*_):
+        try:
+            n = model.validator.error_count
+            opt_errors.setText(f"{_lbl('toolbar_errors')} ({n})" if n else _lbl('toolbar_errors'))
+        except Exception:
+            pass
+
+    def show_next_error():
+        # jump to the next invalid cell (or duplicate register) after the current one
+        cur = table.currentIndex()
+        pos = model.validator.next_error(cur.row(), cur.column()) if cur.isValid() else model.validator.next_error()
+        if pos is None:
+            QMessageBox.information(widget, _lbl('toolbar_errors'), 'Keine Fehler')
+            return
+        index = model.index(*pos)
+        table.setCurrentIndex(index)
+        table.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+
+    for sig in (model.modelReset, model.rowsInserted, model.rowsRemoved, model.dataChanged):
+        sig.connect(_update_conflicts_button)
+        sig.connect(_update_errors_button)
+    _update_conflicts_button()
+    _update_errors_button()
+
     # Verbinde die Toolbar-Buttons mit den Funktionen
     try:
         opt1.clicked.connect(add_row)
@@ -1709,22 +1563,29 @@ def get_widget(translation=None, *args, **kwargs):
         opt2.clicked.connect(remove_selected_row)
     except Exception:
         pass
+    try:
+        opt_conflicts.clicked.connect(show_conflicts)
+    except Exception:
+        pass
+    try:
+        opt_errors.clicked.connect(show_next_error)
+        opt_errors.setShortcut(QKeySequence('F8'))
+        opt_errors.setToolTip('F8')
+    except Exception:
+        pass
 
     # Save on cell edit
     try:
-        def on_item_changed(item):
+        def on_item_changed(row, col):
             # called for any edit; save current table
             save_to_file()
 
-        table.itemChanged.connect(on_item_changed)
+        model.edited.connect(on_item_changed)
     except Exception:
         pass
 
-    # connect input_field save triggers now that save_to_file exists
-    try:
-        input_field.returnPressed.connect(save_to_file)
-    except Exception:
-        pass
+    # connect input_field save trigger now that save_to_file exists
+    # (editingFinished also fires on returnPressed)
     try:
         input_field.editingFinished.connect(save_to_file)
     except Exception:
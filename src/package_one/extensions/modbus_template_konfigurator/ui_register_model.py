@@ -0,0 +1,212 @@
+"""Qt table model over a RegisterTable."""
+
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QBrush, QColor
+
+from .logic_register_table import RegisterTable
+from .logic_register_validation import RegisterValidator
+
+_EDITABLE = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable
+# background of invalid cells (same red as the datatype popup)
+_INVALID = QBrush(QColor('#ffcccc'))
+
+
+class RegisterTableModel(QAbstractTableModel):
+    """Rows of the Modbus template table for a QTableView.
+
+    Edits made in the view (or by a delegate) go through setData and are
+    announced with edited(row, column); changes made by code through
+    set_text only update the view, like writing to a QTableWidget with
+    its signals blocked.
+
+    Every change re-checks the rows it touched (the whole table after a
+    reset) in validator; invalid cells are shown with a red background.
+    """
+
+    edited = pyqtSignal(int, int)   # row, column
+
+    def __init__(self, headers: Sequence[str], parent=None):
+        super().__init__(parent)
+        self.store = RegisterTable()
+        self.validator = RegisterValidator(self.store)
+        self.headers = list(headers)
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.store.text(index.row(), index.column())
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if self.validator.mask(index.row()) & (1 << index.column()):
+                return _INVALID
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section] if 0 <= section < len(self.headers) else None
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return _EDITABLE
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row, col = index.row(), index.column()
+        text = '' if value is None else str(value)
+        if text == self.store.text(row, col):
+            return True
+        self._set_text(row, col, text)
+        self.edited.emit(row, col)
+        return True
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or count <= 0 or not 0 <= row <= len(self.store):
+            return False
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        for i in range(count):
+            self.store.insert(row + i)
+        self.validator.check_rows(range(row, row + count))
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or count <= 0 or row < 0 or row + count > len(self.store):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        self.validator.forget(row, row + count)
+        self.store.delete(row, row + count)
+        self.endRemoveRows()
+        return True
+
+    # --- table helpers ---
+
+    def text(self, row: int, col: int) -> str:
+        try:
+            return self.store.text(row, col)
+        except IndexError:
+            return ''
+
+    def _set_text(self, row: int, col: int, text: str):
+        was_duplicate = self.store.is_duplicate(row)
+        self.store.set_text(row, col, text)
+        self.validator.check_rows((row,))
+        index = self.index(row, col)
+        if col == 0 and (was_duplicate or self.store.is_duplicate(row)):
+            # the rows sharing the old or new register change colour too
+            index = self.index(0, 0)
+            self.dataChanged.emit(index, self.index(len(self.store) - 1, 0), [Qt.ItemDataRole.BackgroundRole])
+            index = self.index(row, col)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole,
+                                             Qt.ItemDataRole.BackgroundRole])
+
+    def set_text(self, row: int, col: int, text: str):
+        """Change a cell without announcing it as an edit."""
+        self._set_text(row, col, text)
+
+    def register(self, row: int) -> Optional[int]:
+        return self.store.register(row)
+
+    def append_row(self, cells: Optional[Sequence[str]] = None) -> int:
+        """Append one row; returns its index."""
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.store.insert(row, cells)
+        self.validator.check_rows((row,))
+        self.endInsertRows()
+        return row
+
+    def extend_rows(self, rows: Sequence[Sequence[str]]) -> range:
+        """Append rows of cell texts as one insertion; returns their rows."""
+        first = len(self.store)
+        if not rows:
+            return range(first, first)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.store.extend(rows)
+        self.validator.check_rows(range(first, len(self.store)))
+        self.endInsertRows()
+        return range(first, len(self.store))
+
+    def remove_rows(self, rows: Iterable[int]):
+        """Remove the given rows, one contiguous block at a time."""
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            stop = rows.pop(0) + 1
+            start = stop - 1
+            while rows and rows[0] == start - 1:
+                start = rows.pop(0)
+            self.removeRows(start, stop - start)
+
+    def set_templates(self, templates: Iterable[dict]):
+        """Replace all rows by saved-table rows."""
+        self.beginResetModel()
+        self.store.load(templates)
+        self.validator.validate_all()
+        self.endResetModel()
+
+    def set_rows(self, rows: Iterable[Sequence[str]]):
+        """Replace all rows by lists of cell texts."""
+        self.beginResetModel()
+        self.store.clear()
+        self.store.extend(rows)
+        self.validator.validate_all()
+        self.endResetModel()
+
+    def reload(self, load: Callable[[RegisterTable], Any]) -> Any:
+        """Refill the store with load(store), e.g. a journal replay; returns its result."""
+        self.beginResetModel()
+        try:
+            return load(self.store)
+        finally:
+            self.validator.validate_all()
+            self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.validator.validate_all()
+        self.endResetModel()
+
+    def templates(self) -> List[dict]:
+        return self.store.templates()
+
+    def place_row(self, row: int) -> int:
+        """Move row to where its register belongs (the other rows being sorted); returns its new row."""
+        dst = self.store.sorted_position(row)
+        if dst == row:
+            return row
+        # the destination is given as a row before the move
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), dst + 1 if dst > row else dst)
+        self.store.move(row, dst)
+        self.endMoveRows()
+        return dst
+
+    def sort_by_register(self) -> bool:
+        """Order rows ascending by register; False if they already were."""
+        order = self.store.register_order()
+        if order is None:
+            return False
+        self.layoutAboutToBeChanged.emit()
+        new_row = [0] * len(order)
+        for new, old in enumerate(order):
+            new_row[old] = new
+        old_indexes = self.persistentIndexList()
+        self.store.take(order)
+        self.changePersistentIndexList(
+            old_indexes, [self.index(new_row[i.row()], i.column()) for i in old_indexes])
+        self.layoutChanged.emit()
+        return True
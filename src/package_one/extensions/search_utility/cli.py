@@ -0,0 +1,213 @@
+"""Command-line search without a display.
+
+Runs the same search engines as the search page and writes one JSON object
+per result line to stdout (JSON Lines), as soon as the hits are found:
+
+    {"path": "...", "line": 12, "text": "..."}                  (lines)
+    {"path": "...", "line": 12, "text": "...", "before": [[11, "..."]], "after": []}
+    {"path": "..."}                                             (--mode files)
+    {"path": "...", "count": 3}                                 (--mode count)
+
+This module must not import PyQt6, so it also works on machines without
+Qt. The exit status is 0 if something matched, 1 if nothing did and 2 on
+errors, like grep.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator, List, Optional, Sequence
+
+from .logic_filter import DEFAULT_MAX_FILE_SIZE, FileFilter
+from .logic_index import build_index, has_index, indexed_candidates
+from .logic_query import plan_query
+from .logic_search import (
+    DEFAULT_FILE_TIMEOUT, iter_counts, iter_search, iter_search_context, iter_search_guarded,
+    iter_search_parallel,
+)
+
+MODE_LINES = 'lines'
+MODE_FILES = 'files'
+MODE_COUNT = 'count'
+
+# longest time results are held in the stdout buffer
+FLUSH_INTERVAL = 0.05
+
+
+def _parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog='package-one-search',
+        description='Search files for a regular expression (case-insensitive) and print JSON Lines.')
+    p.add_argument('query', help='regular expression')
+    p.add_argument('roots', nargs='*', default=[os.curdir], help='folders to search (default: current folder)')
+    p.add_argument('-i', '--include', action='append', default=[], metavar='GLOB',
+                   help='only search files matching GLOB (repeatable)')
+    p.add_argument('-e', '--exclude', action='append', default=[], metavar='GLOB',
+                   help='skip files and folders matching GLOB (repeatable)')
+    p.add_argument('--max-size', type=int, default=DEFAULT_MAX_FILE_SIZE >> 20, metavar='MB',
+                   help='skip files larger than MB megabytes (0: no limit)')
+    p.add_argument('--binary', action='store_true', help='also search files that look binary')
+    p.add_argument('--no-ignore', action='store_true', help='do not honour .gitignore files')
+    p.add_argument('--no-archives', action='store_true', help='do not search inside .gz, .bz2 and .zip files')
+    p.add_argument('-m', '--mode', choices=(MODE_LINES, MODE_FILES, MODE_COUNT), default=MODE_LINES,
+                   help='matching lines, files with matches, or matching lines per file')
+    p.add_argument('--max-hits', type=int, default=0, metavar='N', help='stop after N results (0: no limit)')
+    p.add_argument('--max-per-file', type=int, default=0, metavar='N',
+                   help='stop reading a file after N hits (0: no limit)')
+    p.add_argument('-C', '--context', type=int, default=0, metavar='N', help='list N lines around every hit')
+    p.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                   help='scan with N worker processes (0: one per CPU; lines and files modes only, '
+                        'guarded patterns always run in one process)')
+    p.add_argument('--index', action='store_true',
+                   help="use the search index of each folder, building it if there is none")
+    p.add_argument('--timeout', type=float, default=DEFAULT_FILE_TIMEOUT, metavar='SECONDS',
+                   help='skip files a slow regex spends longer on (0: off)')
+    return p
+
+
+def _file_filter(args) -> FileFilter:
+    kwargs = {}
+    if args.no_ignore:
+        kwargs['ignore_files'] = ()
+    return FileFilter(include=args.include, exclude=args.exclude,
+                      max_size=args.max_size << 20 if args.max_size > 0 else None,
+                      skip_binary=not args.binary, archives=not args.no_archives, **kwargs)
+
+
+def _warn(message: str):
+    print(f"package-one-search: {message}", file=sys.stderr)
+
+
+def _candidates(query: str, root: str, file_filter: FileFilter) -> Optional[List[str]]:
+    # files to verify according to the index of root, None to walk root
+    try:
+        if not has_index(root):
+            build_index(root)
+        paths = indexed_candidates(query, root, file_filter=file_filter)
+    except Exception as e:
+        _warn(f"index of {root} not used: {e}")
+        return None
+    if paths is None:
+        _warn(f"index of {root} was built with other file options; searching without it")
+    return paths
+
+
+def iter_records(args, root: str, file_filter: FileFilter, max_hits: Optional[int]) -> Iterator[dict]:
+    """Yield the JSON records for one root."""
+    query = args.query
+    plan = plan_query(query)
+    paths = _candidates(query, root, file_filter) if args.index else None
+    max_per_file = args.max_per_file or None
+    context = args.context if args.mode == MODE_LINES else 0
+    guarded = plan.guarded and args.timeout > 0
+    if args.mode == MODE_FILES:
+        max_per_file = 1
+
+    if guarded:
+        def on_timeout(path):
+            _warn(f"skipped {path}: the regex took longer than {args.timeout:g} s")
+        hits = iter_search_guarded(query, root, paths=paths, file_filter=file_filter,
+                                   max_hits=None if args.mode == MODE_COUNT else max_hits,
+                                   max_per_file=max_per_file, before=context, after=context,
+                                   file_timeout=args.timeout, on_timeout=on_timeout)
+    elif args.mode == MODE_COUNT:
+        hits = None
+    elif context:
+        hits = iter_search_context(query, root, context, context, paths=paths, file_filter=file_filter,
+                                   max_hits=max_hits, max_per_file=max_per_file)
+    elif args.jobs != 1:
+        hits = iter_search_parallel(query, root, args.jobs or None, paths=paths, file_filter=file_filter,
+                                    max_hits=max_hits, max_per_file=max_per_file)
+    else:
+        hits = iter_search(query, root, paths=paths, file_filter=file_filter,
+                           max_hits=max_hits, max_per_file=max_per_file)
+
+    if args.mode == MODE_COUNT:
+        if hits is None:
+            counts = iter_counts(query, root, paths=paths, file_filter=file_filter)
+        else:
+            counts = ((path, sum(1 for _ in group)) for path, group in groupby(hits, key=itemgetter(0)))
+        for path, count in counts:
+            yield {'path': path, 'count': count}
+    elif args.mode == MODE_FILES:
+        for hit in hits:
+            yield {'path': hit[0]}
+    else:
+        for hit in hits:
+            record = {'path': hit[0], 'line': hit[1], 'text': hit[2]}
+            if context:
+                record['before'] = hit[3]
+                record['after'] = hit[4]
+            yield record
+
+
+def _serial_reason(args) -> Optional[str]:
+    # why -j does not apply to this search, None if it does
+    if plan_query(args.query).guarded and args.timeout > 0:
+        return 'guarded pattern'
+    if args.mode == MODE_COUNT:
+        return 'count mode'
+    if args.context and args.mode == MODE_LINES:
+        return 'context lines'
+    return None
+
+
+def run(args, out=None) -> int:
+    """Search every root and write the records to out; returns the exit status."""
+    out = sys.stdout if out is None else out
+    if args.jobs != 1:
+        reason = _serial_reason(args)
+        if reason:
+            _warn(f"-j ignored: {reason}")
+    file_filter = _file_filter(args)
+    max_hits = args.max_hits or None
+    found = 0
+    last_flush = time.monotonic()
+    for root in args.roots:
+        if not os.path.isdir(root):
+            _warn(f"{root}: not a folder")
+            return 2
+        left = None if max_hits is None else max_hits - found
+        for record in iter_records(args, root, file_filter, left):
+            out.write(json.dumps(record) + '\n')
+            found += 1
+            now = time.monotonic()
+            if now - last_flush >= FLUSH_INTERVAL:
+                out.flush()
+                last_flush = now
+            if max_hits is not None and found >= max_hits:
+                break
+        if max_hits is not None and found >= max_hits:
+            break
+    out.flush()
+    return 0 if found else 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    try:
+        plan_query(args.query)
+    except re.error as e:
+        _warn(f"invalid regular expression: {e}")
+        return 2
+    try:
+        return run(args)
+    except RuntimeError as e:
+        # RegexTimeout, or the guarded search worker kept failing
+        _warn(str(e))
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
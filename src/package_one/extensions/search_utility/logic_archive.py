@@ -0,0 +1,93 @@
+"""Read the members of compressed files for the search utility.
+
+gzip and bz2 files hold a single member, named after the file without its
+extension; zip files hold any number of members. Members are decompressed
+as a stream with the standard library modules and never written to disk.
+
+The decompressed bytes read from one archive are capped, so one huge (or
+deliberately over-compressed) archive cannot hold up a whole search; the
+rest of an archive beyond the cap is not searched.
+
+Hits inside an archive are reported with the path ``archive!member``.
+"""
+
+import bz2
+import gzip
+import io
+import os
+import zipfile
+from typing import BinaryIO, Iterator, Tuple
+
+ARCHIVE_EXTENSIONS = ('.gz', '.bz2', '.zip')
+
+# decompressed bytes read from one archive before the rest is skipped
+DEFAULT_MAX_ARCHIVE_SIZE = 256 << 20
+
+# separates the archive path from the member name in reported paths
+MEMBER_SEPARATOR = '!'
+
+_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open}
+
+
+def is_archive(path: str) -> bool:
+    """True if path names a file whose members are searched (by extension)."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_path(archive: str, member: str) -> str:
+    return archive + MEMBER_SEPARATOR + member
+
+
+def archive_of(path: str) -> str:
+    """The file a hit path was read from: the archive of archive!member, else path itself."""
+    pos = path.find(MEMBER_SEPARATOR)
+    while pos >= 0:
+        if is_archive(path[:pos]):
+            return path[:pos]
+        pos = path.find(MEMBER_SEPARATOR, pos + 1)
+    return path
+
+
+class _CappedReader(io.RawIOBase):
+    """Raw stream over a decompressor that ends once the shared budget is spent."""
+
+    def __init__(self, stream, budget: list):
+        self._stream = stream
+        # [bytes left]; shared by all members of one archive
+        self._budget = budget
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._budget[0])
+        if n <= 0:
+            return 0
+        data = self._stream.read(n)
+        buffer[:len(data)] = data
+        self._budget[0] -= len(data)
+        return len(data)
+
+
+def iter_members(path: str, max_bytes: int = DEFAULT_MAX_ARCHIVE_SIZE) -> Iterator[Tuple[str, BinaryIO]]:
+    """Yield (member path, buffered binary stream) for every member of an archive.
+
+    Each stream is closed when the iteration moves on. At most max_bytes
+    decompressed bytes are read from the whole archive; later members are
+    not yielded once the budget is spent.
+    """
+    budget = [max_bytes]
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.zip':
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if budget[0] <= 0:
+                    return
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    yield member_path(path, info.filename), io.BufferedReader(_CappedReader(member, budget))
+        return
+    name = os.path.basename(path)[:-len(ext)]
+    with _OPENERS[ext](path, 'rb') as member:
+        yield member_path(path, name), io.BufferedReader(_CappedReader(member, budget))
@@ -0,0 +1,147 @@
+"""Cache of search results for repeated queries.
+
+Results are stored under (query, flags, root, corpus fingerprint). The
+fingerprint changes whenever a file the search would read changes:
+
+* with an index that serves the file filter it is the index generation,
+  which a watcher keeps current without touching the disk;
+* otherwise it is a digest of the path, mtime and size of every walked
+  file. The walk stats every file anyway (size limit), so this costs no
+  extra system calls, and the walked paths are reused by the search on a
+  miss. Directory mtimes alone would miss files rewritten in place, which
+  is how the template editors save.
+
+ResultCache evicts the least recently used entries once the estimated size
+of all cached rows exceeds its byte budget.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+from .logic_filter import FileFilter
+from .logic_index import get_index, has_index
+from .logic_search import iter_search
+
+# estimated bytes of all cached rows before old entries are evicted
+DEFAULT_CACHE_BYTES = 64 << 20
+
+# rough per-row cost beyond the strings (tuple, ints, list slot)
+_ROW_OVERHEAD = 120
+
+
+def rows_size(rows: Sequence[tuple]) -> int:
+    """Estimated memory used by result rows."""
+    size = 0
+    for row in rows:
+        size += _ROW_OVERHEAD
+        for item in row:
+            if isinstance(item, str):
+                size += len(item) + 49
+    return size
+
+
+class ResultCache:
+    """Thread-safe LRU mapping of cache keys to lists of result rows."""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[list, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[list]:
+        """Cached rows for key (as a new list), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return list(entry[0])
+
+    def put(self, key: Hashable, rows: Sequence[tuple]) -> bool:
+        """Store rows under key; returns False if they alone exceed the budget."""
+        size = rows_size(rows)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (list(rows), size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+# shared by the search page and cached_search
+default_cache = ResultCache()
+
+
+def filter_key(file_filter: FileFilter) -> tuple:
+    """Everything about a FileFilter that changes which files are searched."""
+    return file_filter.index_key() + (file_filter.include, file_filter.exclude)
+
+
+def walk_fingerprint(root: str, file_filter: FileFilter) -> Tuple[str, List[str]]:
+    """Walk root once; return a digest of the walked files and their paths in walk order."""
+    digest = hashlib.blake2b(digest_size=16)
+    paths = []
+    for rel, st in file_filter.walk(root):
+        paths.append(os.path.join(root, rel))
+        digest.update(f"{rel}\0{st.st_mtime_ns}\0{st.st_size}\n".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest(), paths
+
+
+def corpus_fingerprint(root: str, file_filter: FileFilter,
+                       refresh_index: bool = True) -> Tuple[tuple, Optional[List[str]]]:
+    """Fingerprint of the files a search of root reads.
+
+    Returns (fingerprint, paths): paths are the walked files, or None if the
+    fingerprint came from the index of root. The index is refreshed first
+    unless refresh_index is False; its generation is only trusted without
+    a refresh while a watcher covering every file keeps it current
+    (idx.watched), otherwise the files are walked.
+    """
+    idx = get_index(root) if has_index(root) else None
+    if idx is not None and idx.serves(file_filter) and (refresh_index or idx.watched):
+        if refresh_index and idx.refresh():
+            try:
+                idx.save()
+            except Exception:
+                pass
+        return ('index', idx.generation), None
+    digest, paths = walk_fingerprint(root, file_filter)
+    return ('walk', digest), paths
+
+
+def cached_search(query: str, root: str, file_filter: Optional[FileFilter] = None,
+                  max_hits: Optional[int] = None, max_per_file: Optional[int] = None,
+                  cache: Optional[ResultCache] = None) -> List[Tuple[str, int, str]]:
+    """search_in_files answered from cache while no file under root has changed."""
+    file_filter = file_filter or FileFilter()
+    cache = default_cache if cache is None else cache
+    fingerprint, paths = corpus_fingerprint(root, file_filter)
+    key = ('lines', query, max_hits, max_per_file, filter_key(file_filter), root, fingerprint)
+    rows = cache.get(key)
+    if rows is not None:
+        return rows
+    if paths is None:
+        rows = get_index(root).search(query, root, file_filter, max_hits, max_per_file)
+    else:
+        rows = list(iter_search(query, root, paths=paths, file_filter=file_filter,
+                                max_hits=max_hits, max_per_file=max_per_file))
+    cache.put(key, rows)
+    return rows
@@ -0,0 +1,335 @@
+"""Which files the search utility reads.
+
+FileFilter walks a root with os.scandir in os.walk order and prunes
+directories before descending into them: default tool and cache directories,
+exclude globs and paths ignored by ``.gitignore``-style files. Files are
+selected by name, include/exclude globs, ignore rules and size; binary
+content is detected by the scanners when they first read a file (see
+is_binary).
+
+Globs use ``/`` as separator. A glob without ``/`` matches the file or
+directory name at any depth, one with ``/`` matches the path relative to the
+search root; ``**`` matches across directories.
+"""
+
+import os
+import re
+from typing import Iterator, List, Optional, Pattern, Sequence, Tuple
+
+from .logic_archive import DEFAULT_MAX_ARCHIVE_SIZE
+
+# directories never worth searching
+DEFAULT_EXCLUDE_DIRS = ('.git', '.hg', '.svn', '__pycache__', '.venv', 'venv',
+                        'node_modules', '.mypy_cache', '.pytest_cache', '.ruff_cache', '.tox', '.nox')
+
+# per-directory ignore files read during the walk
+IGNORE_FILE_NAMES = ('.gitignore', '.ignore')
+
+# size limit the search page and the command line start with
+DEFAULT_MAX_FILE_SIZE = 64 << 20
+
+# bytes inspected at the start of a file to decide whether it is binary
+SNIFF_BYTES = 8192
+
+# extensions skipped without looking at the content
+SKIP_EXTENSIONS = ('.pyc', '.pyo', '.exe', '.dll')
+
+_CASE_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+
+
+def is_binary(head: bytes) -> bool:
+    """True if the first bytes of a file look binary (contain a NUL byte)."""
+    return b'\0' in head[:SNIFF_BYTES]
+
+
+def _glob_to_regex(pattern: str) -> str:
+    # gitignore glob -> regex body; '*' and '?' stay inside one path component
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^') else i + 1)
+            if j < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """Rules of the ``.gitignore``-style files read so far; the last match wins."""
+
+    def __init__(self, rules: Sequence[Tuple[Pattern, bool, bool]] = ()):
+        # (compiled path regex, negated, directories only)
+        self.rules = tuple(rules)
+
+    def extend(self, base: str, lines: Sequence[str]) -> 'IgnoreRules':
+        """Return new rules with the lines of an ignore file in directory base.
+
+        base is relative to the search root, with '/' separators ('' for the root).
+        """
+        prefix = re.escape(base + '/') if base else ''
+        rules = list(self.rules)
+        for line in lines:
+            line = line.rstrip('\n\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            body = _glob_to_regex(line.lstrip('/'))
+            if '/' in line:
+                # anchored to the directory of the ignore file
+                regex = '^' + prefix + body + '$'
+            else:
+                regex = '^' + prefix + '(?:.*/)?' + body + '$'
+            rules.append((re.compile(regex, _CASE_FLAGS), negated, dir_only))
+        return IgnoreRules(rules)
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        """True if rel ('/'-separated, relative to the root) is ignored."""
+        result = False
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel):
+                result = not negated
+        return result
+
+    def __bool__(self):
+        return bool(self.rules)
+
+
+def read_ignore_file(path: str) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+
+def _as_posix(rel: str) -> str:
+    return rel.replace(os.sep, '/') if os.sep != '/' else rel
+
+
+class FileFilter:
+    """Selection rules for the files a search reads.
+
+    include: globs a file must match (any of them); empty means all files.
+    exclude: globs for files and directories to skip.
+    exclude_dirs: directory names pruned everywhere.
+    ignore_files: names of ignore files honoured during the walk.
+    max_size: largest file size in bytes, None for no limit (the default).
+    skip_binary: skip files whose first bytes look binary.
+    archives: search the members of gzip, bz2 and zip files (see logic_archive);
+        off by default, so archives are read as plain files.
+    max_archive_size: decompressed bytes read from one archive.
+    """
+
+    def __init__(self, include: Sequence[str] = (), exclude: Sequence[str] = (),
+                 exclude_dirs: Sequence[str] = DEFAULT_EXCLUDE_DIRS,
+                 ignore_files: Sequence[str] = IGNORE_FILE_NAMES,
+                 max_size: Optional[int] = None, skip_binary: bool = True,
+                 archives: bool = False, max_archive_size: int = DEFAULT_MAX_ARCHIVE_SIZE):
+        self.include = tuple(p for p in include if p)
+        self.exclude = tuple(p for p in exclude if p)
+        self.exclude_dirs = frozenset(exclude_dirs)
+        self.ignore_files = tuple(ignore_files)
+        self.max_size = max_size if max_size and max_size > 0 else None
+        self.skip_binary = skip_binary
+        self.archives = archives
+        self.max_archive_size = max_archive_size if max_archive_size and max_archive_size > 0 else DEFAULT_MAX_ARCHIVE_SIZE
+        self._include_re = self._compile(self.include)
+        self._exclude_re = self._compile(self.exclude)
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        cleaned = [p.strip().rstrip('/') for p in patterns]
+        names = [_glob_to_regex(p) for p in cleaned if p and '/' not in p]
+        paths = [_glob_to_regex(p.lstrip('/')) for p in cleaned if '/' in p]
+        name_re = re.compile('^(?:' + '|'.join(names) + ')$', _CASE_FLAGS) if names else None
+        path_re = re.compile('^(?:' + '|'.join(paths) + ')$', _CASE_FLAGS) if paths else None
+        return name_re, path_re
+
+    @staticmethod
+    def _matches(compiled, rel, name):
+        name_re, path_re = compiled
+        return bool((name_re is not None and name_re.match(name))
+                    or (path_re is not None and path_re.match(rel)))
+
+    def index_key(self) -> tuple:
+        """Settings that decide which files are walked and how they are read.
+
+        Include and exclude globs are left out: two filters with the same key
+        select the same files before the globs are applied, so an index
+        built with one can serve the other (see accepts_globs).
+        """
+        return (tuple(sorted(self.exclude_dirs)), self.ignore_files, self.max_size, self.skip_binary,
+                self.archive_limit)
+
+    @property
+    def archive_limit(self) -> Optional[int]:
+        """Decompressed bytes per archive for the scanners; None reads archives as plain files."""
+        return self.max_archive_size if self.archives else None
+
+    def accepts_dir(self, rel: str, name: str, rules: IgnoreRules) -> bool:
+        """rel: '/'-separated path of the directory relative to the root."""
+        if name in self.exclude_dirs:
+            return False
+        if self._exclude_re is not None and self._matches(self._exclude_re, rel, name):
+            return False
+        return not (rules and rules.ignored(rel, True))
+
+    def accepts_name(self, rel: str, name: str, rules: Optional[IgnoreRules] = None) -> bool:
+        """Check a file by name, globs and ignore rules (rel is '/'-separated)."""
+        if name.endswith(SKIP_EXTENSIONS):
+            return False
+        if self._include_re is not None and not self._matches(self._include_re, rel, name):
+            return False
+        if self._exclude_re is not None and self._matches(self._exclude_re, rel, name):
+            return False
+        return not (rules and rules.ignored(rel, False))
+
+    def accepts_size(self, size: int) -> bool:
+        return self.max_size is None or size <= self.max_size
+
+    def accepts_globs(self, rel: str) -> bool:
+        """Apply only the include/exclude globs to a walked relative path.
+
+        Used to narrow files selected by a filter with the same index_key.
+        """
+        rel = _as_posix(rel)
+        parts = rel.split('/')
+        if self._exclude_re is not None:
+            for i in range(1, len(parts)):
+                if self._matches(self._exclude_re, '/'.join(parts[:i]), parts[i - 1]):
+                    return False
+        return self.accepts_name(rel, parts[-1])
+
+    def rules_for(self, root: str, rel_dir: str) -> Optional[IgnoreRules]:
+        """Ignore rules rel_dir inherits from the ignore files of its parents.
+
+        Returns None if the walk never enters rel_dir because it or one of
+        its parents is pruned. scan_dir adds the ignore files of rel_dir itself.
+        """
+        rules = IgnoreRules()
+        rel_dir = '' if rel_dir in ('', os.curdir) else _as_posix(rel_dir)
+        parts = rel_dir.split('/') if rel_dir else []
+        for depth in range(len(parts)):
+            base = '/'.join(parts[:depth])
+            for name in self.ignore_files:
+                lines = read_ignore_file(os.path.join(root, *parts[:depth], name))
+                if lines:
+                    rules = rules.extend(base, lines)
+            if not self.accepts_dir('/'.join(parts[:depth + 1]), parts[depth], rules):
+                return None
+        return rules
+
+    def scan_dir(self, root: str, rel_dir: str, rules: IgnoreRules):
+        """List one directory like a single os.walk step, with filtering.
+
+        Returns (files, subdirs, rules): files as (relpath, stat) in listing
+        order, accepted subdirectory relpaths in listing order and the
+        ignore rules that apply below rel_dir. Returns None if the directory
+        cannot be read.
+        """
+        prefix = '' if rel_dir in ('', os.curdir) else rel_dir + os.sep
+        try:
+            with os.scandir(os.path.join(root, rel_dir) if prefix else root) as it:
+                entries = list(it)
+        except OSError:
+            return None
+        if self.ignore_files:
+            base = _as_posix(prefix.rstrip(os.sep))
+            for name in self.ignore_files:
+                if any(e.name == name for e in entries):
+                    lines = read_ignore_file(os.path.join(root, prefix + name))
+                    if lines:
+                        rules = rules.extend(base, lines)
+        files = []
+        subdirs = []
+        for entry in entries:
+            rel = prefix + entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                # os.walk lists but does not follow symlinked directories
+                try:
+                    if entry.is_symlink():
+                        continue
+                except OSError:
+                    continue
+                if self.accepts_dir(_as_posix(rel), entry.name, rules):
+                    subdirs.append(rel)
+                continue
+            if not self.accepts_name(_as_posix(rel), entry.name, rules):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if self.accepts_size(st.st_size):
+                files.append((rel, st))
+        return files, subdirs, rules
+
+    def walk_dirs(self, root: str, rel_dir: str = '',
+                  rules: Optional[IgnoreRules] = None) -> Iterator[Tuple[str, List[Tuple[str, os.stat_result]]]]:
+        """Yield (relpath of directory, its selected files) in os.walk order.
+
+        rules are the inherited ignore rules of rel_dir if already known.
+        """
+        if rules is None:
+            rules = self.rules_for(root, rel_dir)
+            if rules is None:
+                return
+        stack = [(rel_dir, rules)]
+        while stack:
+            current, rules = stack.pop()
+            listing = self.scan_dir(root, current, rules)
+            if listing is None:
+                continue
+            files, subdirs, rules = listing
+            yield current, files
+            stack.extend((sub, rules) for sub in reversed(subdirs))
+
+    def walk(self, root: str, rel_dir: str = '',
+             rules: Optional[IgnoreRules] = None) -> Iterator[Tuple[str, os.stat_result]]:
+        """Yield (relpath, stat) of every selected file below rel_dir in os.walk order."""
+        for _, files in self.walk_dirs(root, rel_dir, rules):
+            yield from files
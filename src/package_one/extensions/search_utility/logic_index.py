@@ -0,0 +1,464 @@
+"""Persistent trigram index for the search utility.
+
+The index maps every ASCII trigram of a file's case-folded text to the ids of
+the files containing it. A query is answered by intersecting the posting
+lists of the trigrams of its required literal and verifying only the candidate files with the
+regular line scanner, so results are identical to ``search_in_files``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .logic_filter import FileFilter
+from .logic_search import _iter_texts, iter_search, required_literal
+
+INDEX_VERSION = 2
+
+# characters the regex engine matches case-insensitively against ASCII letters
+# but which str.lower() does not map onto them
+_ASCII_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+
+# text read per chunk while indexing a file
+_READ_CHUNK = 1 << 20
+
+# loaded indexes per root, reused between searches
+_open_indexes: Dict[str, 'TrigramIndex'] = {}
+_open_lock = threading.Lock()
+
+
+def _cache_dir() -> str:
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'package_one', 'search_index')
+
+
+def index_path_for(root: str) -> str:
+    """Return the on-disk location of the index for root."""
+    key = os.path.normcase(os.path.abspath(root)).encode('utf-8')
+    return os.path.join(_cache_dir(), hashlib.sha1(key).hexdigest() + '.json')
+
+
+def _walk_settings(file_filter: FileFilter) -> dict:
+    # the parts of a FileFilter an index depends on (everything but the globs)
+    return {'exclude_dirs': file_filter.exclude_dirs, 'ignore_files': file_filter.ignore_files,
+            'max_size': file_filter.max_size, 'skip_binary': file_filter.skip_binary,
+            'archives': file_filter.archives, 'max_archive_size': file_filter.max_archive_size}
+
+
+def _index_key_json(file_filter: FileFilter) -> list:
+    return json.loads(json.dumps(file_filter.index_key()))
+
+
+def fold_text(text: str) -> str:
+    """Case-fold text so that indexed trigrams agree with re.IGNORECASE."""
+    return text.translate(_ASCII_FOLD).lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the set of ASCII trigrams of text after case folding."""
+    folded = fold_text(text)
+    grams = {folded[i:i + 3] for i in range(len(folded) - 2)}
+    return {g for g in grams if g.isascii()}
+
+
+def query_trigrams(query: str) -> Optional[Set[str]]:
+    """Trigrams every matching file must contain, or None if the query cannot be narrowed."""
+    literal = required_literal(query)
+    if literal is None or len(literal) < 3 or not literal.isascii():
+        return None
+    return trigrams(literal)
+
+
+def _file_trigrams(path: str, skip_binary: bool = True, archive_limit: Optional[int] = None) -> Set[str]:
+    grams = set()
+    try:
+        # binary files are indexed without trigrams, the scanner skips them;
+        # an archive gets the trigrams of all its members
+        for _, f in _iter_texts(path, skip_binary, archive_limit):
+            tail = ''
+            while True:
+                chunk = f.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                grams |= trigrams(tail + chunk)
+                tail = chunk[-2:]
+    except Exception:
+        # unreadable files are indexed without trigrams
+        pass
+    return grams
+
+
+class TrigramIndex:
+    """On-disk trigram index for all searchable files under one root.
+
+    The files are the ones file_filter (default FileFilter()) walks; its
+    include and exclude globs are not used.
+    """
+
+    def __init__(self, root: str, index_path: Optional[str] = None, file_filter: Optional[FileFilter] = None):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or index_path_for(self.root)
+        self.file_filter = FileFilter(**_walk_settings(file_filter or FileFilter()))
+        # relpath -> (mtime, size, file id)
+        self.files: Dict[str, Tuple[float, int, int]] = {}
+        # trigram -> ids of files containing it
+        self.postings: Dict[str, Set[int]] = {}
+        # relpaths in os.walk order, so results come out like search_in_files
+        self.order: List[str] = []
+        # bumped on every change; results found at an older generation may be stale
+        self.generation = 0
+        # True while an IndexWatcher reports every change of the indexed files,
+        # so the generation changes whenever one does
+        self.watched = False
+        self._next_id = 0
+        # rel dir -> (name, mtime, size) of its ignore files at the last update
+        self._ignore_stamps: Dict[str, list] = {}
+        # guards the maps against a watcher updating them during a search
+        self.lock = threading.RLock()
+
+    def load(self) -> bool:
+        """Load the index from disk. Returns False if it is missing or unusable."""
+        with self.lock:
+            return self._load()
+
+    def _load(self) -> bool:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return False
+        if data.get('version') != INDEX_VERSION or data.get('root') != self.root:
+            return False
+        if data.get('filter') != _index_key_json(self.file_filter):
+            return False
+        self.files = {rel: (m, s, i) for rel, (m, s, i) in data.get('files', {}).items()}
+        self.postings = {g: set(ids) for g, ids in data.get('postings', {}).items()}
+        self.order = list(data.get('order', []))
+        self.generation = int(data.get('generation', 0))
+        self._next_id = max((v[2] for v in self.files.values()), default=-1) + 1
+        return True
+
+    def save(self):
+        """Write the index atomically next to its previous version."""
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        payload = {
+            'version': INDEX_VERSION,
+            'root': self.root,
+            'filter': _index_key_json(self.file_filter),
+            'generation': self.generation,
+            'files': {rel: list(v) for rel, v in self.files.items()},
+            'order': self.order,
+            'postings': {g: sorted(ids) for g, ids in self.postings.items() if ids},
+        }
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp, self.index_path)
+
+    def _drop_ids(self, ids: Set[int]):
+        if not ids:
+            return
+        for g in list(self.postings):
+            posting = self.postings[g]
+            posting -= ids
+            if not posting:
+                del self.postings[g]
+
+    def _add_file(self, rel: str, mtime: float, size: int):
+        file_id = self._next_id
+        self._next_id += 1
+        self.files[rel] = (mtime, size, file_id)
+        for g in _file_trigrams(os.path.join(self.root, rel), self.file_filter.skip_binary,
+                                self.file_filter.archive_limit):
+            self.postings.setdefault(g, set()).add(file_id)
+
+    def refresh(self) -> bool:
+        """Re-index files whose mtime or size changed and forget deleted ones.
+
+        Returns True if the index changed.
+        """
+        with self.lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        order = []
+        stale_ids = set()
+        changed = []
+        for rel, st in self.file_filter.walk(self.root):
+            order.append(rel)
+            known = self.files.get(rel)
+            if known is not None and known[0] == st.st_mtime and known[1] == st.st_size:
+                continue
+            if known is not None:
+                stale_ids.add(known[2])
+            changed.append((rel, st.st_mtime, st.st_size))
+
+        present = set(order)
+        for rel in [r for r in self.files if r not in present]:
+            stale_ids.add(self.files.pop(rel)[2])
+
+        self._drop_ids(stale_ids)
+        for rel, mtime, size in changed:
+            self._add_file(rel, mtime, size)
+
+        modified = bool(stale_ids or changed or order != self.order)
+        self.order = order
+        if modified:
+            self.generation += 1
+        return modified
+
+    def _subtree_end(self, rel_dir: str) -> int:
+        # position in order right after every file below rel_dir
+        if rel_dir in ('', os.curdir):
+            return len(self.order)
+        prefix = rel_dir + os.sep
+        for i in range(len(self.order) - 1, -1, -1):
+            if self.order[i].startswith(prefix):
+                return i + 1
+        return self._subtree_end(os.path.dirname(rel_dir))
+
+    def _sync_file(self, rel: str, stat, stale_ids: Set[int], changed: dict):
+        known = self.files.get(rel)
+        if known is not None and known[0] == stat.st_mtime and known[1] == stat.st_size:
+            return
+        if known is not None:
+            stale_ids.add(self.files.pop(rel)[2])
+        changed[rel] = (stat.st_mtime, stat.st_size)
+
+    def _ignore_stamp(self, rel_dir: str) -> list:
+        stamps = []
+        for name in self.file_filter.ignore_files:
+            try:
+                st = os.stat(os.path.join(self.root, rel_dir, name))
+            except OSError:
+                continue
+            stamps.append([name, st.st_mtime, st.st_size])
+        return stamps
+
+    def _sync_directory(self, rel_dir: str, stale_ids: Set[int], changed: dict):
+        prefix = '' if rel_dir == os.curdir else rel_dir + os.sep
+        ff = self.file_filter
+        rules = ff.rules_for(self.root, rel_dir)
+        listing = None if rules is None else ff.scan_dir(self.root, rel_dir, rules)
+        files, subdirs, rules = listing if listing is not None else ([], [], None)
+        # a changed ignore file can select different files anywhere below;
+        # directories not seen since loading are rewalked once (stats only)
+        stamp = self._ignore_stamp(rel_dir) if listing is not None else []
+        rewalk = stamp != self._ignore_stamps.get(rel_dir)
+        self._ignore_stamps[rel_dir] = stamp
+
+        # the subtree of rel_dir is one contiguous block of order; rebuild it
+        # in walk order: own files first, then each subdirectory's block in
+        # listing order (new subdirectories are walked completely)
+        inside = [i for i, r in enumerate(self.order) if r.startswith(prefix)]
+        start = inside[0] if inside else self._subtree_end(rel_dir)
+        end = inside[-1] + 1 if inside else start
+        blocks = {}
+        for r in self.order[start:end]:
+            head, sep, _ = r[len(prefix):].partition(os.sep)
+            if sep:
+                blocks.setdefault(prefix + head, []).append(r)
+        block = []
+        for rel, st in files:
+            block.append(rel)
+            self._sync_file(rel, st, stale_ids, changed)
+        for sub in subdirs:
+            if sub in blocks and not rewalk:
+                block.extend(blocks[sub])
+                continue
+            for rel, st in ff.walk(self.root, sub, rules):
+                block.append(rel)
+                self._sync_file(rel, st, stale_ids, changed)
+
+        present = set(block)
+        for r in [r for r in self.files if r.startswith(prefix) and r not in present]:
+            stale_ids.add(self.files.pop(r)[2])
+        for r in [r for r in changed if r.startswith(prefix) and r not in present]:
+            del changed[r]
+        self.order[start:end] = block
+
+    def update_paths(self, paths: Iterable[str]) -> bool:
+        """Bring the entries for the given files or directories up to date.
+
+        Used for live maintenance instead of a full refresh; a file is
+        updated through its directory. Returns True if the index changed.
+        """
+        with self.lock:
+            dirs = set()
+            for path in set(os.path.abspath(p) for p in paths):
+                rel = os.path.relpath(path, self.root)
+                if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+                    continue
+                dirs.add(rel if os.path.isdir(path) else (os.path.dirname(rel) or os.curdir))
+            stale_ids = set()
+            changed = {}
+            # parents first: a child's update then refines its reused block
+            for rel_dir in sorted(dirs, key=lambda d: (d != os.curdir, d.count(os.sep), d)):
+                self._sync_directory(rel_dir, stale_ids, changed)
+
+            self._drop_ids(stale_ids)
+            for rel, (mtime, size) in changed.items():
+                self._add_file(rel, mtime, size)
+            modified = bool(stale_ids or changed)
+            if modified:
+                self.generation += 1
+            return modified
+
+    def serves(self, file_filter: Optional[FileFilter]) -> bool:
+        """True if the index holds every file file_filter selects."""
+        return file_filter is None or file_filter.index_key() == self.file_filter.index_key()
+
+    def candidates(self, query: str, base: Optional[str] = None,
+                   file_filter: Optional[FileFilter] = None) -> List[str]:
+        """Paths of files that may match query, in walk order.
+
+        Paths are joined onto base (default: the index root) so they are
+        spelled exactly like the ones search_in_files reports for that root.
+        The include and exclude globs of file_filter narrow the result; the
+        filter must be one the index serves.
+        """
+        with self.lock:
+            paths = self._candidates(query)
+        if file_filter is not None and (file_filter.include or file_filter.exclude):
+            paths = [rel for rel in paths if file_filter.accepts_globs(rel)]
+        base = self.root if base is None else base
+        return [os.path.join(base, rel) for rel in paths]
+
+    def candidates_any(self, literals: Sequence[str], base: Optional[str] = None,
+                       file_filter: Optional[FileFilter] = None) -> List[str]:
+        """Paths of files that may contain any of the literal terms, in walk order."""
+        with self.lock:
+            ids = set()
+            for literal in literals:
+                found = self._candidate_ids(query_trigrams(re.escape(literal)))
+                if found is None:
+                    ids = None
+                    break
+                ids |= found
+            paths = list(self.order) if ids is None else self._paths_for(ids)
+        if file_filter is not None and (file_filter.include or file_filter.exclude):
+            paths = [rel for rel in paths if file_filter.accepts_globs(rel)]
+        base = self.root if base is None else base
+        return [os.path.join(base, rel) for rel in paths]
+
+    def _paths_for(self, ids: Set[int]) -> List[str]:
+        return [rel for rel in self.order if rel in self.files and self.files[rel][2] in ids]
+
+    def _candidates(self, query: str) -> List[str]:
+        ids = self._candidate_ids(query_trigrams(query))
+        return list(self.order) if ids is None else self._paths_for(ids)
+
+    def _candidate_ids(self, grams: Optional[Set[str]]) -> Optional[Set[int]]:
+        # ids of files containing all grams; None if every file is a candidate
+        if grams is None:
+            return None
+        ids = None
+        # intersect the shortest posting lists first
+        for g in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(g)
+            if not posting:
+                return set()
+            ids = set(posting) if ids is None else ids & posting
+            if not ids:
+                return set()
+        return set() if ids is None else ids
+
+    def search(self, query: str, base: Optional[str] = None, file_filter: Optional[FileFilter] = None,
+               max_hits: Optional[int] = None, max_per_file: Optional[int] = None) -> List[Tuple[str, int, str]]:
+        """Search like search_in_files, but only read candidate files."""
+        paths = self.candidates(query, base, file_filter)
+        return list(iter_search(query, base or self.root, paths=paths, file_filter=file_filter or self.file_filter,
+                                max_hits=max_hits, max_per_file=max_per_file))
+
+
+def has_index(root: str) -> bool:
+    """True if an index has been built for root."""
+    root = os.path.abspath(root)
+    return root in _open_indexes or os.path.exists(index_path_for(root))
+
+
+def build_index(root: str) -> TrigramIndex:
+    """Build (or refresh) and persist the index for root."""
+    idx = get_index(root)
+    if idx is None:
+        idx = TrigramIndex(root)
+        with _open_lock:
+            idx = _open_indexes.setdefault(idx.root, idx)
+    if idx.refresh() or not os.path.exists(idx.index_path):
+        idx.save()
+    return idx
+
+
+def get_index(root: str) -> Optional[TrigramIndex]:
+    """Return the loaded index for root, or None if none has been built."""
+    root = os.path.abspath(root)
+    with _open_lock:
+        idx = _open_indexes.get(root)
+        if idx is None:
+            idx = TrigramIndex(root)
+            if not idx.load():
+                return None
+            _open_indexes[root] = idx
+    return idx
+
+
+def index_generation(root: str) -> Optional[int]:
+    """Current generation of the index for root, or None without an index."""
+    idx = get_index(root)
+    return None if idx is None else idx.generation
+
+
+def indexed_candidates(query: str, root: str, refresh: bool = True,
+                       file_filter: Optional[FileFilter] = None) -> Optional[List[str]]:
+    """Refresh the index of root and return the files query must be verified in.
+
+    Pass refresh=False when a watcher keeps the index current. Returns None
+    if no index exists for root or it does not serve file_filter.
+    """
+    idx = get_index(root)
+    if idx is None or not idx.serves(file_filter):
+        return None
+    if refresh and idx.refresh():
+        try:
+            idx.save()
+        except Exception:
+            # a read-only cache only costs the next refresh
+            pass
+    return idx.candidates(query, root, file_filter)
+
+
+def indexed_candidates_any(literals: Sequence[str], root: str, refresh: bool = True,
+                           file_filter: Optional[FileFilter] = None) -> Optional[List[str]]:
+    """Like indexed_candidates, for files containing any of several literal terms."""
+    idx = get_index(root)
+    if idx is None or not idx.serves(file_filter):
+        return None
+    if refresh and idx.refresh():
+        try:
+            idx.save()
+        except Exception:
+            pass
+    return idx.candidates_any(literals, root, file_filter)
+
+
+def search_indexed(query: str, root: str, file_filter: Optional[FileFilter] = None,
+                   max_hits: Optional[int] = None,
+                   max_per_file: Optional[int] = None) -> Optional[List[Tuple[str, int, str]]]:
+    """Search root through its index, refreshing stale entries first.
+
+    Returns None if no index exists for root or it does not serve file_filter.
+    """
+    paths = indexed_candidates(query, root, file_filter=file_filter)
+    if paths is None:
+        return None
+    return list(iter_search(query, root, paths=paths, file_filter=file_filter,
+                            max_hits=max_hits, max_per_file=max_per_file))
@@ -0,0 +1,204 @@
+"""Search many literal terms in one pass with an Aho-Corasick automaton.
+
+Every file is read once no matter how many terms are searched. The
+automaton is compiled into a full transition table (one dict per state), so
+scanning costs one dict lookup per character independent of the number of
+terms. Text is scanned in blocks of whole lines; terms never contain a line
+break, so matches cannot cross lines.
+"""
+
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .logic_filter import FileFilter
+from .logic_index import fold_text
+from .logic_search import _CANCEL_CHECK_LINES, _iter_texts, iter_files
+
+# characters of text scanned per automaton call
+_BLOCK_CHARS = 1 << 20
+
+
+def fold(text: str) -> str:
+    """Case-fold text like the trigram index; the length never changes."""
+    return fold_text(text)
+
+
+class AhoCorasick:
+    """Automaton finding all occurrences of a set of literal terms."""
+
+    def __init__(self, patterns: Sequence[str], ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        # distinct non-empty terms in their given order; line breaks cannot match
+        self.patterns = [p for p in dict.fromkeys(patterns) if p and '\n' not in p and '\r' not in p]
+        goto = [{}]
+        out = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in (fold(pattern) if ignore_case else pattern):
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = out[state] + (index,)
+
+        # breadth-first: fill in failure transitions so that delta[s] holds a
+        # move for every character that leaves the start state
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            row = dict(delta[fail[state]])
+            row.update(goto[state])
+            delta[state] = row
+            out[state] = out[state] + out[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+        self._out = out
+        # bound dict.get per state: the scan loop then does a single call per character
+        self._moves = [row.get for row in delta]
+        self._accepting = [bool(o) for o in out]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """Return (end offset, pattern index) for every occurrence in text.
+
+        The end offset is the index of the last character of the match.
+        """
+        if self.ignore_case:
+            text = fold(text)
+        moves = self._moves
+        accepting = self._accepting
+        state = 0
+        ends = []
+        for pos, ch in enumerate(text):
+            state = moves[state](ch, 0)
+            if accepting[state]:
+                ends.append((pos, state))
+        out = self._out
+        return [(pos, index) for pos, state in ends for index in out[state]]
+
+
+def _iter_blocks(f, cancel=None):
+    # lists of whole lines with about _BLOCK_CHARS characters each
+    block = []
+    size = 0
+    for i, line in enumerate(f, start=1):
+        if cancel is not None and i % _CANCEL_CHECK_LINES == 0 and cancel.is_set():
+            return
+        block.append(line)
+        size += len(line)
+        if size >= _BLOCK_CHARS:
+            yield block
+            block = []
+            size = 0
+    if block:
+        yield block
+
+
+def iter_file_multi_hits(automaton: AhoCorasick, path: str, cancel=None, skip_binary: bool = False,
+                         limit: Optional[int] = None,
+                         archive_limit: Optional[int] = None) -> Iterator[Tuple[str, int, str, str]]:
+    """Yield (filepath, line_number, line_text, pattern) hits in one file.
+
+    A line containing several terms yields one hit per term, in the order the
+    terms first end in the line. Reading stops once limit hits were found.
+    Archives are searched member by member as in iter_file_hits.
+    """
+    if not automaton.patterns or (limit is not None and limit <= 0):
+        return
+    patterns = automaton.patterns
+    found = 0
+    try:
+        for name, f in _iter_texts(path, skip_binary, archive_limit):
+            line_no = 1
+            for block in _iter_blocks(f, cancel):
+                matches = automaton.find(''.join(block))
+                if matches:
+                    starts = []
+                    offset = 0
+                    for line in block:
+                        starts.append(offset)
+                        offset += len(line)
+                    seen = set()
+                    for pos, index in matches:
+                        row = bisect_right(starts, pos) - 1
+                        if (row, index) in seen:
+                            continue
+                        seen.add((row, index))
+                        yield (name, line_no + row, block[row].rstrip('\n'), patterns[index])
+                        found += 1
+                        if found == limit:
+                            return
+                line_no += len(block)
+    except Exception:
+        # ignore unreadable files (keep hits read before the error)
+        return
+
+
+def iter_search_multi(patterns: Sequence[str], root: str, paths: Optional[Iterable[str]] = None, cancel=None,
+                      on_file: Optional[Callable[[str], None]] = None,
+                      file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                      max_per_file: Optional[int] = None,
+                      ignore_case: bool = True) -> Iterator[Tuple[str, int, str, str]]:
+    """Search all literal patterns at once; arguments as for iter_search.
+
+    Yields (filepath, line_number, line_text, pattern).
+    """
+    file_filter = file_filter or FileFilter()
+    automaton = AhoCorasick(patterns, ignore_case)
+    if not automaton.patterns:
+        return
+    found = 0
+    for path in (iter_files(root, file_filter) if paths is None else paths):
+        if cancel is not None and cancel.is_set():
+            return
+        if max_hits is not None and found >= max_hits:
+            return
+        if on_file is not None:
+            on_file(path)
+        limit = max_per_file
+        if max_hits is not None:
+            limit = max_hits - found if limit is None else min(limit, max_hits - found)
+        for hit in iter_file_multi_hits(automaton, path, cancel, file_filter.skip_binary, limit,
+                                        file_filter.archive_limit):
+            found += 1
+            yield hit
+
+
+def search_multi(patterns: Sequence[str], root: str, file_filter: Optional[FileFilter] = None,
+                 max_hits: Optional[int] = None, max_per_file: Optional[int] = None,
+                 ignore_case: bool = True) -> List[Tuple[str, int, str, str]]:
+    """Return (filepath, line_number, line_text, pattern) for every term found under root."""
+    return list(iter_search_multi(patterns, root, file_filter=file_filter, max_hits=max_hits,
+                                  max_per_file=max_per_file, ignore_case=ignore_case))
+
+
+def iter_multi_counts(patterns: Sequence[str], root: str, paths: Optional[Iterable[str]] = None, cancel=None,
+                      on_file: Optional[Callable[[str], None]] = None,
+                      file_filter: Optional[FileFilter] = None,
+                      ignore_case: bool = True) -> Iterator[Tuple[str, Dict[str, int]]]:
+    """Yield (filepath, {pattern: matching lines}) for every file with a match."""
+    file_filter = file_filter or FileFilter()
+    automaton = AhoCorasick(patterns, ignore_case)
+    if not automaton.patterns:
+        return
+    for path in (iter_files(root, file_filter) if paths is None else paths):
+        if cancel is not None and cancel.is_set():
+            return
+        if on_file is not None:
+            on_file(path)
+        counts = {}
+        for hit_path, _, _, pattern in iter_file_multi_hits(automaton, path, cancel, file_filter.skip_binary,
+                                                            archive_limit=file_filter.archive_limit):
+            per_term = counts.setdefault(hit_path, {})
+            per_term[pattern] = per_term.get(pattern, 0) + 1
+        yield from counts.items()
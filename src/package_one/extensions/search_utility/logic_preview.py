@@ -0,0 +1,242 @@
+"""Random access to the lines of a file for the result preview.
+
+LineIndex records the byte offset of every INDEX_STEP-th line start. Lines
+end at \\n, \\r\\n or a lone \\r like in the scanners, so line numbers agree
+with the search hits. Indexes of large files are stored as sidecar files in
+the cache directory and reused while the file keeps its mtime and size.
+
+read_window maps only a small window of the file around the wanted lines,
+so once the index exists a preview costs the same for any file size.
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .logic_archive import MEMBER_SEPARATOR, is_archive, iter_members
+from .logic_index import _cache_dir
+
+# one offset is kept per this many lines
+INDEX_STEP = 256
+
+# files at least this large get a sidecar index on disk
+SIDECAR_MIN_SIZE = 8 << 20
+
+# bytes mapped at once while building an index and for one preview window
+_BUILD_CHUNK = 16 << 20
+MAX_WINDOW_BYTES = 1 << 20
+
+# preview lines are cut to this many characters
+MAX_LINE_CHARS = 2000
+
+# line indexes kept in memory
+_RECENT_INDEXES = 16
+
+_BREAK = re.compile(rb'\r\n|\r|\n')
+_HEADER = struct.Struct('<4sIqqqq')
+_MAGIC = b'PLIX'
+_VERSION = 1
+
+_recent: 'OrderedDict[tuple, LineIndex]' = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _lines_re(count: int):
+    # matches exactly count lines ending in \n (re caches the compiled patterns)
+    return re.compile(rb'(?:[^\n]*\n){%d}' % count)
+
+
+def _anchor_ends(data: bytes, lone_cr: bool, skip: int, step: int) -> List[int]:
+    """Offsets in data just after break number skip, skip + step, skip + 2 * step, ..."""
+    if lone_cr:
+        return [m.end() for m in _BREAK.finditer(data)][skip - 1::step]
+    # without lone \r every break ends in \n; the regex engine counts the lines
+    ends = []
+    m = _lines_re(skip).match(data)
+    step_re = _lines_re(step)
+    while m is not None:
+        ends.append(m.end())
+        m = step_re.match(data, m.end())
+    return ends
+
+
+class LineIndex:
+    """Byte offsets of every step-th line start of one file version."""
+
+    def __init__(self, size: int, mtime_ns: int, anchors: array, line_count: int, step: int = INDEX_STEP):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # anchors[i] is the offset of line i * step + 1
+        self.anchors = anchors
+        self.line_count = line_count
+        self.step = step
+
+    @classmethod
+    def build(cls, path: str, step: int = INDEX_STEP) -> 'LineIndex':
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            anchors = array('q', [0])
+            line = 1            # number of the line starting at pos
+            next_anchor = 1 + step
+            if st.st_size == 0:
+                return cls(0, st.st_mtime_ns, anchors, 0, step)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                pos = 0
+                while pos < size:
+                    end = min(pos + _BUILD_CHUNK, size)
+                    if end < size and mm[end - 1] == 13 and mm[end] == 10:
+                        end += 1  # keep \r\n together
+                    data = mm[pos:end]
+                    crs = data.count(b'\r')
+                    lone_cr = crs and crs != data.count(b'\r\n')
+                    if lone_cr:
+                        breaks = data.count(b'\n') + crs - data.count(b'\r\n')
+                    else:
+                        breaks = data.count(b'\n')
+                    if line + breaks >= next_anchor:
+                        picked = _anchor_ends(data, lone_cr, next_anchor - line, step)
+                        anchors.extend(pos + e for e in picked)
+                        next_anchor += len(picked) * step
+                    line += breaks
+                    pos = end
+                last = mm[size - 1]
+            # a final line break does not start another line
+            line_count = line - 1 if last in (10, 13) else line
+            return cls(size, st.st_mtime_ns, anchors, line_count, step)
+
+    def anchor(self, line_no: int) -> Tuple[int, int]:
+        """(line number, byte offset) of the indexed line start at or before line_no."""
+        i = min(max(line_no - 1, 0) // self.step, len(self.anchors) - 1)
+        return i * self.step + 1, self.anchors[i]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.size, self.mtime_ns, self.step, self.line_count))
+            self.anchors.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LineIndex']:
+        try:
+            with open(path, 'rb') as f:
+                magic, version, size, mtime_ns, step, line_count = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or version != _VERSION:
+                    return None
+                anchors = array('q')
+                anchors.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return None
+        return cls(size, mtime_ns, anchors, line_count, step)
+
+
+def sidecar_path(path: str) -> str:
+    """Location of the sidecar line index of path."""
+    key = os.path.normcase(os.path.abspath(path)).encode('utf-8', 'surrogateescape')
+    return os.path.join(os.path.dirname(_cache_dir()), 'line_index', hashlib.sha1(key).hexdigest() + '.bin')
+
+
+def line_index(path: str) -> LineIndex:
+    """Line index of path, from memory, its sidecar or a new scan (stored if large)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _recent_lock:
+        idx = _recent.get(key)
+        if idx is not None:
+            _recent.move_to_end(key)
+            return idx
+    idx = None
+    sidecar = sidecar_path(path) if st.st_size >= SIDECAR_MIN_SIZE else None
+    if sidecar is not None:
+        idx = LineIndex.load(sidecar)
+        if idx is not None and (idx.size, idx.mtime_ns) != (st.st_size, st.st_mtime_ns):
+            idx = None
+    if idx is None:
+        idx = LineIndex.build(path)
+        if sidecar is not None and (idx.size, idx.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            try:
+                idx.save(sidecar)
+            except OSError:
+                pass
+    with _recent_lock:
+        _recent[key] = idx
+        while len(_recent) > _RECENT_INDEXES:
+            _recent.popitem(last=False)
+    return idx
+
+
+def split_member_path(path: str) -> Optional[Tuple[str, str]]:
+    """(archive, member) for an archive!member hit path, None for a plain file."""
+    start = 0
+    while True:
+        i = path.find(MEMBER_SEPARATOR, start)
+        if i < 0:
+            return None
+        archive = path[:i]
+        if is_archive(archive) and os.path.isfile(archive):
+            return archive, path[i + 1:]
+        start = i + 1
+
+
+def _cut(line: str) -> str:
+    return line[:MAX_LINE_CHARS]
+
+
+def _member_window(archive: str, member: str, first: int, last: int) -> List[str]:
+    # archive members cannot be seeked; stream up to the last wanted line
+    for name, stream in iter_members(archive):
+        if name != archive + MEMBER_SEPARATOR + member:
+            continue
+        lines = []
+        with io.TextIOWrapper(stream, encoding='utf-8', errors='ignore') as f:
+            for i, line in enumerate(f, start=1):
+                if i > last:
+                    break
+                if i >= first:
+                    lines.append(_cut(line.rstrip('\n')))
+        return lines
+    return []
+
+
+def read_window(path: str, line_no: int, before: int = 0, after: int = 0) -> Tuple[int, List[str]]:
+    """Return (number of the first line, lines) around line_no of path.
+
+    Only the part of the file from the nearest indexed line on is mapped.
+    Hit paths of archive members (archive!member) are read by streaming.
+    """
+    first = max(1, line_no - before)
+    last = max(first, line_no + after)
+    member = split_member_path(path) if not os.path.isfile(path) else None
+    if member is not None:
+        return first, _member_window(member[0], member[1], first, last)
+    idx = line_index(path)
+    line, offset = idx.anchor(first)
+    lines = []
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset >= size:
+            return first, lines
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        length = min(size - start, offset - start + MAX_WINDOW_BYTES)
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=start) as mm:
+            pos = offset - start
+            for m in _BREAK.finditer(mm, pos):
+                if line >= first:
+                    lines.append(_cut(mm[pos:m.start()].decode('utf-8', 'ignore')))
+                if line >= last:
+                    return first, lines
+                line += 1
+                pos = m.end()
+            if pos < length and line >= first:
+                # last line of the file, or cut off at the end of the window
+                lines.append(_cut(mm[pos:length].decode('utf-8', 'ignore')))
+    return first, lines
@@ -0,0 +1,151 @@
+"""Plan how a search query is matched.
+
+plan_query parses the regular expression once and works out
+
+* the literals every match must contain: runs of plain characters at any
+  nesting level, as long as the construct around them has to match
+  (groups, repeats with a minimum of one or more). An alternation adds a
+  requirement when every branch has a literal; one of them must occur.
+* whether matching can take runaway time: unbounded repeats and
+  backreferences can backtrack exponentially on unlucky lines, so such
+  queries are run in a worker process that can be killed (see
+  logic_search.iter_search_guarded).
+
+The scanners use the literals as a cheap prefilter, so the full regex only
+runs on lines that contain them.
+"""
+
+import re
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+    from re import _constants as _sre_constants
+except ImportError:
+    import sre_parse as _sre_parse
+    import sre_constants as _sre_constants
+
+_REPEATS = tuple(getattr(_sre_constants, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                 if hasattr(_sre_constants, name))
+
+
+def compile_query(query: str) -> Pattern:
+    """Compile a user query the same way for every search engine."""
+    return re.compile(query, re.IGNORECASE)
+
+
+def _requirements(items) -> List[Tuple[str, ...]]:
+    # literals (as tuples of alternatives) a match of the parsed items must contain
+    found = []
+    run = []
+    for op, av in list(items) + [(None, None)]:
+        if op == _sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            found.append((''.join(run),))
+            run = []
+        if op == _sre_constants.SUBPATTERN:
+            found.extend(_requirements(av[-1]))
+        elif op in _REPEATS and av[0] >= 1:
+            found.extend(_requirements(av[2]))
+        elif op == _sre_constants.BRANCH:
+            best = [_best_single(_requirements(branch)) for branch in av[1]]
+            if all(best):
+                found.append(tuple(dict.fromkeys(best)))
+    return found
+
+
+def _best_single(requirements: Sequence[Tuple[str, ...]]) -> Optional[str]:
+    singles = [r[0] for r in requirements if len(r) == 1]
+    return max(singles, key=len) if singles else None
+
+
+def _may_backtrack(items) -> bool:
+    for op, av in items:
+        if op == _sre_constants.GROUPREF:
+            return True
+        if op in _REPEATS:
+            if av[1] == _sre_constants.MAXREPEAT or _may_backtrack(av[2]):
+                return True
+        elif op == _sre_constants.SUBPATTERN:
+            if _may_backtrack(av[-1]):
+                return True
+        elif op == _sre_constants.BRANCH:
+            if any(_may_backtrack(branch) for branch in av[1]):
+                return True
+        elif op in (_sre_constants.ASSERT, _sre_constants.ASSERT_NOT):
+            if _may_backtrack(av[1]):
+                return True
+        elif op == getattr(_sre_constants, 'GROUPREF_EXISTS', None):
+            return True
+    return False
+
+
+class QueryPlan:
+    """How one query is searched.
+
+    pattern: the compiled query (compile_query).
+    requirements: tuples of literals; every match contains one literal of each tuple.
+    literal: the longest literal every match contains, or None.
+    guarded: True if matching may backtrack for a long time.
+    line_filter: regex finding the most selective requirement in a line, or
+    None if there is none worth checking before the full regex.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.pattern = compile_query(query)
+        try:
+            parsed = _sre_parse.parse(query, re.IGNORECASE)
+        except Exception:
+            parsed = []
+        self.requirements = _requirements(parsed)
+        self.literal = _best_single(self.requirements)
+        self.guarded = _may_backtrack(parsed)
+        self.line_filter = None
+        best = self.best_requirement()
+        if best is not None and self.guarded:
+            # a fixed-string search is much cheaper than trying the full
+            # pattern at every position of a line that cannot match
+            self.line_filter = re.compile('|'.join(re.escape(lit) for lit in best), re.IGNORECASE)
+
+    def best_requirement(self) -> Optional[Tuple[str, ...]]:
+        """The requirement whose shortest literal is longest (the most selective one)."""
+        if not self.requirements:
+            return None
+        return max(self.requirements, key=lambda alternatives: (min(map(len, alternatives)), -len(alternatives)))
+
+
+def plan_query(query: str) -> QueryPlan:
+    """Parse and compile query; raises re.error for invalid patterns."""
+    return QueryPlan(query)
+
+
+def plain_literal(query: str) -> Optional[str]:
+    """The text query matches if it is a plain literal (no regex syntax), else None."""
+    try:
+        parsed = list(_sre_parse.parse(query, re.IGNORECASE))
+    except Exception:
+        return None
+    if not parsed or any(op != _sre_constants.LITERAL for op, _ in parsed):
+        return None
+    return ''.join(chr(av) for _, av in parsed)
+
+
+def narrows(previous: str, query: str) -> bool:
+    """True if every line matching query also matches the plain literal previous.
+
+    Then a search for query only has to read the files previous matched in,
+    e.g. TODO after TOD, or 'TODO.*fix' after 'todo'. Conservative: False
+    whenever that cannot be told from the literals query requires.
+    """
+    old = plain_literal(previous)
+    if old is None:
+        return False
+    try:
+        plan = plan_query(query)
+    except re.error:
+        return False
+    old = old.lower()
+    return any(len(r) == 1 and old in r[0].lower() for r in plan.requirements)
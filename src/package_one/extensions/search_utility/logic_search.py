@@ -1,32 +1,764 @@
+import io
+import mmap
+import multiprocessing
+from collections import deque
 import os
 import re
-from typing import List, Tuple
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Pattern, Sequence, Tuple
 
+from .logic_archive import is_archive, iter_members
+from .logic_filter import SKIP_EXTENSIONS, SNIFF_BYTES, FileFilter, is_binary  # noqa: F401 (SKIP_EXTENSIONS re-exported)
+from .logic_query import compile_query, plan_query  # noqa: F401 (compile_query re-exported)
 
-def search_in_files(query: str, root: str) -> List[Tuple[str, int, str]]:
+# files handed to a worker process per task in parallel mode
+DEFAULT_CHUNK_SIZE = 64
+
+# lines scanned between two cancellation checks inside one file
+_CANCEL_CHECK_LINES = 4096
+
+# shortest required literal worth a byte-level prefilter
+MIN_LITERAL_LENGTH = 3
+
+# non-ASCII characters re.IGNORECASE matches against an ASCII letter
+_UNICODE_CASE_EQUIVALENTS = {'i': '\u0130\u0131', 'k': '\u212a', 's': '\u017f'}
+
+# approximate bytes per slice of the memory-mapped literal search
+_SCAN_CHUNK = 1 << 20
+
+# seconds a guarded search may spend on one file before the worker is killed
+DEFAULT_FILE_TIMEOUT = 10.0
+
+# files skipped for being too slow before a guarded search gives up
+DEFAULT_MAX_TIMEOUTS = 3
+
+# paths sent to the guarded worker at a time; seconds between liveness
+# checks; longest time the worker holds back finished answers
+_GUARD_BATCH = 256
+_GUARD_POLL = 0.05
+_GUARD_FLUSH = 0.02
+
+# workers in a row that may stop before starting a file
+_GUARD_RESTARTS = 3
+
+
+def iter_files(root: str, file_filter: Optional[FileFilter] = None) -> Iterator[str]:
+    """Yield every searchable file path under root in os.walk order.
+
+    file_filter defaults to FileFilter(), which prunes tool directories and
+    honours ignore files.
+    """
+    for rel, _ in (file_filter or FileFilter()).walk(root):
+        yield os.path.join(root, rel)
+
+
+def required_literal(query: str) -> Optional[str]:
+    """Return the longest literal every match of query must contain, or None.
+
+    A line can only match if it contains the returned text (ignoring case);
+    see logic_query for how the literals are found.
+    """
+    try:
+        return plan_query(query).literal
+    except Exception:
+        return None
+
+
+def _byte_variants(literal: str) -> bytes:
+    # bytes regex matching literal like re.IGNORECASE does in UTF-8 text
+    parts = []
+    for ch in literal:
+        alternatives = _UNICODE_CASE_EQUIVALENTS.get(ch.lower(), '')
+        options = [re.escape(ch.encode('ascii'))] + [re.escape(a.encode('utf-8')) for a in alternatives]
+        parts.append(b'(?:' + b'|'.join(options) + b')' if alternatives else options[0])
+    return b''.join(parts)
+
+
+class LiteralPrefilter:
+    """Case-insensitive byte-level search for the required literal of a query."""
+
+    def __init__(self, literal: str):
+        self.literal = literal
+        self.needle = literal.lower().encode('ascii')
+        # non-ASCII case variants can only occur in non-ASCII files, where
+        # this slower pattern is used instead of the lowered-chunk search
+        self.unicode_pattern = None
+        if any(ch.lower() in _UNICODE_CASE_EQUIVALENTS for ch in literal):
+            self.unicode_pattern = re.compile(_byte_variants(literal), re.IGNORECASE)
+
+    def positions(self, data: bytes, ascii_only: bool, max_hits: Optional[int] = None) -> Optional[List[int]]:
+        """Return the start offset of every occurrence of the literal in data.
+
+        Returns None instead if there are more than max_hits occurrences.
+        """
+        if not ascii_only and self.unicode_pattern is not None:
+            found = []
+            for m in self.unicode_pattern.finditer(data):
+                if max_hits is not None and len(found) >= max_hits:
+                    return None
+                found.append(m.start())
+            return found
+        low = data.lower()
+        if max_hits is not None and low.count(self.needle) > max_hits:
+            return None
+        found = []
+        i = low.find(self.needle)
+        while i >= 0:
+            found.append(i)
+            i = low.find(self.needle, i + 1)
+        return found
+
+
+class AnyLiteralPrefilter:
+    """Byte-level search for any of several literals (a required alternation)."""
+
+    def __init__(self, literals: Sequence[str]):
+        self.literals = tuple(literals)
+        self.pattern = re.compile(b'|'.join(_byte_variants(lit) for lit in self.literals), re.IGNORECASE)
+
+    def positions(self, data: bytes, ascii_only: bool, max_hits: Optional[int] = None) -> Optional[List[int]]:
+        """Like LiteralPrefilter.positions, for the start of any literal."""
+        found = []
+        for m in self.pattern.finditer(data):
+            if max_hits is not None and len(found) >= max_hits:
+                return None
+            found.append(m.start())
+        return found
+
+
+def _usable_literal(literal: str) -> bool:
+    return (len(literal) >= MIN_LITERAL_LENGTH and literal.isascii()
+            and '\n' not in literal and '\r' not in literal)
+
+
+def literal_prefilter(query: str):
+    """Return a byte-level prefilter finding every line that can match query.
+
+    The longest required ASCII literal is searched directly; failing that, a
+    required alternation whose branches all have such literals. Returns None
+    when there is neither; such queries are scanned line by line as text.
+    """
+    try:
+        plan = plan_query(query)
+    except Exception:
+        return None
+    singles = [r[0] for r in plan.requirements if len(r) == 1 and _usable_literal(r[0])]
+    if singles:
+        return LiteralPrefilter(max(singles, key=len))
+    choices = [r for r in plan.requirements if len(r) > 1 and all(map(_usable_literal, r))]
+    if choices:
+        return AnyLiteralPrefilter(max(choices, key=lambda r: min(map(len, r))))
+    return None
+
+
+def _count_line_breaks(data: bytes) -> int:
+    # universal newlines: \n, \r\n and a lone \r each end one line
+    count = data.count(b'\n')
+    if b'\r' in data:
+        count += data.count(b'\r') - data.count(b'\r\n')
+    return count
+
+
+def _scan_text_lines(pattern: Pattern, path: str, text: str, line_no: int, results: list) -> int:
+    """Scan decoded text like the text-mode reader; return the next line number."""
+    i = -1
+    for i, line in enumerate(io.StringIO(text, newline=None)):
+        if pattern.search(line):
+            results.append((path, line_no + i, line.rstrip('\n')))
+    return line_no + i + 1
+
+
+def _scan_candidate_lines(pattern: Pattern, path: str, raw: bytes, positions: List[int],
+                          line_no: int, results: list) -> int:
+    """Decode and check only the lines of raw containing a literal hit."""
+    size = len(raw)
+    line_start = 0      # start of the line line_no refers to
+    next_start = 0      # first byte after the last decoded line
+    for pos in positions:
+        if pos < next_start:
+            continue
+        start = max(raw.rfind(b'\n', line_start, pos), raw.rfind(b'\r', line_start, pos)) + 1
+        start = max(start, line_start)
+        line_no += _count_line_breaks(raw[line_start:start])
+        line_start = start
+        end = raw.find(b'\n', pos)
+        end = size if end < 0 else end
+        cr = raw.find(b'\r', pos, end)
+        end = end if cr < 0 else cr
+        content = raw[start:end].decode('utf-8')
+        if end < size:
+            next_start = end + (2 if raw[end:end + 2] == b'\r\n' else 1)
+            line = content + '\n'
+        else:
+            next_start = size
+            line = content
+        if pattern.search(line):
+            results.append((path, line_no, content))
+    return line_no + _count_line_breaks(raw[line_start:])
+
+
+def _mmap_file_hits(pattern: Pattern, prefilter: LiteralPrefilter, path: str, cancel=None,
+                    skip_binary: bool = False, limit: Optional[int] = None) -> Optional[List[Tuple[str, int, str]]]:
+    """Find hits by searching the raw bytes of a memory-mapped file.
+
+    The file is processed in slices ending on a line break. Slices without
+    the literal are skipped after counting their line breaks; in the others
+    only the lines containing the literal are decoded and checked with
+    pattern. Slices that are not valid UTF-8, or where most lines are hits,
+    are decoded and scanned like the text-mode reader does, so results are
+    always identical. With limit, reading stops after the slice in which
+    the limit was reached. Returns None if the file cannot be mapped.
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if skip_binary and is_binary(mm[:SNIFF_BYTES]):
+                    return []
+                results = []
+                line_no = 1
+                a = 0
+                while a < size:
+                    if cancel is not None and cancel.is_set():
+                        break
+                    if limit is not None and len(results) >= limit:
+                        del results[limit:]
+                        break
+                    b = mm.find(b'\n', min(a + _SCAN_CHUNK, size) - 1)
+                    b = size if b < 0 else b + 1
+                    raw = mm[a:b]
+                    a = b
+                    ascii_only = raw.isascii()
+                    if not ascii_only:
+                        try:
+                            raw.decode('utf-8')
+                        except UnicodeDecodeError:
+                            # invalid bytes are dropped by the text reader,
+                            # which may join a literal the byte search misses
+                            line_no = _scan_text_lines(pattern, path, raw.decode('utf-8', 'ignore'), line_no, results)
+                            continue
+                    breaks = _count_line_breaks(raw)
+                    # once a quarter of the lines are hits, a plain line scan is cheaper
+                    positions = prefilter.positions(raw, ascii_only, breaks // 4)
+                    if positions is None:
+                        line_no = _scan_text_lines(pattern, path, raw.decode('utf-8'), line_no, results)
+                    elif not positions:
+                        line_no += breaks
+                    else:
+                        line_no = _scan_candidate_lines(pattern, path, raw, positions, line_no, results)
+                if limit is not None:
+                    del results[limit:]
+                return results
+    except (OSError, ValueError):
+        return None
+
+
+def _open_text(path: str, skip_binary: bool = False) -> Optional[io.TextIOWrapper]:
+    # text-mode reader used by every scanner; None for a skipped binary file
+    raw = open(path, 'rb')
+    if skip_binary:
+        try:
+            binary = is_binary(raw.read(SNIFF_BYTES))
+            raw.seek(0)
+        except Exception:
+            raw.close()
+            raise
+        if binary:
+            raw.close()
+            return None
+    return io.TextIOWrapper(raw, encoding='utf-8', errors='ignore')
+
+
+def _iter_texts(path: str, skip_binary: bool = False,
+                archive_limit: Optional[int] = None) -> Iterator[Tuple[str, io.TextIOWrapper]]:
+    """Yield (hit path, text stream) for a file, or for every member of an archive.
+
+    With archive_limit set, gzip, bz2 and zip files are read member by
+    member (at most archive_limit decompressed bytes in total) and hits are
+    reported as archive!member. Streams are closed when the iteration moves on.
+    """
+    if archive_limit is None or not is_archive(path):
+        f = _open_text(path, skip_binary)
+        if f is not None:
+            with f:
+                yield path, f
+        return
+    for name, stream in iter_members(path, archive_limit):
+        if skip_binary and is_binary(stream.peek(SNIFF_BYTES)):
+            continue
+        yield name, io.TextIOWrapper(stream, encoding='utf-8', errors='ignore')
+
+
+def iter_file_hits(pattern: Pattern, path: str, cancel=None,
+                   prefilter: Optional[LiteralPrefilter] = None,
+                   skip_binary: bool = False, limit: Optional[int] = None,
+                   archive_limit: Optional[int] = None,
+                   line_filter: Optional[Pattern] = None) -> Iterator[Tuple[str, int, str]]:
+    """Yield (filepath, line_number, line_text) hits of pattern in one file.
+
+    cancel is an optional threading.Event; reading stops soon after it is set.
+    prefilter comes from literal_prefilter; with it the file is searched
+    memory-mapped and only candidate lines are decoded. With skip_binary a
+    file whose first bytes look binary yields nothing. Reading stops once
+    limit hits were found. archive_limit enables searching inside archives
+    (see _iter_texts). line_filter (QueryPlan.line_filter) is tried before
+    pattern on lines read as text.
+    """
+    if limit is not None and limit <= 0:
+        return
+    if prefilter is not None and (archive_limit is None or not is_archive(path)):
+        hits = _mmap_file_hits(pattern, prefilter, path, cancel, skip_binary, limit)
+        if hits is not None:
+            yield from hits
+            return
+    found = 0
+    try:
+        for name, f in _iter_texts(path, skip_binary, archive_limit):
+            for i, line in enumerate(f, start=1):
+                if cancel is not None and i % _CANCEL_CHECK_LINES == 0 and cancel.is_set():
+                    return
+                if (line_filter is None or line_filter.search(line)) and pattern.search(line):
+                    yield (name, i, line.rstrip('\n'))
+                    found += 1
+                    if found == limit:
+                        return
+    except Exception:
+        # ignore unreadable files (keep hits read before the error)
+        return
+
+
+def iter_file_context(pattern: Pattern, path: str, before: int = 0, after: int = 0, cancel=None,
+                      skip_binary: bool = False, limit: Optional[int] = None,
+                      archive_limit: Optional[int] = None, line_filter: Optional[Pattern] = None) -> Iterator[tuple]:
+    """Yield (filepath, line_number, line_text, before_lines, after_lines) per hit.
+
+    before_lines and after_lines are lists of (line_number, line_text) with
+    up to before/after lines around the hit. Only the last before lines are
+    kept in a ring buffer, so memory does not grow with the file. Reading
+    stops once limit hits and their after-context were read.
+    """
+    if limit is not None and limit <= 0:
+        return
+    found = 0
+    try:
+        for name, f in _iter_texts(path, skip_binary, archive_limit):
+            if limit is not None and found >= limit:
+                return
+            for hit in _iter_text_context(pattern, name, f, before, after, cancel,
+                                          None if limit is None else limit - found, line_filter):
+                found += 1
+                yield hit
+            if cancel is not None and cancel.is_set():
+                return
+    except Exception:
+        # ignore unreadable files and archives
+        return
+
+
+def _iter_text_context(pattern: Pattern, path: str, f, before: int, after: int, cancel,
+                       limit: Optional[int], line_filter: Optional[Pattern] = None) -> Iterator[tuple]:
+    # iter_file_context for one open text stream
+    if limit is not None and limit <= 0:
+        return
+    ring = deque(maxlen=before) if before > 0 else None
+    waiting = deque()   # hits still collecting after-context
+    found = 0
+    try:
+        for i, line in enumerate(f, start=1):
+            if cancel is not None and i % _CANCEL_CHECK_LINES == 0 and cancel.is_set():
+                return
+            text = line.rstrip('\n')
+            for hit in waiting:
+                hit[4].append((i, text))
+            while waiting and len(waiting[0][4]) >= after:
+                yield tuple(waiting.popleft())
+            if limit is None or found < limit:
+                if (line_filter is None or line_filter.search(line)) and pattern.search(line):
+                    found += 1
+                    hit = [path, i, text, list(ring) if ring is not None else [], []]
+                    if after > 0:
+                        waiting.append(hit)
+                    else:
+                        yield tuple(hit)
+            elif not waiting:
+                return
+            if ring is not None:
+                ring.append((i, text))
+    except Exception:
+        # ignore unreadable files (keep hits read before the error)
+        pass
+    while waiting:
+        yield tuple(waiting.popleft())
+
+
+def search_file(pattern: Pattern, path: str, prefilter: Optional[LiteralPrefilter] = None,
+                skip_binary: bool = False, limit: Optional[int] = None,
+                archive_limit: Optional[int] = None) -> List[Tuple[str, int, str]]:
+    """Return all (filepath, line_number, line_text) hits of pattern in one file."""
+    return list(iter_file_hits(pattern, path, prefilter=prefilter, skip_binary=skip_binary, limit=limit,
+                               archive_limit=archive_limit))
+
+
+def _file_limit(max_per_file: Optional[int], max_hits: Optional[int], found: int) -> Optional[int]:
+    # hits still allowed in the next file
+    if max_hits is None:
+        return max_per_file
+    left = max_hits - found
+    return left if max_per_file is None else min(left, max_per_file)
+
+
+def iter_search(query: str, root: str, paths: Optional[Iterable[str]] = None, cancel=None,
+                on_file: Optional[Callable[[str], None]] = None,
+                file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                max_per_file: Optional[int] = None) -> Iterator[Tuple[str, int, str]]:
+    """Generator version of search_in_files.
+
+    Hits are yielded as soon as they are found. paths replaces the walk of
+    root (e.g. candidates from an index), cancel is an optional
+    threading.Event that stops the walk, and on_file is called with every
+    file path before it is scanned. The walk stops after max_hits hits and
+    every file after max_per_file hits. Hits inside archives are reported
+    as archive!member (see FileFilter.archives).
+    """
+    file_filter = file_filter or FileFilter()
+    plan = plan_query(query)
+    prefilter = literal_prefilter(query)
+    skip_binary = file_filter.skip_binary
+    archive_limit = file_filter.archive_limit
+    found = 0
+    for path in (iter_files(root, file_filter) if paths is None else paths):
+        if cancel is not None and cancel.is_set():
+            return
+        if max_hits is not None and found >= max_hits:
+            return
+        if on_file is not None:
+            on_file(path)
+        for hit in iter_file_hits(plan.pattern, path, cancel, prefilter, skip_binary,
+                                  _file_limit(max_per_file, max_hits, found), archive_limit, plan.line_filter):
+            found += 1
+            yield hit
+
+
+def iter_search_context(query: str, root: str, before: int = 0, after: int = 0,
+                        paths: Optional[Iterable[str]] = None, cancel=None,
+                        on_file: Optional[Callable[[str], None]] = None,
+                        file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                        max_per_file: Optional[int] = None) -> Iterator[tuple]:
+    """Like iter_search, but yield hits with context (see iter_file_context)."""
+    file_filter = file_filter or FileFilter()
+    plan = plan_query(query)
+    pattern = plan.pattern
+    prefilter = literal_prefilter(query)
+    found = 0
+    for path in (iter_files(root, file_filter) if paths is None else paths):
+        if cancel is not None and cancel.is_set():
+            return
+        if max_hits is not None and found >= max_hits:
+            return
+        if on_file is not None:
+            on_file(path)
+        # the byte-level search answers cheaply whether the file has a hit at all
+        if prefilter is not None and not search_file(pattern, path, prefilter, file_filter.skip_binary, 1,
+                                                     file_filter.archive_limit):
+            continue
+        for hit in iter_file_context(pattern, path, before, after, cancel, file_filter.skip_binary,
+                                     _file_limit(max_per_file, max_hits, found), file_filter.archive_limit,
+                                     plan.line_filter):
+            found += 1
+            yield hit
+
+
+def search_in_files(query: str, root: str, file_filter: Optional[FileFilter] = None,
+                    max_hits: Optional[int] = None, max_per_file: Optional[int] = None) -> List[Tuple[str, int, str]]:
     """Search for query (regex or plain text) in files under root.
     Returns list of tuples (filepath, line_number, line_text).
+    file_filter selects the files (default: FileFilter()); the search stops
+    after max_hits hits in total and max_per_file hits per file.
+    """
+    return list(iter_search(query, root, file_filter=file_filter, max_hits=max_hits, max_per_file=max_per_file))
+
+
+def search_with_context(query: str, root: str, before: int = 0, after: int = 0,
+                        file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                        max_per_file: Optional[int] = None) -> List[tuple]:
+    """Return (filepath, line_number, line_text, before_lines, after_lines) hits."""
+    return list(iter_search_context(query, root, before, after, file_filter=file_filter,
+                                    max_hits=max_hits, max_per_file=max_per_file))
+
+
+def files_with_matches(query: str, root: str, file_filter: Optional[FileFilter] = None,
+                       max_files: Optional[int] = None) -> List[str]:
+    """Paths of the files containing a match; each file is read up to its first hit."""
+    return [path for path, _, _ in iter_search(query, root, file_filter=file_filter,
+                                               max_hits=max_files, max_per_file=1)]
+
+
+def iter_counts(query: str, root: str, paths: Optional[Iterable[str]] = None, cancel=None,
+                on_file: Optional[Callable[[str], None]] = None,
+                file_filter: Optional[FileFilter] = None) -> Iterator[Tuple[str, int]]:
+    """Yield (filepath, number of matching lines) for every file with a match.
+
+    Arguments as for iter_search; no line text is kept. Archive members are
+    counted separately.
     """
+    file_filter = file_filter or FileFilter()
+    plan = plan_query(query)
+    prefilter = literal_prefilter(query)
+    for path in (iter_files(root, file_filter) if paths is None else paths):
+        if cancel is not None and cancel.is_set():
+            return
+        if on_file is not None:
+            on_file(path)
+        counts = {}
+        for hit_path, _, _ in iter_file_hits(plan.pattern, path, cancel, prefilter, file_filter.skip_binary,
+                                             archive_limit=file_filter.archive_limit,
+                                             line_filter=plan.line_filter):
+            counts[hit_path] = counts.get(hit_path, 0) + 1
+        yield from counts.items()
+
+
+def count_matches(query: str, root: str, file_filter: Optional[FileFilter] = None) -> List[Tuple[str, int]]:
+    """(filepath, number of matching lines) for every file with a match, in walk order."""
+    return list(iter_counts(query, root, file_filter=file_filter))
+
+
+def _search_chunk(query: str, paths: Sequence[str], skip_binary: bool = True,
+                  max_hits: Optional[int] = None, max_per_file: Optional[int] = None,
+                  archive_limit: Optional[int] = None) -> List[Tuple[str, int, str]]:
+    # runs in a worker process; re caches the compiled pattern per process
+    plan = plan_query(query)
+    prefilter = literal_prefilter(query)
     results = []
-    pattern = re.compile(query, re.IGNORECASE)
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            # skip binary files by simple heuristic
-            if fn.endswith(('.pyc', '.pyo', '.exe', '.dll')):
-                continue
-            path = os.path.join(dirpath, fn)
-            try:
-                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                    for i, line in enumerate(f, start=1):
-                        if pattern.search(line):
-                            results.append((path, i, line.rstrip('\n')))
-            except Exception:
-                # ignore unreadable files
-                continue
+    for path in paths:
+        if max_hits is not None and len(results) >= max_hits:
+            break
+        results.extend(iter_file_hits(plan.pattern, path, None, prefilter, skip_binary,
+                                      _file_limit(max_per_file, max_hits, len(results)), archive_limit,
+                                      plan.line_filter))
     return results
 
 
-if __name__ == '__main__':
-    # quick manual test
-    for p, ln, txt in search_in_files('TODO', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))):
-        print(f"{p}:{ln}: {txt}")
+def iter_search_parallel(query: str, root: str, workers: Optional[int] = None,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE, paths: Optional[Iterable[str]] = None,
+                         file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                         max_per_file: Optional[int] = None) -> Iterator[Tuple[str, int, str]]:
+    """Like iter_search, but scan the files in a process pool.
+
+    workers defaults to os.cpu_count(); chunk_size is the number of files per
+    task. Chunks are yielded in file-list order as soon as they and all
+    chunks before them are done, so the hits are the same as from the
+    serial function. Only a few chunks per worker are in flight, so no new
+    chunks are started once max_hits hits are yielded.
+    """
+    file_filter = file_filter or FileFilter()
+    compile_query(query)  # report invalid patterns before starting workers
+    paths = list(iter_files(root, file_filter) if paths is None else paths)
+    skip_binary = file_filter.skip_binary
+    archive_limit = file_filter.archive_limit
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, int(chunk_size))
+    if workers <= 1 or len(paths) <= chunk_size:
+        yield from _search_chunk(query, paths, skip_binary, max_hits, max_per_file, archive_limit)
+        return
+    chunks = iter([paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)])
+    found = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_search_chunk, query, chunk, skip_binary, max_hits, max_per_file,
+                                    archive_limit)
+                        for chunk in islice(chunks, 2 * workers))
+        try:
+            while pending:
+                hits = pending.popleft().result()
+                if max_hits is not None:
+                    del hits[max_hits - found:]
+                found += len(hits)
+                yield from hits
+                if max_hits is not None and found >= max_hits:
+                    break
+                for chunk in islice(chunks, 1):
+                    pending.append(pool.submit(_search_chunk, query, chunk, skip_binary, max_hits, max_per_file,
+                                               archive_limit))
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def search_in_files_parallel(query: str, root: str, workers: Optional[int] = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                             max_per_file: Optional[int] = None) -> List[Tuple[str, int, str]]:
+    """Like search_in_files, but scan the files in a process pool (see iter_search_parallel)."""
+    return list(iter_search_parallel(query, root, workers, chunk_size, file_filter=file_filter,
+                                     max_hits=max_hits, max_per_file=max_per_file))
+
+
+class RegexTimeout(RuntimeError):
+    """A guarded search gave up because the pattern is too slow."""
+
+
+def _guarded_worker(conn, started, query: str, skip_binary: bool, archive_limit: Optional[int],
+                    max_per_file: Optional[int], before: int, after: int):
+    # runs in the child process of iter_search_guarded: receives batches of
+    # (sequence number, path) and answers with lists of per-file hit lists,
+    # at least every _GUARD_FLUSH seconds and at the end of every batch;
+    # started holds the sequence number of the current file
+    plan = plan_query(query)
+    prefilter = literal_prefilter(query)
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            return
+        done = []
+        last_send = time.monotonic()
+        for seq, path in batch:
+            started.value = seq
+            if before or after:
+                if prefilter is not None and not search_file(plan.pattern, path, prefilter, skip_binary, 1,
+                                                             archive_limit):
+                    hits = []
+                else:
+                    hits = list(iter_file_context(plan.pattern, path, before, after, None, skip_binary,
+                                                  max_per_file, archive_limit, plan.line_filter))
+            else:
+                hits = list(iter_file_hits(plan.pattern, path, None, prefilter, skip_binary, max_per_file,
+                                           archive_limit, plan.line_filter))
+            done.append(hits)
+            now = time.monotonic()
+            if now - last_send >= _GUARD_FLUSH:
+                conn.send(done)
+                done = []
+                last_send = now
+        conn.send(done)
+
+
+class _GuardedWorker:
+    """Child process running _guarded_worker; killed when a file takes too long."""
+
+    def __init__(self, *args):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.started = multiprocessing.RawValue('q', -1)
+        self.process = multiprocessing.Process(target=_guarded_worker, args=(child_conn, self.started) + args,
+                                               daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def send(self, batch):
+        try:
+            self.conn.send(batch)
+        except OSError:
+            # the worker is gone; iter_search_guarded notices that it died
+            pass
+
+    def kill(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.process.terminate()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+def iter_search_guarded(query: str, root: str, paths: Optional[Iterable[str]] = None, cancel=None,
+                        on_file: Optional[Callable[[str], None]] = None,
+                        file_filter: Optional[FileFilter] = None, max_hits: Optional[int] = None,
+                        max_per_file: Optional[int] = None, before: int = 0, after: int = 0,
+                        file_timeout: float = DEFAULT_FILE_TIMEOUT, max_timeouts: int = DEFAULT_MAX_TIMEOUTS,
+                        on_timeout: Optional[Callable[[str], None]] = None) -> Iterator[tuple]:
+    """Like iter_search (or iter_search_context with before/after), matching in a child process.
+
+    A regex can backtrack for minutes on one unlucky line, and the re module
+    cannot be interrupted, not even from another thread. Here the files are
+    scanned by a worker process; when it spends more than file_timeout
+    seconds on one file, it is killed, on_timeout is called with the path
+    and a new worker continues with the next file. After max_timeouts such
+    files RegexTimeout is raised. A worker that stops before it started a
+    file is replaced and no file is skipped; RuntimeError is raised if that
+    happens _GUARD_RESTARTS times in a row. Setting cancel or closing the
+    generator kills the worker as well.
+    """
+    file_filter = file_filter or FileFilter()
+    plan_query(query)  # report invalid patterns here
+    source = enumerate(iter_files(root, file_filter) if paths is None else paths)
+    args = (query, file_filter.skip_binary, file_filter.archive_limit, max_per_file, before, after)
+    worker = None
+    queue = deque()     # (sequence number, path) sent to the worker, not answered yet
+    found = 0
+    timeouts = 0
+    restarts = 0
+    try:
+        while True:
+            # keep the next batch queued in the worker, so walking and scanning overlap
+            if len(queue) <= _GUARD_BATCH // 2:
+                batch = list(islice(source, _GUARD_BATCH))
+                if batch:
+                    if worker is None:
+                        worker = _GuardedWorker(*args)
+                    worker.send(batch)
+                    queue.extend(batch)
+            if not queue:
+                return
+            # the clock runs from the last answer of the worker
+            deadline = time.monotonic() + file_timeout
+            answers = None
+            while answers is None:
+                if cancel is not None and cancel.is_set():
+                    return
+                if worker.conn.poll(_GUARD_POLL):
+                    try:
+                        answers = worker.conn.recv()
+                    except (EOFError, OSError):
+                        break
+                elif time.monotonic() >= deadline or not worker.process.is_alive():
+                    break
+            if answers is not None:
+                restarts = 0
+                for hits in answers:
+                    _, path = queue.popleft()
+                    if on_file is not None:
+                        on_file(path)
+                    if max_hits is not None:
+                        del hits[max_hits - found:]
+                    found += len(hits)
+                    yield from hits
+                    if max_hits is not None and found >= max_hits:
+                        return
+                continue
+            # too slow (or crashed): skip the file the worker is stuck on and
+            # let a new worker redo the answers that were not sent yet
+            stuck = worker.started.value
+            worker.kill()
+            worker = None
+            position = next((i for i, (seq, _) in enumerate(queue) if seq == stuck), None)
+            if position is None:
+                # the worker stopped before it started any of the queued files
+                restarts += 1
+                if restarts >= _GUARD_RESTARTS:
+                    raise RuntimeError(f"search aborted: the search worker stopped {restarts} times "
+                                       f"before scanning a file")
+                worker = _GuardedWorker(*args)
+                worker.send(list(queue))
+                continue
+            restarts = 0
+            _, path = queue[position]
+            del queue[position]
+            if on_file is not None:
+                on_file(path)
+            timeouts += 1
+            if on_timeout is not None:
+                on_timeout(path)
+            if max_timeouts and timeouts >= max_timeouts:
+                raise RegexTimeout(f"search aborted: the pattern took longer than {file_timeout:g} s "
+                                   f"on {timeouts} files")
+            if queue:
+                worker = _GuardedWorker(*args)
+                worker.send(list(queue))
+    finally:
+        if worker is not None:
+            worker.kill()
@@ -0,0 +1,137 @@
+"""Preview of the lines around a search hit.
+
+The lines are read on a worker thread through logic_preview.read_window, so
+selecting a hit in a file of any size only maps a small window of it. The
+hit line is marked and the matches of the query are highlighted.
+"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QColor, QFontDatabase, QTextCharFormat, QTextCursor, QTextFormat
+from PyQt6.QtWidgets import QPlainTextEdit, QTextEdit
+
+from .logic_preview import read_window
+
+# lines shown before and after the hit line
+CONTEXT_LINES = 20
+
+# matches highlighted per previewed line
+MAX_SPANS_PER_LINE = 50
+
+_HIT_LINE_COLOR = QColor(255, 245, 200)
+_MATCH_COLOR = QColor(255, 200, 80)
+
+# loaders still running; kept referenced until they finish
+_running_loaders = set()
+
+
+def _utf16_len(text):
+    # QTextDocument positions count UTF-16 code units
+    return len(text.encode('utf-16-le')) // 2
+
+
+class PreviewLoader(QThread):
+    """Read the window around one hit off the GUI thread."""
+
+    loaded = pyqtSignal(int, int, list)   # request id, first line number, lines
+    failed = pyqtSignal(int, str)         # request id, message
+
+    def __init__(self, request_id, path, line_no, context=CONTEXT_LINES):
+        super().__init__()
+        self.request_id = request_id
+        self.path = path
+        self.line_no = line_no
+        self.context = context
+
+    def run(self):
+        try:
+            first, lines = read_window(self.path, self.line_no, self.context, self.context)
+        except Exception as e:
+            self.failed.emit(self.request_id, str(e))
+            return
+        self.loaded.emit(self.request_id, first, lines)
+
+
+class PreviewPane(QPlainTextEdit):
+    """Read-only view of the lines around the selected hit."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.setPlaceholderText('Select a hit to preview it')
+        self._request_id = 0
+        self._line_no = 0
+        self._pattern = None
+
+    def set_pattern(self, pattern):
+        """Regex whose matches are highlighted (None: highlight nothing)."""
+        self._pattern = pattern
+
+    def clear_preview(self):
+        self._request_id += 1
+        self.clear()
+
+    def show_hit(self, path, line_no):
+        """Load and show the lines around line_no of path (0: the start of the file)."""
+        self._request_id += 1
+        self._line_no = line_no
+        loader = PreviewLoader(self._request_id, path, max(line_no, 1))
+        loader.loaded.connect(self._on_loaded)
+        loader.failed.connect(self._on_failed)
+        loader.finished.connect(lambda t=loader: _running_loaders.discard(t))
+        _running_loaders.add(loader)
+        loader.start()
+
+    def _on_failed(self, request_id, message):
+        if request_id == self._request_id:
+            self.setPlainText(f"Cannot preview: {message}")
+
+    def _on_loaded(self, request_id, first, lines):
+        if request_id != self._request_id:
+            # a newer hit was selected meanwhile
+            return
+        width = len(str(first + len(lines)))
+        # U+2028/U+2029 would start new blocks in the document
+        texts = [line.replace('\u2028', ' ').replace('\u2029', ' ') for line in lines]
+        prefixes = [f"{n:>{width}}  " for n in range(first, first + len(texts))]
+        self.setPlainText('\n'.join(p + t for p, t in zip(prefixes, texts)))
+        selections = []
+        hit_cursor = None
+        doc = self.document()
+        for i, text in enumerate(texts):
+            block = doc.findBlockByNumber(i)
+            base = block.position() + len(prefixes[i])
+            if first + i == self._line_no:
+                hit_cursor = QTextCursor(block)
+                fmt = QTextCharFormat()
+                fmt.setBackground(_HIT_LINE_COLOR)
+                fmt.setProperty(QTextFormat.Property.FullWidthSelection, True)
+                sel = QTextEdit.ExtraSelection()
+                sel.cursor = QTextCursor(block)
+                sel.format = fmt
+                selections.append(sel)
+            if self._pattern is None:
+                continue
+            wide = len(text) != _utf16_len(text)
+            for n, m in enumerate(self._pattern.finditer(text)):
+                if n >= MAX_SPANS_PER_LINE:
+                    break
+                if m.start() == m.end():
+                    continue
+                start, end = m.start(), m.end()
+                if wide:
+                    start, end = _utf16_len(text[:start]), _utf16_len(text[:end])
+                cursor = QTextCursor(doc)
+                cursor.setPosition(base + start)
+                cursor.setPosition(base + end, QTextCursor.MoveMode.KeepAnchor)
+                sel = QTextEdit.ExtraSelection()
+                sel.cursor = cursor
+                fmt = QTextCharFormat()
+                fmt.setBackground(_MATCH_COLOR)
+                sel.format = fmt
+                selections.append(sel)
+        self.setExtraSelections(selections)
+        if hit_cursor is not None:
+            self.setTextCursor(hit_cursor)
+            self.centerCursor()
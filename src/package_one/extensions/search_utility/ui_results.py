@@ -0,0 +1,130 @@
+"""Virtualized list model for search hits.
+
+Hits are kept in parallel arrays (interned path id, line number, offset of
+the line text in one shared UTF-8 buffer) instead of one QListWidgetItem per
+hit. The display string of a row is built only when the view asks for it.
+
+A row is a match or a context line around one (ROW_CONTEXT); a line number
+of 0 marks a per-file row such as a match count.
+"""
+
+from array import array
+import os
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+# longest line text kept per hit; the rest is only needed when opening the file
+MAX_TEXT_CHARS = 500
+
+# row kinds
+ROW_MATCH = 0
+ROW_CONTEXT = 1
+
+
+class SearchResultModel(QAbstractListModel):
+    """List model over (path, line_no, text) hits stored in compact arrays."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = ''
+        self._paths = []          # path id -> path
+        self._display_paths = []  # path id -> path relative to root
+        self._path_ids = {}
+        self._path_col = array('i')
+        self._line_col = array('i')
+        self._offset_col = array('q')
+        self._kind_col = array('b')
+        self._text = bytearray()
+        # rows that are matches (not context lines)
+        self.match_count = 0
+
+    def clear(self, root=''):
+        self.beginResetModel()
+        self.root = root
+        self._paths = []
+        self._display_paths = []
+        self._path_ids = {}
+        self._path_col = array('i')
+        self._line_col = array('i')
+        self._offset_col = array('q')
+        self._kind_col = array('b')
+        self._text = bytearray()
+        self.match_count = 0
+        self.endResetModel()
+
+    def _intern(self, path):
+        pid = self._path_ids.get(path)
+        if pid is None:
+            pid = len(self._paths)
+            self._path_ids[path] = pid
+            self._paths.append(path)
+            try:
+                self._display_paths.append(os.path.relpath(path, self.root) if self.root else path)
+            except ValueError:
+                # different drive on Windows
+                self._display_paths.append(path)
+        return pid
+
+    def append_hits(self, hits):
+        """Append a batch of (path, line_no, text[, kind]) hits as new rows."""
+        if not hits:
+            return
+        first = len(self._line_col)
+        self.beginInsertRows(QModelIndex(), first, first + len(hits) - 1)
+        path_ids = self._path_ids
+        intern = self._intern
+        buf = self._text
+        offsets = self._offset_col
+        pids = array('i')
+        lines = array('i')
+        kinds = array('b')
+        context = 0
+        for hit in hits:
+            path, line_no, text = hit[0], hit[1], hit[2]
+            pid = path_ids.get(path)
+            pids.append(intern(path) if pid is None else pid)
+            lines.append(line_no)
+            offsets.append(len(buf))
+            buf += text[:MAX_TEXT_CHARS].encode('utf-8', 'surrogatepass')
+            if len(hit) > 3 and hit[3] == ROW_CONTEXT:
+                kinds.append(ROW_CONTEXT)
+                context += 1
+            else:
+                kinds.append(ROW_MATCH)
+        self._path_col.extend(pids)
+        self._line_col.extend(lines)
+        self._kind_col.extend(kinds)
+        self.match_count += len(hits) - context
+        self.endInsertRows()
+
+    def _row_text(self, row):
+        start = self._offset_col[row]
+        end = self._offset_col[row + 1] if row + 1 < len(self._offset_col) else len(self._text)
+        return self._text[start:end].decode('utf-8', 'surrogatepass')
+
+    def hit(self, row):
+        """Return the (path, line_no, text) hit shown in row."""
+        return (self._paths[self._path_col[row]], self._line_col[row], self._row_text(row))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._line_col)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if row < 0 or row >= len(self._line_col):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            path = self._display_paths[self._path_col[row]]
+            line_no = self._line_col[row]
+            if line_no == 0:
+                return f"{path} — {self._row_text(row)}"
+            if self._kind_col[row] == ROW_CONTEXT:
+                return f"{path}-{line_no}-   {self._row_text(row)}"
+            return f"{path}:{line_no} — {self._row_text(row)}"
+        if role == Qt.ItemDataRole.UserRole:
+            return (self._paths[self._path_col[row]], self._line_col[row])
+        return None
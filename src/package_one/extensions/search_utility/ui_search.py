@@ -1,7 +1,277 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QPushButton, QListWidget, QListWidgetItem
-from PyQt6.QtCore import Qt
-from .logic_search import search_in_files
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QListView, QLabel,
+    QListWidget, QSpinBox, QCheckBox, QFileDialog, QComboBox, QSplitter,
+)
+from PyQt6.QtCore import QThread, QTimer, Qt, pyqtSignal
+from .logic_archive import archive_of
+from .logic_search import DEFAULT_FILE_TIMEOUT, iter_counts, iter_search, iter_search_context, iter_search_guarded
+from .logic_query import narrows, plan_query
+from .logic_cache import corpus_fingerprint, default_cache, filter_key
+from .logic_filter import DEFAULT_MAX_FILE_SIZE, FileFilter
+from .logic_index import build_index, get_index, has_index, indexed_candidates, indexed_candidates_any
+from .logic_multi import iter_multi_counts, iter_search_multi
+from .ui_preview import PreviewPane
+from .ui_results import ROW_CONTEXT, SearchResultModel
+from .ui_watcher import IndexWatcher
 import os
+import re
+import threading
+import time
+from itertools import groupby, islice
+from operator import itemgetter
+
+# minimum time between two result batches sent to the GUI thread
+BATCH_INTERVAL = 0.05
+
+# result modes of the search page
+MODE_LINES = 'lines'
+MODE_FILES = 'files'
+MODE_COUNT = 'count'
+
+# default cap on listed hits; keeps memory bounded on huge trees
+DEFAULT_MAX_HITS = 10000
+
+# search as you type: quiet time after the last keystroke before a search
+# starts, and the shortest query searched
+LIVE_DELAY_MS = 250
+LIVE_MIN_LENGTH = 2
+
+# seconds the matching files of a complete search are reused for narrower
+# queries of roots no IndexWatcher reports changes for
+NARROW_MAX_AGE = 30.0
+
+# search threads still running; kept referenced until they finish so a
+# closed widget never destroys a running QThread
+_running_threads = set()
+
+
+def _split_globs(text):
+    # "*.py, *.json build" -> ['*.py', '*.json', 'build']
+    return [p for p in text.replace(',', ' ').replace(';', ' ').split() if p]
+
+
+def _split_terms(text):
+    # "foo bar; baz" -> ['foo bar', 'baz']; terms keep inner spaces
+    return [t.strip() for t in text.replace('\t', ';').split(';') if t.strip()]
+
+
+class _Candidates:
+    """Files that held matches of a finished, complete search.
+
+    A later query that narrows the query (see logic_query.narrows) can only
+    match in these files, so it re-reads them instead of walking the roots.
+    """
+
+    def __init__(self, query, roots, filter_id, files, scanned_at, generations):
+        self.query = query
+        self.roots = roots
+        self.filter_id = filter_id
+        # root -> matching files in walk order
+        self.files = files
+        # time.monotonic() of the full search the files come from
+        self.scanned_at = scanned_at
+        # root -> index generation of the full search (watched roots only)
+        self.generations = generations
+
+
+class SearchThread(QThread):
+    """Run iter_search over one or more roots on a worker thread and report hits in batches."""
+
+    batch = pyqtSignal(int, list)      # run id, [(path, line_no, text), ...]
+    progress = pyqtSignal(int, int)    # run id, files scanned
+    failed = pyqtSignal(int, str)      # run id, error message
+    skipped = pyqtSignal(int, str)     # run id, file given up on because the pattern was too slow
+    cacheHit = pyqtSignal(int, str)    # run id, root whose results came from the cache
+    done = pyqtSignal(int, bool)       # run id, cancelled
+
+    def __init__(self, run_id, query, roots, file_filter=None, refresh_index=True,
+                 mode=MODE_LINES, max_hits=None, max_per_file=None, context=0, terms=None,
+                 file_timeout=DEFAULT_FILE_TIMEOUT, cache=default_cache, candidates=None):
+        super().__init__()
+        self.run_id = run_id
+        self.query = query
+        # literal terms searched in one pass instead of the query regex
+        self.terms = list(terms) if terms else None
+        self.roots = [roots] if isinstance(roots, str) else list(roots)
+        self.file_filter = file_filter or FileFilter()
+        self.mode = mode
+        # max_hits counts files in MODE_FILES and MODE_COUNT
+        self.max_hits = max_hits
+        self.max_per_file = max_per_file
+        self.context = context
+        # seconds a backtracking-prone pattern may spend on one file (None: no guard)
+        self.file_timeout = file_timeout
+        # ResultCache for finished searches, None to always scan
+        self.cache = cache
+        # root -> the only files to read there (from a search the query narrows)
+        self.candidates = candidates or {}
+        # root -> files with results, in walk order (archives for archive!member hits)
+        self.matched_files = {}
+        self._timeouts = 0
+        # True/False for all roots, or the roots whose indexes must be refreshed
+        # (those no IndexWatcher keeps fully current)
+        self.refresh_index = refresh_index
+        self.cancel_event = threading.Event()
+        self._files = 0
+        self._pending = []
+        self._last_emit = time.monotonic()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_emit < BATCH_INTERVAL:
+            return
+        if self._pending:
+            self.batch.emit(self.run_id, self._pending)
+            self._pending = []
+        self.progress.emit(self.run_id, self._files)
+        self._last_emit = now
+
+    def _on_file(self, path):
+        self._files += 1
+        self._flush()
+
+    def _context_rows(self, hits):
+        # expand (path, line, text, before, after) hits into rows; context
+        # lines shared by neighbouring hits are listed once
+        last_path = None
+        last_line = 0
+        held = []   # after-context of the previous hit
+        for path, line_no, text, before, after in hits:
+            if path != last_path:
+                for ln, t in held:
+                    yield (last_path, ln, t, ROW_CONTEXT)
+                last_path, last_line = path, 0
+            else:
+                for ln, t in held:
+                    if ln < line_no:
+                        yield (path, ln, t, ROW_CONTEXT)
+                        last_line = ln
+            for ln, t in before:
+                if ln > last_line:
+                    yield (path, ln, t, ROW_CONTEXT)
+            yield (path, line_no, text)
+            last_line = line_no
+            held = after
+        for ln, t in held:
+            yield (last_path, ln, t, ROW_CONTEXT)
+
+    def _cache_key(self, root, fingerprint, found):
+        left = None if self.max_hits is None else self.max_hits - found
+        return ('ui', self.mode, self.query, tuple(self.terms) if self.terms else None, left, self.max_per_file,
+                self.context, filter_key(self.file_filter), root, fingerprint)
+
+    def _on_timeout(self, path):
+        self._timeouts += 1
+        self.skipped.emit(self.run_id, path)
+
+    def _guarded(self):
+        # patterns that may backtrack for long run in a worker process that can be killed
+        if self.terms or not self.file_timeout:
+            return False
+        try:
+            return plan_query(self.query).guarded
+        except Exception:
+            return False
+
+    def _guarded_rows(self, root, paths, left):
+        common = dict(paths=paths, cancel=self.cancel_event, on_file=self._on_file, file_filter=self.file_filter,
+                      file_timeout=self.file_timeout, on_timeout=self._on_timeout)
+        if self.mode == MODE_COUNT:
+            hits = iter_search_guarded(self.query, root, **common)
+            counts = ((path, sum(1 for _ in group)) for path, group in groupby(hits, key=itemgetter(0)))
+            return ((path, 0, f"{n} matching line{'s' if n != 1 else ''}") for path, n in islice(counts, left))
+        if self.mode == MODE_FILES:
+            return iter_search_guarded(self.query, root, max_hits=left, max_per_file=1, **common)
+        hits = iter_search_guarded(self.query, root, max_hits=left, max_per_file=self.max_per_file,
+                                   before=self.context, after=self.context, **common)
+        return self._context_rows(hits) if self.context > 0 else hits
+
+    def _multi_rows(self, root, paths, left):
+        common = dict(paths=paths, cancel=self.cancel_event, on_file=self._on_file, file_filter=self.file_filter)
+        if self.mode == MODE_COUNT:
+            counts = iter_multi_counts(self.terms, root, **common)
+            return ((path, 0, ', '.join(f"{term}: {n}" for term, n in per_term.items()))
+                    for path, per_term in islice(counts, left))
+        max_per_file = 1 if self.mode == MODE_FILES else self.max_per_file
+        hits = iter_search_multi(self.terms, root, max_hits=left, max_per_file=max_per_file, **common)
+        return ((path, line_no, f"[{term}] {text}") for path, line_no, text, term in hits)
+
+    def _rows(self, root, paths, found):
+        left = None if self.max_hits is None else self.max_hits - found
+        if self.terms:
+            return self._multi_rows(root, paths, left)
+        if self._guarded():
+            return self._guarded_rows(root, paths, left)
+        common = dict(paths=paths, cancel=self.cancel_event, on_file=self._on_file, file_filter=self.file_filter)
+        if self.mode == MODE_COUNT:
+            counts = iter_counts(self.query, root, **common)
+            return ((path, 0, f"{n} matching line{'s' if n != 1 else ''}") for path, n in islice(counts, left))
+        if self.mode == MODE_FILES:
+            return iter_search(self.query, root, max_hits=left, max_per_file=1, **common)
+        if self.context > 0:
+            hits = iter_search_context(self.query, root, self.context, self.context, max_hits=left,
+                                       max_per_file=self.max_per_file, **common)
+            return self._context_rows(hits)
+        return iter_search(self.query, root, max_hits=left, max_per_file=self.max_per_file, **common)
+
+    def run(self):
+        try:
+            found = 0
+            for root in self.roots:
+                if self.cancel_event.is_set():
+                    break
+                if self.max_hits is not None and found >= self.max_hits:
+                    break
+                key = cached = None
+                paths = self.candidates.get(root)
+                refresh = self.refresh_index
+                if not isinstance(refresh, bool):
+                    refresh = root in refresh
+                if paths is None and self.cache is not None:
+                    try:
+                        fingerprint, paths = corpus_fingerprint(root, self.file_filter, refresh)
+                    except Exception:
+                        fingerprint = None
+                    else:
+                        # the fingerprint refreshed the index if it came from one
+                        refresh = False
+                        key = self._cache_key(root, fingerprint, found)
+                        cached = self.cache.get(key)
+                if cached is not None:
+                    self.cacheHit.emit(self.run_id, root)
+                elif paths is None and has_index(root):
+                    try:
+                        if self.terms:
+                            paths = indexed_candidates_any(self.terms, root, refresh=refresh,
+                                                           file_filter=self.file_filter)
+                        else:
+                            paths = indexed_candidates(self.query, root, refresh=refresh,
+                                                       file_filter=self.file_filter)
+                    except Exception:
+                        paths = None
+                rows = []
+                timeouts = self._timeouts
+                matched = self.matched_files.setdefault(root, {})
+                for row in (cached if cached is not None else self._rows(root, paths, found)):
+                    if len(row) < 4:
+                        found += 1
+                        matched[archive_of(row[0])] = None
+                    self._pending.append(row)
+                    self._flush()
+                    if cached is None:
+                        rows.append(row)
+                if (cached is None and key is not None and not self.cancel_event.is_set()
+                        and self._timeouts == timeouts):
+                    self.cache.put(key, rows)
+        except Exception as e:
+            self.failed.emit(self.run_id, str(e))
+        if self.cancel_event.is_set():
+            self._pending = []
+        self._flush(force=True)
+        self.done.emit(self.run_id, self.cancel_event.is_set())
 
 
 class SearchWidget(QWidget):
@@ -11,23 +281,433 @@ class SearchWidget(QWidget):
         self.input = QLineEdit()
         self.input.setPlaceholderText('Search query (regex)')
         self.btn = QPushButton('Search')
-        self.results = QListWidget()
+        self.cancel_btn = QPushButton('Cancel')
+        self.cancel_btn.setEnabled(False)
+        self.index_btn = QPushButton('Build index')
+
+        # search roots
+        self.roots = QListWidget()
+        self.roots.setMaximumHeight(70)
+        self.roots.addItem(self._default_root())
+        self.add_root_btn = QPushButton('Add folder…')
+        self.remove_root_btn = QPushButton('Remove folder')
+        # file selection
+        self.include_edit = QLineEdit()
+        self.include_edit.setPlaceholderText('Include globs, e.g. *.py *.json (empty: all files)')
+        self.exclude_edit = QLineEdit()
+        self.exclude_edit.setPlaceholderText('Exclude globs, e.g. build *.min.js docs/**/*.md')
+        self.max_size = QSpinBox()
+        self.max_size.setRange(0, 1 << 20)
+        self.max_size.setSuffix(' MB')
+        self.max_size.setSpecialValueText('no size limit')
+        self.max_size.setValue(DEFAULT_MAX_FILE_SIZE >> 20)
+        self.skip_binary = QCheckBox('Skip binary files')
+        self.skip_binary.setChecked(True)
+        self.use_ignore = QCheckBox('Honour .gitignore')
+        self.use_ignore.setChecked(True)
+        self.archives = QCheckBox('Search in archives')
+        self.archives.setToolTip('Search inside .gz, .bz2 and .zip files; hits are listed as archive!member')
+        self.archives.setChecked(True)
+        # result limits
+        self.mode = QComboBox()
+        self.mode.addItem('Matching lines', MODE_LINES)
+        self.mode.addItem('Files with matches', MODE_FILES)
+        self.mode.addItem('Count per file', MODE_COUNT)
+        self.max_hits = QSpinBox()
+        self.max_hits.setRange(0, 10_000_000)
+        self.max_hits.setSpecialValueText('no limit')
+        self.max_hits.setValue(DEFAULT_MAX_HITS)
+        self.max_per_file = QSpinBox()
+        self.max_per_file.setRange(0, 1_000_000)
+        self.max_per_file.setSpecialValueText('no limit')
+        self.context = QSpinBox()
+        self.context.setRange(0, 50)
+        self.file_timeout = QSpinBox()
+        self.file_timeout.setRange(0, 3600)
+        self.file_timeout.setSuffix(' s')
+        self.file_timeout.setSpecialValueText('off')
+        self.file_timeout.setValue(int(DEFAULT_FILE_TIMEOUT))
+        self.file_timeout.setToolTip('Time a complex regex may spend on one file before the file is skipped')
+        self.multi = QCheckBox('Multiple terms')
+        self.multi.setToolTip('Search several literal terms, separated by ";", in one pass')
+        self.multi.toggled.connect(self._on_multi_toggled)
+        self.live = QCheckBox('Search as you type')
+        self.live.setToolTip('Search shortly after typing stops; a longer query re-reads only the files '
+                             'the previous one matched in')
+        self.live.toggled.connect(self._on_live_toggled)
+        self._live_timer = QTimer(self)
+        self._live_timer.setSingleShot(True)
+        self._live_timer.setInterval(LIVE_DELAY_MS)
+        self._live_timer.timeout.connect(self._on_live_timeout)
+
+        self.status = QLabel('')
+        self.model = SearchResultModel(self)
+        self.results = QListView()
+        self.results.setModel(self.model)
+        self.results.setUniformItemSizes(True)
+        self.results.selectionModel().currentChanged.connect(self._on_current_changed)
+        self.preview = PreviewPane()
+        self.splitter = QSplitter(Qt.Orientation.Vertical)
+        self.splitter.addWidget(self.results)
+        self.splitter.addWidget(self.preview)
+        self.splitter.setStretchFactor(0, 3)
+        self.splitter.setStretchFactor(1, 2)
+
+        root_buttons = QVBoxLayout()
+        root_buttons.addWidget(self.add_root_btn)
+        root_buttons.addWidget(self.remove_root_btn)
+        roots_row = QHBoxLayout()
+        roots_row.addWidget(self.roots)
+        roots_row.addLayout(root_buttons)
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(self.include_edit)
+        filter_row.addWidget(self.exclude_edit)
+        options_row = QHBoxLayout()
+        options_row.addWidget(QLabel('Max file size:'))
+        options_row.addWidget(self.max_size)
+        options_row.addWidget(self.skip_binary)
+        options_row.addWidget(self.use_ignore)
+        options_row.addWidget(self.archives)
+        options_row.addStretch(1)
+        limits_row = QHBoxLayout()
+        limits_row.addWidget(self.mode)
+        limits_row.addWidget(QLabel('Max hits:'))
+        limits_row.addWidget(self.max_hits)
+        limits_row.addWidget(QLabel('Per file:'))
+        limits_row.addWidget(self.max_per_file)
+        limits_row.addWidget(QLabel('Context lines:'))
+        limits_row.addWidget(self.context)
+        limits_row.addWidget(QLabel('Regex timeout:'))
+        limits_row.addWidget(self.file_timeout)
+        limits_row.addWidget(self.multi)
+        limits_row.addWidget(self.live)
+        limits_row.addStretch(1)
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btn)
+        buttons.addWidget(self.cancel_btn)
+        buttons.addWidget(self.index_btn)
         self.layout.addWidget(self.input)
-        self.layout.addWidget(self.btn)
-        self.layout.addWidget(self.results)
+        self.layout.addLayout(roots_row)
+        self.layout.addLayout(filter_row)
+        self.layout.addLayout(options_row)
+        self.layout.addLayout(limits_row)
+        self.layout.addLayout(buttons)
+        self.layout.addWidget(self.status)
+        self.layout.addWidget(self.splitter, 1)
         self.btn.clicked.connect(self.on_search)
+        self.input.returnPressed.connect(self.on_search)
+        self.input.textChanged.connect(self._on_text_changed)
+        self.cancel_btn.clicked.connect(self.on_cancel)
+        self.index_btn.clicked.connect(self.on_build_index)
+        self.add_root_btn.clicked.connect(self.on_add_root)
+        self.remove_root_btn.clicked.connect(self.on_remove_root)
+
+        self._run_id = 0
+        self._thread = None
+        self._files = 0
+        self._error = ''
+        self._skipped = 0
+        self._from_cache = False
+        self._mode = MODE_LINES
+        self._thread_limit = None
+        self._refined = False
+        # matching files of the last complete search, for narrower queries
+        self._candidates = None
+        # root -> IndexWatcher keeping its index current
+        self._watchers = {}
+        # root -> index generation the current results were found at
+        self._search_generations = {}
+        # stop the worker when the page is closed
+        self.destroyed.connect(lambda *_, w=self: w._thread is not None and w._thread.cancel())
+        for root in self._roots():
+            if has_index(root):
+                self._start_watcher(root)
+
+    def _default_root(self):
+        return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+    def _root(self):
+        """First search root."""
+        roots = self._roots()
+        return roots[0] if roots else self._default_root()
+
+    def _roots(self):
+        roots = []
+        for i in range(self.roots.count()):
+            root = os.path.abspath(self.roots.item(i).text())
+            if root not in roots:
+                roots.append(root)
+        return roots
+
+    def _display_root(self, roots):
+        # result paths are shown relative to the folder all roots share
+        if len(roots) == 1:
+            return roots[0]
+        try:
+            return os.path.commonpath(roots)
+        except ValueError:
+            # roots on different drives
+            return ''
+
+    def _file_filter(self):
+        size_mb = self.max_size.value()
+        kwargs = {}
+        if not self.use_ignore.isChecked():
+            kwargs['ignore_files'] = ()
+        return FileFilter(
+            include=_split_globs(self.include_edit.text()),
+            exclude=_split_globs(self.exclude_edit.text()),
+            max_size=size_mb << 20 if size_mb else None,
+            skip_binary=self.skip_binary.isChecked(),
+            archives=self.archives.isChecked(),
+            **kwargs,
+        )
+
+    def on_add_root(self):
+        path = QFileDialog.getExistingDirectory(self, 'Add search folder', self._root())
+        if not path:
+            return
+        path = os.path.abspath(path)
+        if path not in self._roots():
+            self.roots.addItem(path)
+            if has_index(path):
+                self._start_watcher(path)
+
+    def on_remove_root(self):
+        for item in self.roots.selectedItems():
+            self.roots.takeItem(self.roots.row(item))
+        remaining = self._roots()
+        for root in [r for r in self._watchers if r not in remaining]:
+            watcher = self._watchers.pop(root)
+            watcher.stop()
+            watcher.deleteLater()
+
+    def _start_watcher(self, root):
+        """Keep the index of root current while the page is open."""
+        if root in self._watchers:
+            return
+        try:
+            watcher = IndexWatcher(get_index(root), parent=self)
+            watcher.start()
+        except Exception:
+            # without a watcher the index is refreshed before every search
+            return
+        watcher.indexUpdated.connect(lambda generation, r=root: self._on_index_updated(r, generation))
+        self._watchers[root] = watcher
+
+    def on_build_index(self):
+        for root in self._roots():
+            try:
+                build_index(root)
+            except Exception:
+                # searching still works without an index
+                continue
+            self._start_watcher(root)
+
+    def _on_index_updated(self, root, generation):
+        # results listed from an older index may miss changed files
+        base = self._candidates
+        if base is not None and generation > base.generations.get(root, generation):
+            self._candidates = None
+        started = self._search_generations.get(root)
+        if started is None or generation <= started:
+            return
+        if self._thread is None and not self._error and '(files changed' not in self.status.text():
+            self.status.setText(self.status.text() + ' (files changed — search again to update)')
+
+    def _on_multi_toggled(self, checked):
+        self.input.setPlaceholderText('Terms separated by ";"' if checked else 'Search query (regex)')
+        # context lines are only listed for regex searches
+        self.context.setEnabled(not checked)
+
+    def _on_live_toggled(self, checked):
+        if checked:
+            self._on_text_changed(self.input.text())
+        else:
+            self._live_timer.stop()
+
+    def _on_text_changed(self, text):
+        if not self.live.isChecked():
+            return
+        # the running search is for an outdated query
+        self.on_cancel()
+        self._live_timer.start()
+
+    def _on_live_timeout(self):
+        q = self.input.text().strip()
+        if len(q) < LIVE_MIN_LENGTH:
+            return
+        if not self.multi.isChecked():
+            try:
+                plan_query(q)
+            except re.error:
+                # most likely still being typed, e.g. "foo("
+                self.status.setText('Incomplete pattern')
+                return
+        self._start_search(live=True)
+
+    def _watches_all(self, root):
+        # True if a watcher reports every change under root, edits in place included
+        watcher = self._watchers.get(root)
+        return watcher is not None and watcher.covers_all
+
+    def _narrow_candidates(self, query, roots, file_filter):
+        # root -> files to re-read if query narrows the last complete search
+        base = self._candidates
+        if base is None or base.roots != tuple(roots) or base.filter_id != filter_key(file_filter):
+            return None
+        unwatched = [root for root in roots if root not in base.generations or not self._watches_all(root)]
+        if unwatched and time.monotonic() - base.scanned_at > NARROW_MAX_AGE:
+            return None
+        if not narrows(base.query, query):
+            return None
+        return base.files
+
+    def _highlight_pattern(self, query, terms):
+        # matches of guarded (possibly slow) queries are not run on the GUI
+        # thread; their required literals are highlighted instead
+        if terms:
+            return re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+        try:
+            plan = plan_query(query)
+        except re.error:
+            return None
+        if not plan.guarded:
+            return plan.pattern
+        return plan.line_filter
+
+    def _on_current_changed(self, current, previous):
+        if not current.isValid():
+            return
+        path, line_no, _ = self.model.hit(current.row())
+        self.preview.show_hit(path, line_no)
+
+    def on_cancel(self):
+        if self._thread is not None:
+            self._thread.cancel()
 
     def on_search(self):
+        self._live_timer.stop()
+        self._start_search()
+
+    def _start_search(self, live=False):
         q = self.input.text().strip()
-        self.results.clear()
-        if not q:
-            return
-        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        matches = search_in_files(q, root)
-        for path, line_no, text in matches:
-            item = QListWidgetItem(f"{os.path.relpath(path, root)}:{line_no} — {text}")
-            item.setData(Qt.ItemDataRole.UserRole, (path, line_no))
-            self.results.addItem(item)
+        roots = self._roots()
+        self.on_cancel()
+        self.model.clear(self._display_root(roots) if roots else '')
+        self.preview.clear_preview()
+        self.status.setText('')
+        if not q or not roots:
+            return
+        self._run_id += 1
+        self._files = 0
+        self._error = ''
+        self._skipped = 0
+        self._from_cache = False
+        watched = [root for root in roots if root in self._watchers]
+        for root in watched:
+            self._watchers[root].flush()
+        self._search_generations = {root: self._watchers[root].generation for root in watched}
+        mode = self.mode.currentData()
+        terms = _split_terms(q) if self.multi.isChecked() else None
+        file_filter = self._file_filter()
+        # a manual search always walks the roots again
+        candidates = self._narrow_candidates(q, roots, file_filter) if live and not terms else None
+        self._refined = candidates is not None
+        self.preview.set_pattern(self._highlight_pattern(q, terms))
+        thread = SearchThread(self._run_id, q, roots, file_filter,
+                              refresh_index={root for root in roots if not self._watches_all(root)}, mode=mode,
+                              max_hits=self.max_hits.value() or None,
+                              max_per_file=self.max_per_file.value() or None,
+                              context=self.context.value() if mode == MODE_LINES and not terms else 0,
+                              terms=terms, file_timeout=self.file_timeout.value() or None,
+                              candidates=candidates)
+        if candidates is not None:
+            base = self._candidates
+            thread.scanned_at, thread.generations = base.scanned_at, base.generations
+        else:
+            thread.scanned_at, thread.generations = time.monotonic(), dict(self._search_generations)
+        thread.filter_id = filter_key(file_filter)
+        thread.batch.connect(self._on_batch)
+        thread.progress.connect(self._on_progress)
+        thread.failed.connect(self._on_failed)
+        thread.skipped.connect(self._on_skipped)
+        thread.cacheHit.connect(self._on_cache_hit)
+        thread.done.connect(self._on_done)
+        thread.finished.connect(lambda t=thread: _running_threads.discard(t))
+        _running_threads.add(thread)
+        self._thread = thread
+        self._mode = mode
+        self._thread_limit = thread.max_hits
+        self.cancel_btn.setEnabled(True)
+        thread.start()
+
+    def _count_text(self):
+        if self._mode == MODE_LINES:
+            text = f"hits: {self.model.match_count}"
+        else:
+            text = f"matching files: {self.model.match_count}"
+        if self._skipped:
+            text += f" — {self._skipped} file{'s' if self._skipped != 1 else ''} skipped (regex too slow)"
+        return text
+
+    def _on_batch(self, run_id, hits):
+        if run_id != self._run_id:
+            return
+        self.model.append_hits(hits)
+
+    def _on_progress(self, run_id, files):
+        if run_id != self._run_id:
+            return
+        self._files = files
+        if not self._error:
+            self.status.setText(f"Files: {files} — {self._count_text()}")
+
+    def _on_skipped(self, run_id, path):
+        if run_id != self._run_id:
+            return
+        self._skipped += 1
+
+    def _on_cache_hit(self, run_id, root):
+        if run_id == self._run_id:
+            self._from_cache = True
+
+    def _on_failed(self, run_id, message):
+        if run_id != self._run_id:
+            return
+        self._error = message
+        self.status.setText(f"Error: {message}")
+
+    def _keep_candidates(self, thread):
+        # the matching files are only complete if nothing cut the search short
+        if thread.terms or self._skipped:
+            return
+        if thread.max_hits and self.model.match_count >= thread.max_hits:
+            return
+        self._candidates = _Candidates(thread.query, tuple(thread.roots), thread.filter_id,
+                                       {root: list(files) for root, files in thread.matched_files.items()},
+                                       thread.scanned_at, thread.generations)
+
+    def _on_done(self, run_id, cancelled):
+        if run_id != self._run_id:
+            return
+        thread = self._thread
+        self._thread = None
+        self.cancel_btn.setEnabled(False)
+        if not cancelled and not self._error and thread is not None:
+            self._keep_candidates(thread)
+        if not self._error:
+            state = 'cancelled' if cancelled else 'done'
+            limit = self._thread_limit
+            if limit and self.model.match_count >= limit:
+                state = 'limit reached'
+            if self._from_cache and not cancelled:
+                state += ', from cache'
+            if self._refined and not cancelled:
+                state += ', refined'
+            self.status.setText(f"Files: {self._files} — {self._count_text()} ({state})")
+            for root, watcher in self._watchers.items():
+                self._on_index_updated(root, watcher.generation)
 
 
 def get_widget(*args, **kwargs):
@@ -0,0 +1,151 @@
+"""Keep a search index current while the search page is open.
+
+IndexWatcher watches the directories (and as many files as the platform
+comfortably allows) under an index root with QFileSystemWatcher. Change
+events are collected and applied in one debounced batch through
+TrigramIndex.update_paths, so a template save or an export only re-reads the
+files that actually changed.
+
+A directory watch reports files being created, deleted or renamed, but not
+a file written in place; only a file watch does. Once files had to be left
+unwatched (MAX_WATCHED_FILES, or the platform refused more), covers_all is
+False and searches must still refresh the index of the root by mtime.
+"""
+
+import os
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+
+# quiet period after the last change event before the index is updated
+DEBOUNCE_MS = 500
+
+# upper bound on individually watched files (directories are always watched)
+MAX_WATCHED_FILES = 4096
+
+
+class IndexWatcher(QObject):
+    """Apply file system changes under index.root to index, debounced."""
+
+    # new index generation after an update
+    indexUpdated = pyqtSignal(int)
+
+    def __init__(self, index, debounce_ms=DEBOUNCE_MS, max_watched_files=MAX_WATCHED_FILES, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.max_watched_files = max_watched_files
+        self._pending = set()
+        # False once an indexed file could not be watched
+        self._complete = True
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_changed)
+        self._watcher.fileChanged.connect(self._on_changed)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def generation(self):
+        return self.index.generation
+
+    @property
+    def covers_all(self):
+        """True if every indexed file is watched, so edits in place are reported too."""
+        return self._complete
+
+    def _walk(self, rel_dir='', rules=None):
+        # directories and files of the index below rel_dir, as absolute paths
+        root = self.index.root
+        dirs = []
+        files = []
+        for current, listing in self.index.file_filter.walk_dirs(root, rel_dir, rules):
+            dirs.append(os.path.join(root, current) if current not in ('', os.curdir) else root)
+            files.extend(os.path.join(root, rel) for rel, _ in listing)
+        return dirs, files
+
+    def start(self):
+        """Watch every indexed directory below the root and the first files found."""
+        self._complete = True
+        dirs, files = self._walk()
+        self._watch(dirs, files)
+
+    def stop(self):
+        self._complete = False
+        self.index.watched = False
+        self._timer.stop()
+        self._pending.clear()
+        for paths in (self._watcher.files(), self._watcher.directories()):
+            if paths:
+                self._watcher.removePaths(paths)
+
+    def _watch(self, dirs, files):
+        watched = set(self._watcher.directories())
+        new_dirs = [d for d in dirs if d not in watched and os.path.isdir(d)]
+        if new_dirs:
+            self._watcher.addPaths(new_dirs)
+        watched = set(self._watcher.files())
+        room = self.max_watched_files - len(watched)
+        new_files = []
+        for path in files:
+            if path in watched or not os.path.isfile(path):
+                continue
+            if len(new_files) >= room:
+                self._complete = False
+                break
+            new_files.append(path)
+        if new_files and self._watcher.addPaths(new_files):
+            # paths the platform would not watch (e.g. out of inotify watches)
+            self._complete = False
+        self.index.watched = self._complete
+
+    def _on_changed(self, path):
+        self._pending.add(path)
+        self._timer.start()
+
+    def flush(self):
+        """Apply all pending changes now."""
+        self._timer.stop()
+        if not self._pending:
+            return
+        paths = sorted(self._pending)
+        self._pending.clear()
+        try:
+            changed = self.index.update_paths(paths)
+        except Exception:
+            # these changes are lost: searches must refresh the index by mtime again
+            self._complete = False
+            self.index.watched = False
+            return
+        # new directories and replaced files drop out of the watcher
+        root = self.index.root
+        file_filter = self.index.file_filter
+        watched_dirs = set(self._watcher.directories())
+        new_dirs = []
+        new_files = []
+        for path in paths:
+            if os.path.isfile(path):
+                new_files.append(path)
+                continue
+            if not os.path.isdir(path):
+                continue
+            rel_dir = os.path.relpath(path, root)
+            rules = file_filter.rules_for(root, rel_dir)
+            listing = file_filter.scan_dir(root, rel_dir, rules) if rules is not None else None
+            if listing is None:
+                continue
+            new_dirs.append(path)
+            files, subdirs, rules = listing
+            new_files.extend(os.path.join(root, rel) for rel, _ in files)
+            for sub in subdirs:
+                if os.path.join(root, sub) not in watched_dirs:
+                    dirs, files = self._walk(sub, rules)
+                    new_dirs.extend(dirs)
+                    new_files.extend(files)
+        self._watch(new_dirs, new_files)
+        if changed:
+            try:
+                self.index.save()
+            except Exception:
+                pass
+            self.indexUpdated.emit(self.index.generation)
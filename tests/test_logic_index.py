@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import pytest
+
+from package_one.extensions.search_utility.logic_index import TrigramIndex
+from package_one.extensions.search_utility.logic_search import search_in_files
+
+QUERIES = ['needle', 'Haystack', r'value\s*=\s*\d+', 'x']
+
+
+def _write(root, rel, text):
+    path = os.path.join(root, *rel.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return path
+
+
+def _touch_later(path):
+    # another mtime even on file systems with coarse timestamps
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = str(tmp_path / 'corpus')
+    _write(root, 'a.txt', 'a needle\nhaystack\n')
+    _write(root, 'sub/b.py', 'value = 1\nno match\n')
+    _write(root, 'sub/deeper/c.txt', 'HAYSTACK with a Needle\r\n')
+    _write(root, '.gitignore', 'ignored/\n')
+    _write(root, 'ignored/d.txt', 'needle that is ignored\n')
+    return root
+
+
+@pytest.fixture
+def index(root, tmp_path):
+    idx = TrigramIndex(root, index_path=str(tmp_path / 'index.json'))
+    idx.refresh()
+    return idx
+
+
+def _assert_matches_walk(index, root):
+    for query in QUERIES:
+        assert index.search(query) == search_in_files(query, root), query
+
+
+def test_search_matches_walk(index, root):
+    _assert_matches_walk(index, root)
+    assert not any('ignored' in path for path, _, _ in index.search('needle'))
+
+
+def test_refresh_without_changes(index):
+    generation = index.generation
+    assert index.refresh() is False
+    assert index.generation == generation
+
+
+def test_refresh_picks_up_changes(index, root):
+    path = _write(root, 'a.txt', 'no longer here\n')
+    _touch_later(path)
+    _write(root, 'new/e.txt', 'a new needle\n')
+    os.remove(os.path.join(root, 'sub', 'b.py'))
+    generation = index.generation
+    assert index.refresh() is True
+    assert index.generation > generation
+    _assert_matches_walk(index, root)
+
+
+def test_update_paths(index, root):
+    edited = _write(root, 'sub/deeper/c.txt', 'value = 42\n')
+    _touch_later(edited)
+    _write(root, 'sub/new/f.txt', 'needle in a new folder\n')
+    generation = index.generation
+    assert index.update_paths([edited, os.path.join(root, 'sub')]) is True
+    assert index.generation == generation + 1
+    _assert_matches_walk(index, root)
+    assert index.update_paths([edited]) is False
+
+
+def test_update_paths_for_deleted_entries(index, root):
+    os.remove(os.path.join(root, 'a.txt'))
+    shutil.rmtree(os.path.join(root, 'sub', 'deeper'))
+    assert index.update_paths([os.path.join(root, 'a.txt'), os.path.join(root, 'sub', 'deeper')]) is True
+    _assert_matches_walk(index, root)
+
+
+def test_update_paths_ignores_paths_outside_the_root(index, tmp_path):
+    outside = _write(str(tmp_path), 'elsewhere/g.txt', 'needle\n')
+    assert index.update_paths([outside]) is False
+
+
+def test_save_and_load(index, root, tmp_path):
+    index.save()
+    loaded = TrigramIndex(root, index_path=str(tmp_path / 'index.json'))
+    assert loaded.load() is True
+    _assert_matches_walk(loaded, root)
+    assert loaded.refresh() is False
+
+
+def test_index_of_another_root_is_not_loaded(index, root, tmp_path):
+    index.save()
+    other = str(tmp_path / 'other')
+    os.makedirs(other)
+    assert TrigramIndex(other, index_path=str(tmp_path / 'index.json')).load() is False
@@ -0,0 +1,154 @@
+import json
+import os
+
+import pytest
+
+from package_one.extensions.modbus_template_konfigurator.logic_journal import EditJournal
+from package_one.extensions.modbus_template_konfigurator.logic_register_table import RegisterTable
+
+
+def _row(register, comment=''):
+    return [register, 'INT16 HL', 'V', comment, '', '3']
+
+
+def _write_snapshot(path, table, journal, input_text=''):
+    # what the editor's autosave writes: rotate first, then the snapshot
+    seq = journal.rotate()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'templates': table.templates(), 'last_used': None, 'input_text': input_text,
+                   'journal_seq': seq, 'journal_id': journal.id}, f)
+    return seq
+
+
+def _open(path):
+    table = RegisterTable()
+    journal = EditJournal(path)
+    result = journal.replay(table)
+    table.journal = journal.append
+    return table, journal, result
+
+
+def _replay(path):
+    table = RegisterTable()
+    found, input_text, applied, clean = EditJournal(path).replay(table)
+    return table, found, input_text, applied, clean
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'last_Modbus_Template.json')
+
+
+def test_nothing_to_replay(path):
+    table, found, input_text, applied, clean = _replay(path)
+    assert (found, input_text, applied, clean) == (False, '', 0, True)
+    assert len(table) == 0
+
+
+def test_replay_journal_without_snapshot(path):
+    table, journal, _ = _open(path)
+    table.insert(0, _row('0x10', 'a'))
+    table.insert(1, _row('20', 'b'))
+    table.set_text(0, 3, 'changed')
+    journal.input_changed('Zähler')
+    journal.close()
+
+    replayed, found, input_text, applied, clean = _replay(path)
+    assert found and clean
+    assert applied == 4
+    assert input_text == 'Zähler'
+    assert replayed.templates() == table.templates()
+
+
+def test_replay_after_crash_between_rotate_and_snapshot(path):
+    table, journal, _ = _open(path)
+    table.insert(0, _row('1'))
+    _write_snapshot(path, table, journal)
+    table.insert(1, _row('2'))
+    # the segment is closed for the next snapshot, which is never written
+    journal.rotate()
+    table.set_text(1, 3, 'after the crash')
+    journal.close()
+
+    replayed, found, _, applied, clean = _replay(path)
+    assert found and clean
+    assert applied == 2
+    assert replayed.templates() == table.templates()
+
+
+def test_snapshot_records_are_not_applied_twice(path):
+    table, journal, _ = _open(path)
+    table.insert(0, _row('1'))
+    table.insert(1, _row('2'))
+    seq = _write_snapshot(path, table, journal, 'dev')
+    journal.discard(seq)
+    table.delete(0, 1)
+    journal.close()
+
+    assert journal.segments() == []
+    replayed, found, input_text, applied, clean = _replay(path)
+    assert found and clean
+    assert applied == 1
+    assert input_text == 'dev'
+    assert replayed.templates() == table.templates()
+
+
+def test_segments_of_another_snapshot_are_ignored(path, tmp_path):
+    table, journal, _ = _open(path)
+    table.insert(0, _row('1', 'old'))
+    _write_snapshot(path, table, journal)
+    with open(path, 'rb') as f:
+        old_copy = f.read()
+    table.insert(1, _row('2', 'edit of the old journal'))
+    journal.close()
+
+    # the table file is replaced by a copy naming another journal
+    other = json.loads(old_copy)
+    other['journal_id'] = 'another journal'
+    other['templates'][0]['Comment'] = 'restored'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(other, f)
+
+    replayed, found, _, applied, clean = _replay(path)
+    assert found
+    assert not clean
+    assert applied == 0
+    assert [t['Comment'] for t in replayed.templates()] == ['restored']
+
+
+def test_torn_record_stops_the_replay(path):
+    table, journal, _ = _open(path)
+    table.insert(0, _row('1'))
+    table.insert(1, _row('2'))
+    journal.close()
+    expected = table.templates()
+    with open(path + '.journal', 'a', encoding='utf-8') as f:
+        f.write('[3,"set",0,3,"half wri')
+
+    replayed, found, _, applied, clean = _replay(path)
+    assert found
+    assert not clean
+    assert applied == 2
+    assert replayed.templates() == expected
+
+
+def test_reset_after_unclean_replay(path):
+    table, journal, _ = _open(path)
+    table.insert(0, _row('1'))
+    journal.close()
+    with open(path + '.journal', 'a', encoding='utf-8') as f:
+        f.write('garbage\n')
+
+    table, journal, (_, _, _, clean) = _open(path)
+    assert not clean
+    _write_snapshot(path, table, journal)
+    journal.reset()
+    assert journal.segments() == []
+    assert not os.path.exists(path + '.journal')
+    table.insert(1, _row('2'))
+    journal.close()
+
+    replayed, found, _, applied, clean = _replay(path)
+    assert found and clean
+    assert applied == 1
+    assert replayed.templates() == table.templates()
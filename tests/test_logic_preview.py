@@ -0,0 +1,105 @@
+import os
+import random
+import re
+
+import pytest
+
+from package_one.extensions.search_utility import logic_preview
+from package_one.extensions.search_utility.logic_preview import LineIndex, read_window
+from package_one.extensions.search_utility.logic_search import iter_search
+
+BREAKS = [b'\n', b'\r\n', b'\r']
+
+
+def _line_starts(data):
+    # reference: a line starts at 0 and after every \r\n, \r or \n (also
+    # after a final break, where the index keeps an anchor at the end of the file)
+    return [0] + [m.end() for m in re.finditer(rb'\r\n|\r|\n', data)]
+
+
+def _line_count(data):
+    starts = _line_starts(data)
+    return len(starts) - 1 if starts[-1] == len(data) else len(starts)
+
+
+def _mixed_file(path, lines, seed, breaks=BREAKS):
+    rng = random.Random(seed)
+    parts = []
+    for i in range(lines):
+        text = 'hit %d' % i if i % 7 == 0 else 'line %d %s' % (i, 'x' * rng.randint(0, 12))
+        parts.append(text.encode('ascii') + rng.choice(breaks))
+    data = b''.join(parts)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return data
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # chunk boundaries every few bytes, so \r\n pairs get split between chunks
+    monkeypatch.setattr(logic_preview, '_BUILD_CHUNK', 7)
+
+
+@pytest.mark.parametrize('breaks', [BREAKS, [b'\n'], [b'\r\n'], [b'\r', b'\n']])
+@pytest.mark.parametrize('step', [1, 3, 256])
+def test_anchors_match_line_starts(tmp_path, small_chunks, breaks, step):
+    path = str(tmp_path / 'mixed.txt')
+    data = _mixed_file(path, 600, seed=step, breaks=breaks)
+    idx = LineIndex.build(path, step)
+    assert idx.line_count == _line_count(data)
+    assert list(idx.anchors) == _line_starts(data)[::step]
+
+
+def test_crlf_across_a_chunk_boundary(tmp_path, monkeypatch):
+    path = str(tmp_path / 'crlf.txt')
+    data = b'abcd\r\nefgh\r\nij\rkl\n'
+    with open(path, 'wb') as f:
+        f.write(data)
+    for chunk in range(1, len(data) + 1):
+        monkeypatch.setattr(logic_preview, '_BUILD_CHUNK', chunk)
+        idx = LineIndex.build(path, 1)
+        assert list(idx.anchors) == _line_starts(data), chunk
+        assert idx.line_count == 4
+
+
+def test_final_line_without_break(tmp_path, small_chunks):
+    path = str(tmp_path / 'open.txt')
+    with open(path, 'wb') as f:
+        f.write(b'one\r\ntwo\rthree')
+    idx = LineIndex.build(path, 1)
+    assert idx.line_count == 3
+    assert read_window(path, 3) == (3, ['three'])
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / 'empty.txt')
+    open(path, 'wb').close()
+    assert LineIndex.build(path).line_count == 0
+    assert read_window(path, 1) == (1, [])
+
+
+def test_window_lines_match_search_hits(tmp_path, small_chunks):
+    root = str(tmp_path / 'corpus')
+    os.makedirs(root)
+    _mixed_file(os.path.join(root, 'mixed.txt'), 3000, seed=1)
+    hits = list(iter_search('hit', root))
+    assert len(hits) == 3000 // 7 + 1
+    for path, line_no, text in hits:
+        first, lines = read_window(path, line_no, 1, 1)
+        assert first == max(1, line_no - 1)
+        assert lines[line_no - first] == text
+
+
+def test_sidecar_is_reused_until_the_file_changes(tmp_path, small_chunks, monkeypatch):
+    monkeypatch.setattr(logic_preview, 'SIDECAR_MIN_SIZE', 1)
+    path = str(tmp_path / 'log.txt')
+    _mixed_file(path, 1000, seed=2)
+    idx = logic_preview.line_index(path)
+    sidecar = logic_preview.sidecar_path(path)
+    loaded = LineIndex.load(sidecar)
+    assert loaded is not None
+    assert (loaded.size, loaded.mtime_ns, loaded.line_count) == (idx.size, idx.mtime_ns, idx.line_count)
+    assert list(loaded.anchors) == list(idx.anchors)
+
+    data = _mixed_file(path, 1500, seed=3)
+    assert logic_preview.line_index(path).line_count == _line_count(data)